@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, status
 from sqlalchemy.orm import Session
 from ...core.database import get_db
 from ...models.user import User
-from ...core.security import get_password_hash
+from ...core.security import get_password_hash, get_current_user
+from ...core.retention import retention_metrics
 from ...core.config import settings
+from ...core.plans import plan_registry
 
 router = APIRouter()
 
@@ -23,7 +25,7 @@ async def create_admin_user(db: Session = Depends(get_db)):
             full_name="Admin User",
             hashed_password=get_password_hash("admin123"),
             subscription_tier="enterprise",
-            usage_limit=settings.ENTERPRISE_TIER_DAILY_LIMIT,
+            usage_limit=plan_registry.daily_limit("enterprise"),
             is_active=True,
             is_verified=True,
             role="admin"
@@ -41,3 +43,18 @@ async def create_admin_user(db: Session = Depends(get_db)):
         }
     else:
         raise HTTPException(status_code=403, detail="Admin creation only allowed in development mode")
+
+@router.get("/metrics/retention")
+async def get_retention_metrics(current_user: User = Depends(get_current_user)):
+    """Rows swept by the notification retention job on this worker (admin only).
+
+    Counts are per process: with several workers, each reports only the runs
+    it performed, so the figures depend on which worker serves the request.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    return retention_metrics
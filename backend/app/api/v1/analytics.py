@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from ...core.database import get_db
+from ...core.database import get_read_db
 from ...core.security import get_current_user
+from ...core.responses import FastJSONResponse
+from ...core.currency import converted_amount, missing_rates, reporting_currency
 from ...models.user import User
 from ...models.project import Project
 from ...models.task import Task
@@ -19,8 +21,9 @@ router = APIRouter()
 @router.get("/", response_model=Dict[str, Any])
 async def get_analytics(
     time_range: str = "30",  # days
+    currency: Optional[str] = None,  # Reporting currency, default the invoices' own currency or DEFAULT_CURRENCY
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get comprehensive analytics for the current user"""
     
@@ -88,42 +91,22 @@ async def get_analytics(
     ).scalar() or 0
     last_week_hours = float(last_week_hours_result) if last_week_hours_result else 0
     
-    # Revenue analytics
-    invoices_query = db.query(Invoice).join(Project).filter(Project.user_id == current_user.id)
+    # Revenue analytics, converted to the reporting currency at each invoice's date
+    currency = reporting_currency(db, current_user.id, currency)
+    revenue = converted_amount(Invoice.total_amount, Invoice.currency, Invoice.created_at, currency)
+    month_start = end_date.replace(day=1)
+    last_month_start = (month_start - timedelta(days=1)).replace(day=1)
     
-    # Total revenue
-    total_revenue_result = invoices_query.with_entities(
-        func.sum(Invoice.total_amount)
-    ).scalar() or 0
-    total_revenue = float(total_revenue_result) if total_revenue_result else 0
+    total_revenue_result, this_month_revenue_result, last_month_revenue_result, pending_revenue_result = db.query(
+        func.sum(revenue),
+        func.sum(case((Invoice.created_at >= month_start, revenue))),
+        func.sum(case((and_(Invoice.created_at >= last_month_start, Invoice.created_at < month_start), revenue))),
+        func.sum(case((Invoice.status == "pending", revenue)))
+    ).select_from(Invoice).join(Project).filter(Project.user_id == current_user.id).one()
     
-    # This month revenue
-    month_start = end_date.replace(day=1)
-    this_month_revenue_result = invoices_query.filter(
-        Invoice.created_at >= month_start
-    ).with_entities(
-        func.sum(Invoice.total_amount)
-    ).scalar() or 0
+    total_revenue = float(total_revenue_result) if total_revenue_result else 0
     this_month_revenue = float(this_month_revenue_result) if this_month_revenue_result else 0
-    
-    # Last month revenue
-    last_month_start = (month_start - timedelta(days=1)).replace(day=1)
-    last_month_revenue_result = invoices_query.filter(
-        and_(
-            Invoice.created_at >= last_month_start,
-            Invoice.created_at < month_start
-        )
-    ).with_entities(
-        func.sum(Invoice.total_amount)
-    ).scalar() or 0
     last_month_revenue = float(last_month_revenue_result) if last_month_revenue_result else 0
-    
-    # Pending revenue
-    pending_revenue_result = invoices_query.filter(
-        Invoice.status == "pending"
-    ).with_entities(
-        func.sum(Invoice.total_amount)
-    ).scalar() or 0
     pending_revenue = float(pending_revenue_result) if pending_revenue_result else 0
     
     # Clients analytics
@@ -163,7 +146,7 @@ async def get_analytics(
     if total_hours > 0:
         efficiency = (billable_hours / total_hours) * 100
     
-    return {
+    return FastJSONResponse({
         "projects": {
             "total": projects_total,
             "active": projects_active,
@@ -186,7 +169,10 @@ async def get_analytics(
             "total": total_revenue,
             "thisMonth": this_month_revenue,
             "lastMonth": last_month_revenue,
-            "pending": pending_revenue
+            "pending": pending_revenue,
+            "currency": currency,
+            # Invoices in these currencies have no exchange rate and are left out of the totals
+            "missingRates": missing_rates(db, current_user.id, currency)
         },
         "clients": {
             "total": clients_total,
@@ -200,50 +186,54 @@ async def get_analytics(
         },
         "timeRange": time_range,
         "generatedAt": datetime.utcnow().isoformat()
-    }
+    })
 
 @router.get("/revenue-trend", response_model=Dict[str, Any])
 async def get_revenue_trend(
     days: int = 30,
+    currency: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get revenue trend over time"""
     
     end_date = datetime.utcnow()
-    start_date = end_date - timedelta(days=days)
+    # Whole calendar days, ending with today
+    start_date = (end_date - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    # Daily revenue in the reporting currency, grouped in one query
+    currency = reporting_currency(db, current_user.id, currency)
+    revenue = converted_amount(Invoice.total_amount, Invoice.currency, Invoice.created_at, currency)
+    day = func.date(Invoice.created_at)
+    revenue_by_day = {
+        str(invoice_day): revenue_result
+        for invoice_day, revenue_result in db.query(day, func.sum(revenue)).select_from(Invoice).join(Project).filter(
+            Project.user_id == current_user.id,
+            Invoice.created_at >= start_date
+        ).group_by(day)
+    }
     
-    # Get daily revenue data
     daily_revenue = []
     for i in range(days):
-        date = start_date + timedelta(days=i)
-        next_date = date + timedelta(days=1)
-        
-        revenue_result = db.query(Invoice).join(Project).filter(
-            and_(
-                Project.user_id == current_user.id,
-                Invoice.created_at >= date,
-                Invoice.created_at < next_date
-            )
-        ).with_entities(
-            func.sum(Invoice.total_amount)
-        ).scalar() or 0
-        
+        date = (start_date + timedelta(days=i)).strftime("%Y-%m-%d")
+        revenue_result = revenue_by_day.get(date)
         daily_revenue.append({
-            "date": date.strftime("%Y-%m-%d"),
+            "date": date,
             "revenue": float(revenue_result) if revenue_result else 0
         })
     
-    return {
+    return FastJSONResponse({
         "dailyRevenue": daily_revenue,
         "totalRevenue": sum(day["revenue"] for day in daily_revenue),
-        "averageDaily": sum(day["revenue"] for day in daily_revenue) / days if days > 0 else 0
-    }
+        "averageDaily": sum(day["revenue"] for day in daily_revenue) / days if days > 0 else 0,
+        "currency": currency,
+        "missingRates": missing_rates(db, current_user.id, currency)
+    })
 
 @router.get("/project-performance", response_model=Dict[str, Any])
 async def get_project_performance(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get project performance metrics"""
     
@@ -275,7 +265,7 @@ async def get_project_performance(
             "deadline": project.deadline.isoformat() if project.deadline else None
         })
     
-    return {
+    return FastJSONResponse({
         "projects": project_metrics,
         "averageCompletionRate": sum(p["completionRate"] for p in project_metrics) / len(project_metrics) if project_metrics else 0
-    }
+    })
@@ -13,7 +13,7 @@ from ...core.security import (
     get_password_hash,
     get_current_user
 )
-from ...core.config import settings
+from ...core.plans import plan_registry
 from ...core.rate_limiter import rate_limiter
 from ...models.user import User
 from ...schemas.auth import (
@@ -89,7 +89,7 @@ async def register(
         full_name=request.full_name,
         hashed_password=hashed_password,
         subscription_tier="free",
-        usage_limit=settings.FREE_TIER_DAILY_LIMIT
+        usage_limit=plan_registry.daily_limit("free")
     )
     
     try:
@@ -3,8 +3,9 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.responses import FastJSONResponse
 from ...models.user import User
 from ...models.client import Client
 from ...models.project import Project
@@ -18,7 +19,7 @@ router = APIRouter()
 @router.get("/projects/{client_token}")
 async def get_client_projects(
     client_token: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get projects visible to a client using their token"""
     
@@ -95,20 +96,20 @@ async def get_client_projects(
             ]
         })
     
-    return {
+    return FastJSONResponse({
         "client": {
             "name": client.name,
             "email": client.email,
             "company": client.company
         },
         "projects": client_projects
-    }
+    })
 
 @router.get("/invoices/{client_token}")
 async def get_client_invoices(
     client_token: str,
     status: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get invoices visible to a client using their token"""
     
@@ -156,20 +157,20 @@ async def get_client_invoices(
             ]
         })
     
-    return {
+    return FastJSONResponse({
         "client": {
             "name": client.name,
             "email": client.email,
             "company": client.company
         },
         "invoices": client_invoices
-    }
+    })
 
 @router.get("/project/{project_id}/{client_token}")
 async def get_client_project_details(
     project_id: int,
     client_token: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get detailed project information for a client"""
     
@@ -210,7 +211,7 @@ async def get_client_project_details(
     completed_milestones = len([m for m in milestones if m.status == "completed"])
     total_hours = sum(log.hours_worked for log in work_logs)
     
-    return {
+    return FastJSONResponse({
         "project": {
             "id": project.id,
             "title": project.title,
@@ -273,7 +274,7 @@ async def get_client_project_details(
             }
             for log in work_logs
         ]
-    }
+    })
 
 @router.post("/project/{project_id}/comment/{client_token}")
 async def add_project_comment(
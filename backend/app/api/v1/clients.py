@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
+from ...core.fieldsets import parse_fields, select_fields, sparse_response
+from ...core.search import search_filter
 from ...models.user import User
 from ...models.client import Client
 from ...schemas.client import (
@@ -18,28 +21,32 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ClientResponse])
 async def get_clients(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
     search: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all clients for the current user"""
     query = db.query(Client).filter(Client.user_id == current_user.id)
     
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Client.name.ilike(search_filter)) |
-            (Client.email.ilike(search_filter)) |
-            (Client.company.ilike(search_filter))
-        )
+        query = query.filter(search_filter(db, Client, search))
     
     if is_active is not None:
         query = query.filter(Client.is_active == is_active)
     
-    clients = query.offset(skip).limit(limit).all()
+    field_names = parse_fields(fields, Client, ClientResponse)
+    if field_names:
+        query = select_fields(query, Client, field_names)
+    
+    clients = paginate(query, Client, response, skip, limit, cursor)
+    if field_names:
+        return sparse_response(clients, field_names, ClientResponse, response)
     return clients
 
 @router.get("/{client_id}", response_model=ClientResponse)
@@ -202,7 +209,7 @@ async def toggle_client_status(
 @router.get("/stats/summary")
 async def get_client_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get client statistics"""
     total_clients = db.query(Client).filter(Client.user_id == current_user.id).count()
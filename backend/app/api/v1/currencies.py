@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+from decimal import Decimal
+
+from ...core.database import get_read_db
+from ...core.security import get_current_user
+from ...core.config import settings
+from ...core.currency import rate_cache, resolve_currency
+from ...models.user import User
+
+router = APIRouter()
+
+@router.get("/")
+async def get_currencies(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get supported currencies with their latest exchange rates"""
+    return {
+        "default_currency": settings.DEFAULT_CURRENCY,
+        "base_currency": settings.CURRENCY_RATE_BASE,
+        "rates": rate_cache.latest(db, settings.SUPPORTED_CURRENCIES)
+    }
+
+@router.get("/convert")
+async def convert_amount(
+    amount: Decimal,
+    from_currency: str = Query(..., alias="from"),
+    to_currency: Optional[str] = Query(None, alias="to"),
+    on: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Convert an amount between currencies at the rate of a given date (default: latest)"""
+    from_currency = resolve_currency(from_currency)
+    to_currency = resolve_currency(to_currency)
+    converted = rate_cache.convert(db, amount, from_currency, to_currency, on or date.max)
+    if converted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No exchange rate loaded for {from_currency} to {to_currency}"
+        )
+
+    return {
+        "amount": amount,
+        "from": from_currency,
+        "to": to_currency,
+        "converted": round(converted, 2)
+    }
@@ -1,23 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import case, func, insert
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Tuple
 from datetime import datetime
-from decimal import Decimal
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+from decimal import Decimal, ROUND_HALF_UP
+import aiofiles
 import os
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
+from ...core.fieldsets import parse_fields, select_fields, sparse_response
+from ...core.search import search_filter
+from ...core.invoice_pdf import get_invoice_pdf
+from ...core.responses import ranged_file_response
+from ...core.invoice_mail import queue_invoice_email
+from ...core.invoice_numbers import next_invoice_numbers
+from ...core.currency import converted_amount, missing_rates, reporting_currency
 from ...models.user import User
 from ...models.invoice import Invoice, InvoiceItem
 from ...models.client import Client
 from ...models.project import Project
 from ...schemas.invoice import (
     InvoiceCreate,
+    InvoiceBulkCreate,
+    InvoiceBulkResponse,
     InvoiceUpdate,
     InvoiceResponse,
     InvoiceListResponse,
@@ -27,21 +34,21 @@ from ...schemas.invoice import (
 
 router = APIRouter()
 
-def generate_invoice_number(user_id: int, db: Session) -> str:
-    """Generate unique invoice number"""
-    count = db.query(Invoice).filter(Invoice.user_id == user_id).count()
-    return f"INV-{user_id:04d}-{count + 1:04d}"
+CENTS = Decimal("0.01")
 
 @router.get("/", response_model=List[InvoiceResponse])
 async def get_invoices(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
     status: Optional[str] = Query(None),
     client_id: Optional[int] = Query(None),
     project_id: Optional[int] = Query(None),
     search: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all invoices for the current user"""
     query = db.query(Invoice).filter(Invoice.user_id == current_user.id)
@@ -53,14 +60,18 @@ async def get_invoices(
     if project_id:
         query = query.filter(Invoice.project_id == project_id)
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            (Invoice.invoice_number.ilike(search_filter)) |
-            (Invoice.title.ilike(search_filter)) |
-            (Invoice.client_name.ilike(search_filter))
-        )
-    
-    invoices = query.offset(skip).limit(limit).all()
+        query = query.filter(search_filter(db, Invoice, search))
+    
+    field_names = parse_fields(fields, Invoice, InvoiceResponse)
+    if field_names:
+        query = select_fields(query, Invoice, field_names)
+    else:
+        # Load line items for the whole page in one query instead of one per invoice
+        query = query.options(selectinload(Invoice.items))
+    
+    invoices = paginate(query, Invoice, response, skip, limit, cursor)
+    if field_names:
+        return sparse_response(invoices, field_names, InvoiceResponse, response)
     return invoices
 
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
@@ -83,85 +94,95 @@ async def get_invoice(
     
     return invoice
 
-@router.post("/", response_model=InvoiceResponse)
-async def create_invoice(
-    invoice: InvoiceCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Create a new invoice"""
-    # Generate invoice number
-    invoice_number = generate_invoice_number(current_user.id, db)
-    
-    # Verify client exists if client_id is provided
-    if invoice.client_id:
-        client = db.query(Client).filter(
-            Client.id == invoice.client_id,
-            Client.user_id == current_user.id
-        ).first()
-        if not client:
+def verify_invoice_references(db: Session, user_id: int, invoices: List[InvoiceCreate]):
+    """Check that every referenced client and project belongs to the user, one query each"""
+    client_ids = {invoice.client_id for invoice in invoices if invoice.client_id}
+    if client_ids:
+        found = {client_id for (client_id,) in db.query(Client.id).filter(
+            Client.id.in_(client_ids),
+            Client.user_id == user_id
+        )}
+        if client_ids - found:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Client not found"
             )
     
-    # Verify project exists if project_id is provided
-    if invoice.project_id:
-        project = db.query(Project).filter(
-            Project.id == invoice.project_id,
-            Project.user_id == current_user.id
-        ).first()
-        if not project:
+    project_ids = {invoice.project_id for invoice in invoices if invoice.project_id}
+    if project_ids:
+        found = {project_id for (project_id,) in db.query(Project.id).filter(
+            Project.id.in_(project_ids),
+            Project.user_id == user_id
+        )}
+        if project_ids - found:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Project not found"
             )
+
+def invoice_totals(subtotal: Decimal, tax_rate: Decimal) -> dict:
+    tax_amount = (subtotal * tax_rate / 100).quantize(CENTS, rounding=ROUND_HALF_UP)
+    return {"subtotal": subtotal, "tax_amount": tax_amount, "total_amount": subtotal + tax_amount}
+
+def insert_invoices(db: Session, user_id: int, invoices: List[InvoiceCreate]) -> Tuple[List[int], List[str]]:
+    """Insert invoices and their items with one batched statement each; returns (ids, numbers)"""
+    rows = []
+    for invoice in invoices:
+        row = invoice.model_dump(exclude={"items"})
+        # Invoices with line items are totalled from them; others keep the totals sent
+        if invoice.items:
+            row.update(invoice_totals(sum(item.total_price for item in invoice.items), invoice.tax_rate))
+        row.update(user_id=user_id)
+        rows.append(row)
+    
+    # Allocate numbers only once the rows are built: from here the sequence row
+    # stays locked through both inserts until the caller commits
+    numbers = next_invoice_numbers(db, user_id, len(invoices))
+    for row, number in zip(rows, numbers):
+        row["invoice_number"] = number
+    
+    ids = db.execute(
+        insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    
+    item_rows = [
+        {**item.model_dump(), "invoice_id": invoice_id}
+        for invoice_id, invoice in zip(ids, invoices)
+        for item in invoice.items
+    ]
+    if item_rows:
+        db.execute(insert(InvoiceItem), item_rows)
+    
+    return ids, numbers
+
+@router.post("/", response_model=InvoiceResponse)
+async def create_invoice(
+    invoice: InvoiceCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create a new invoice"""
+    verify_invoice_references(db, current_user.id, [invoice])
     
-    # Create invoice
-    db_invoice = Invoice(
-        invoice_number=invoice_number,
-        title=invoice.title,
-        description=invoice.description,
-        client_id=invoice.client_id,
-        client_name=invoice.client_name,
-        client_email=invoice.client_email,
-        client_address=invoice.client_address,
-        project_id=invoice.project_id,
-        project_title=invoice.project_title,
-        subtotal=invoice.subtotal,
-        tax_rate=invoice.tax_rate,
-        tax_amount=invoice.tax_amount,
-        total_amount=invoice.total_amount,
-        currency=invoice.currency,
-        status=invoice.status,
-        due_date=invoice.due_date,
-        notes=invoice.notes,
-        terms=invoice.terms,
-        is_recurring=invoice.is_recurring,
-        recurring_frequency=invoice.recurring_frequency,
-        user_id=current_user.id
-    )
-    
-    db.add(db_invoice)
+    ids, _ = insert_invoices(db, current_user.id, [invoice])
     db.commit()
-    db.refresh(db_invoice)
-    
-    # Create invoice items
-    for item_data in invoice.items:
-        db_item = InvoiceItem(
-            invoice_id=db_invoice.id,
-            description=item_data.description,
-            quantity=item_data.quantity,
-            unit_price=item_data.unit_price,
-            total_price=item_data.total_price,
-            task_id=item_data.task_id
-        )
-        db.add(db_item)
     
+    return db.query(Invoice).options(selectinload(Invoice.items)).filter(Invoice.id == ids[0]).one()
+
+@router.post("/bulk", response_model=InvoiceBulkResponse)
+async def create_invoices_bulk(
+    bulk: InvoiceBulkCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create many invoices in one transaction"""
+    verify_invoice_references(db, current_user.id, bulk.invoices)
+    
+    ids, numbers = insert_invoices(db, current_user.id, bulk.invoices)
     db.commit()
-    db.refresh(db_invoice)
     
-    return db_invoice
+    return {"ids": ids, "invoice_numbers": numbers}
 
 @router.put("/{invoice_id}", response_model=InvoiceResponse)
 async def update_invoice(
@@ -211,6 +232,16 @@ async def update_invoice(
     for field, value in update_data.items():
         setattr(invoice, field, value)
     
+    # A new tax rate re-totals invoices with line items, unless totals were sent too
+    if "tax_rate" in update_data and not update_data.keys() & {"subtotal", "tax_amount", "total_amount"}:
+        item_count, subtotal = db.query(
+            func.count(InvoiceItem.id),
+            func.coalesce(func.sum(InvoiceItem.total_price), 0)
+        ).filter(InvoiceItem.invoice_id == invoice.id).one()
+        if item_count:
+            for field, value in invoice_totals(Decimal(subtotal), invoice.tax_rate).items():
+                setattr(invoice, field, value)
+    
     invoice.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(invoice)
@@ -287,74 +318,38 @@ async def update_invoice_status(
 
 @router.get("/stats/summary", response_model=InvoiceStatsResponse)
 async def get_invoice_stats(
+    currency: Optional[str] = Query(None, description="Reporting currency, defaults to the invoices' own currency or DEFAULT_CURRENCY"),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Get invoice statistics"""
-    invoices = db.query(Invoice).filter(Invoice.user_id == current_user.id).all()
-    
-    total_invoices = len(invoices)
-    total_amount = sum(invoice.total_amount for invoice in invoices)
-    paid_amount = sum(invoice.total_amount for invoice in invoices if invoice.status == "paid")
-    pending_amount = sum(invoice.total_amount for invoice in invoices if invoice.status == "sent")
-    overdue_amount = sum(invoice.total_amount for invoice in invoices if invoice.status == "overdue")
-    draft_amount = sum(invoice.total_amount for invoice in invoices if invoice.status == "draft")
-    
-    return InvoiceStatsResponse(
-        total_invoices=total_invoices,
-        total_amount=total_amount,
-        paid_amount=paid_amount,
-        pending_amount=pending_amount,
-        overdue_amount=overdue_amount,
-        draft_amount=draft_amount
-    )
-
-@router.put("/{invoice_id}", response_model=InvoiceResponse)
-async def update_invoice(
-    invoice_id: int,
-    invoice_update: InvoiceUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Update an existing invoice"""
-    invoice = db.query(Invoice).filter(
-        Invoice.id == invoice_id,
-        Invoice.user_id == current_user.id
-    ).first()
-    
-    if not invoice:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Invoice not found"
-        )
-    
-    # Update invoice fields
-    update_data = invoice_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(invoice, field, value)
-    
-    # Recalculate total if items were updated
-    if "items" in update_data:
-        total_amount = sum(item.quantity * item.unit_price for item in invoice.items)
-        invoice.total_amount = total_amount
-    
-    invoice.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(invoice)
-    
-    return invoice
+    """Get invoice statistics, with amounts converted to one currency"""
+    currency = reporting_currency(db, current_user.id, currency)
+    amount = converted_amount(Invoice.total_amount, Invoice.currency, Invoice.created_at, currency)
+    
+    def status_total(invoice_status: str):
+        return func.coalesce(func.sum(case((Invoice.status == invoice_status, amount))), 0)
+    
+    totals = db.query(
+        func.count(Invoice.id).label("total_invoices"),
+        func.coalesce(func.sum(amount), 0).label("total_amount"),
+        status_total("paid").label("paid_amount"),
+        status_total("sent").label("pending_amount"),
+        status_total("overdue").label("overdue_amount"),
+        status_total("draft").label("draft_amount")
+    ).filter(Invoice.user_id == current_user.id).one()
+    
+    return InvoiceStatsResponse(currency=currency, missing_rates=missing_rates(db, current_user.id, currency), **totals._asdict())
 
 @router.post("/{invoice_id}/send")
 async def send_invoice(
     invoice_id: int,
-    background_tasks: BackgroundTasks,
     recipient_email: Optional[str] = None,
     custom_message: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Send invoice via email"""
-    invoice = db.query(Invoice).filter(
+    invoice = db.query(Invoice).options(selectinload(Invoice.items)).filter(
         Invoice.id == invoice_id,
         Invoice.user_id == current_user.id
     ).first()
@@ -380,83 +375,25 @@ async def send_invoice(
     invoice.status = "sent"
     invoice.sent_date = datetime.utcnow()
     invoice.updated_at = datetime.utcnow()
-    db.commit()
     
-    # Send email in background
-    background_tasks.add_task(
-        send_invoice_email,
-        invoice,
-        client_email,
-        custom_message,
-        current_user
-    )
+    # Queue the email in the same transaction, with the PDF as it stands now
+    pdf_path, _ = await get_invoice_pdf(invoice, current_user)
+    async with aiofiles.open(pdf_path, "rb") as f:
+        pdf = await f.read()
+    queue_invoice_email(db, invoice, current_user, client_email, pdf, custom_message)
+    db.commit()
     
     return {"message": "Invoice sent successfully"}
 
-async def send_invoice_email(
-    invoice: Invoice,
-    recipient_email: str,
-    custom_message: Optional[str],
-    user: User
-):
-    """Send invoice email (background task)"""
-    try:
-        # Create email content
-        subject = f"Invoice {invoice.invoice_number} from {user.full_name or user.username}"
-        
-        # HTML email template
-        html_content = f"""
-        <html>
-        <body>
-            <h2>Invoice {invoice.invoice_number}</h2>
-            <p>Dear {invoice.client.name if invoice.client else 'Client'},</p>
-            
-            <p>Please find attached your invoice for the services provided.</p>
-            
-            <h3>Invoice Details:</h3>
-            <ul>
-                <li><strong>Invoice Number:</strong> {invoice.invoice_number}</li>
-                <li><strong>Date:</strong> {invoice.invoice_date.strftime('%B %d, %Y')}</li>
-                <li><strong>Due Date:</strong> {invoice.due_date.strftime('%B %d, %Y') if invoice.due_date else 'N/A'}</li>
-                <li><strong>Total Amount:</strong> ${invoice.total_amount:,.2f}</li>
-            </ul>
-            
-            {f'<p>{custom_message}</p>' if custom_message else ''}
-            
-            <p>Thank you for your business!</p>
-            
-            <p>Best regards,<br>
-            {user.full_name or user.username}<br>
-            {user.email}</p>
-        </body>
-        </html>
-        """
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = user.email
-        msg['To'] = recipient_email
-        
-        # Add HTML content
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
-        
-        # Send email (you'll need to configure SMTP settings)
-        # This is a placeholder - you'll need to implement actual email sending
-        print(f"Would send invoice {invoice.invoice_number} to {recipient_email}")
-        
-    except Exception as e:
-        print(f"Failed to send invoice email: {e}")
-
 @router.get("/{invoice_id}/pdf")
 async def generate_invoice_pdf(
     invoice_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Generate PDF for invoice"""
-    invoice = db.query(Invoice).filter(
+    invoice = db.query(Invoice).options(selectinload(Invoice.items)).filter(
         Invoice.id == invoice_id,
         Invoice.user_id == current_user.id
     ).first()
@@ -467,5 +404,8 @@ async def generate_invoice_pdf(
             detail="Invoice not found"
         )
     
-    # This would generate a PDF - placeholder for now
-    return {"message": "PDF generation not yet implemented", "invoice_id": invoice_id}
+    # Rendered once per distinct content, then served from the cache
+    path, digest = await get_invoice_pdf(invoice, current_user)
+    return ranged_file_response(
+        request, path, "application/pdf", f"{invoice.invoice_number}.pdf", inline=True, etag=digest
+    )
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
 from ...models.user import User
 from ...models.milestone import Milestone
 from ...models.project import Project
@@ -21,14 +22,16 @@ router = APIRouter()
 
 @router.get("/", response_model=List[MilestoneResponse])
 async def get_milestones(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
     project_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
     priority: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all milestones for the current user"""
     query = db.query(Milestone).filter(Milestone.user_id == current_user.id)
@@ -46,7 +49,7 @@ async def get_milestones(
             (Milestone.description.ilike(search_filter))
         )
     
-    milestones = query.offset(skip).limit(limit).all()
+    milestones = paginate(query, Milestone, response, skip, limit, cursor)
     return milestones
 
 @router.get("/{milestone_id}", response_model=MilestoneResponse)
@@ -295,7 +298,7 @@ async def update_milestone_progress(
 async def get_milestone_stats(
     project_id: Optional[int] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get milestone statistics"""
     query = db.query(Milestone).filter(Milestone.user_id == current_user.id)
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
+from ...core.fieldsets import parse_fields, select_fields, sparse_response
+from ...core.deadlines import deadline_stats
+from ...core.notifications import (
+    adjust_counters,
+    get_counters,
+    notification_state,
+    publish_counters,
+    update_notifications
+)
 from ...models.user import User
 from ...models.notification import Notification, NotificationType, NotificationPriority
 from ...schemas.notification import (
@@ -19,13 +29,16 @@ router = APIRouter()
 
 @router.get("/", response_model=List[NotificationResponse])
 async def get_notifications(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
     unread_only: bool = Query(False),
     priority: Optional[str] = Query(None),
     type: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get notifications for the current user"""
     query = db.query(Notification).filter(
@@ -48,7 +61,13 @@ async def get_notifications(
         (Notification.expires_at > datetime.utcnow())
     )
     
-    notifications = query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+    field_names = parse_fields(fields, Notification, NotificationResponse)
+    if field_names:
+        query = select_fields(query, Notification, field_names)
+    
+    notifications = paginate(query.order_by(Notification.created_at.desc()), Notification, response, skip, limit, cursor)
+    if field_names:
+        return sparse_response(notifications, field_names, NotificationResponse, response)
     return notifications
 
 @router.get("/{notification_id}", response_model=NotificationResponse)
@@ -92,8 +111,11 @@ async def create_notification(
     )
     
     db.add(db_notification)
+    db.flush()
+    changed = adjust_counters(db, [(current_user.id, None, notification_state(db_notification))])
     db.commit()
     db.refresh(db_notification)
+    publish_counters(db, changed)
     
     return db_notification
 
@@ -116,17 +138,20 @@ async def update_notification(
             detail="Notification not found"
         )
     
+    # Set read_at timestamp when marking as read
+    if notification_update.is_read and not notification.is_read:
+        notification.read_at = datetime.utcnow()
+    
     # Update only provided fields
+    before = notification_state(notification)
     update_data = notification_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(notification, field, value)
     
-    # Set read_at timestamp when marking as read
-    if notification_update.is_read and not notification.is_read:
-        notification.read_at = datetime.utcnow()
-    
+    changed = adjust_counters(db, [(current_user.id, before, notification_state(notification))])
     db.commit()
     db.refresh(notification)
+    publish_counters(db, changed)
     
     return notification
 
@@ -148,8 +173,10 @@ async def delete_notification(
             detail="Notification not found"
         )
     
+    changed = adjust_counters(db, [(current_user.id, notification_state(notification), None)])
     db.delete(notification)
     db.commit()
+    publish_counters(db, changed)
     
     return {"message": "Notification deleted successfully"}
 
@@ -171,9 +198,13 @@ async def mark_notification_read(
             detail="Notification not found"
         )
     
+    before = notification_state(notification)
+    if not notification.is_read:
+        notification.read_at = datetime.utcnow()
     notification.is_read = True
-    notification.read_at = datetime.utcnow()
+    changed = adjust_counters(db, [(current_user.id, before, notification_state(notification))])
     db.commit()
+    publish_counters(db, changed)
     
     return {"message": "Notification marked as read"}
 
@@ -183,14 +214,15 @@ async def mark_all_notifications_read(
     db: Session = Depends(get_db)
 ):
     """Mark all notifications as read"""
-    db.query(Notification).filter(
+    changed = update_notifications(db, [
         Notification.user_id == current_user.id,
         Notification.is_read == False
-    ).update({
+    ], {
         "is_read": True,
         "read_at": datetime.utcnow()
     })
     db.commit()
+    publish_counters(db, changed)
     
     return {"message": "All notifications marked as read"}
 
@@ -200,41 +232,14 @@ async def get_notification_stats(
     db: Session = Depends(get_db)
 ):
     """Get notification statistics"""
-    # Total notifications
-    total_notifications = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_archived == False
-    ).count()
-    
-    # Unread notifications
-    unread_notifications = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False,
-        Notification.is_archived == False
-    ).count()
-    
-    # High priority unread
-    high_priority_unread = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False,
-        Notification.is_archived == False,
-        Notification.priority.in_([NotificationPriority.HIGH, NotificationPriority.URGENT])
-    ).count()
-    
-    # Overdue tasks (mock for now - would need task integration)
-    overdue_tasks = 0
-    
-    # Overdue invoices (mock for now - would need invoice integration)
-    overdue_invoices = 0
+    # Served from the cached counters instead of counting notifications
+    counters = get_counters(db, current_user.id)
     
-    # Upcoming deadlines (mock for now - would need project integration)
-    upcoming_deadlines = 0
+    deadlines = deadline_stats(db, current_user.id)
     
     return NotificationStatsResponse(
-        total_notifications=total_notifications,
-        unread_notifications=unread_notifications,
-        high_priority_unread=high_priority_unread,
-        overdue_tasks=overdue_tasks,
-        overdue_invoices=overdue_invoices,
-        upcoming_deadlines=upcoming_deadlines
+        total_notifications=counters.total,
+        unread_notifications=counters.unread,
+        high_priority_unread=counters.high_priority_unread,
+        **deadlines
     )
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import stripe
+import json
 from datetime import datetime
 
 from ...core.database import get_db
 from ...core.security import get_current_user
 from ...core.config import settings
+from ...core.plans import apply_plan, plan_registry
+from ...core.stripe_client import CircuitOpenError, stripe_client
+from ...core.stripe_webhooks import ACTIVE_SUBSCRIPTION_STATUSES, record_event
 from ...models.user import User
+from ...models.payment import StripeSubscription
 from ...schemas.payment import (
     SubscriptionPlan,
     PaymentIntent,
@@ -17,77 +22,27 @@ from ...schemas.payment import (
 
 router = APIRouter()
 
-# Initialize Stripe
-if settings.STRIPE_SECRET_KEY:
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-
 @router.get("/plans", response_model=List[SubscriptionPlan])
-async def get_subscription_plans():
+async def get_subscription_plans(request: Request):
     """Get available subscription plans"""
-    return [
-        SubscriptionPlan(
-            id="free",
-            name="Free",
-            price=0,
-            currency="USD",
-            interval="month",
-            features=[
-                "10 AI requests per day",
-                "Basic project management",
-                "Community support"
-            ],
-            limits={
-                "daily_ai_requests": 10,
-                "storage_gb": 0.1,
-                "projects": 5
-            }
-        ),
-        SubscriptionPlan(
-            id="pro",
-            name="Pro",
-            price=2900,  # $29.00 in cents
-            currency="USD",
-            interval="month",
-            features=[
-                "100 AI requests per day",
-                "Advanced project management",
-                "Priority support",
-                "File uploads",
-                "Time tracking"
-            ],
-            limits={
-                "daily_ai_requests": 100,
-                "storage_gb": 1,
-                "projects": 50
-            }
-        ),
-        SubscriptionPlan(
-            id="enterprise",
-            name="Enterprise",
-            price=9900,  # $99.00 in cents
-            currency="USD",
-            interval="month",
-            features=[
-                "1000 AI requests per day",
-                "Unlimited projects",
-                "Custom integrations",
-                "Dedicated support",
-                "Team collaboration"
-            ],
-            limits={
-                "daily_ai_requests": 1000,
-                "storage_gb": 10,
-                "projects": -1  # Unlimited
-            }
-        )
-    ]
+    headers = {
+        "ETag": f'"{plan_registry.etag}"',
+        "Cache-Control": f"public, max-age={settings.PLAN_CATALOG_CACHE_SECONDS}"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=plan_registry.body, media_type="application/json", headers=headers)
 
 @router.post("/create-payment-intent", response_model=PaymentIntent)
 async def create_payment_intent(
     plan_id: str,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user)
 ):
-    """Create a payment intent for subscription"""
+    """Create a payment intent for subscription.
+
+    Send an Idempotency-Key header to make retried requests return the same intent.
+    """
     
     if not settings.STRIPE_SECRET_KEY:
         raise HTTPException(
@@ -96,8 +51,7 @@ async def create_payment_intent(
         )
     
     # Get plan details
-    plans = await get_subscription_plans()
-    plan = next((p for p in plans if p.id == plan_id), None)
+    plan = plan_registry.get(plan_id)
     
     if not plan:
         raise HTTPException(
@@ -116,7 +70,9 @@ async def create_payment_intent(
     
     try:
         # Create Stripe payment intent
-        intent = stripe.PaymentIntent.create(
+        intent = await stripe_client.call(
+            stripe.PaymentIntent.create,
+            idempotency_key=f"payment-intent-{current_user.id}-{idempotency_key}" if idempotency_key else None,
             amount=plan.price,
             currency=plan.currency.lower(),
             metadata={
@@ -132,6 +88,11 @@ async def create_payment_intent(
             status=intent.status
         )
         
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except stripe.error.StripeError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -148,8 +109,7 @@ async def subscribe_to_plan(
     """Subscribe user to a plan"""
     
     # Get plan details
-    plans = await get_subscription_plans()
-    plan = next((p for p in plans if p.id == plan_id), None)
+    plan = plan_registry.get(plan_id)
     
     if not plan:
         raise HTTPException(
@@ -157,16 +117,8 @@ async def subscribe_to_plan(
             detail="Plan not found"
         )
     
-    # Update user subscription
-    current_user.subscription_tier = plan_id
-    
-    # Update usage limits based on plan
-    if plan_id == "free":
-        current_user.usage_limit = 10
-    elif plan_id == "pro":
-        current_user.usage_limit = 100
-    elif plan_id == "enterprise":
-        current_user.usage_limit = 1000
+    # Update user subscription and its usage limit
+    apply_plan(current_user, plan_id)
     
     db.commit()
     
@@ -178,8 +130,7 @@ async def get_current_subscription(
 ):
     """Get current user subscription"""
     
-    plans = await get_subscription_plans()
-    current_plan = next((p for p in plans if p.id == current_user.subscription_tier), None)
+    current_plan = plan_registry.get(current_user.subscription_tier)
     
     return SubscriptionResponse(
         plan_id=current_user.subscription_tier,
@@ -197,9 +148,40 @@ async def cancel_subscription(
 ):
     """Cancel current subscription"""
     
+    # Stop billing first, so a Stripe outage can't leave the user downgraded but still charged
+    subscriptions = db.query(StripeSubscription).filter(
+        StripeSubscription.user_id == current_user.id,
+        StripeSubscription.status.in_(ACTIVE_SUBSCRIPTION_STATUSES)
+    ).all()
+    if subscriptions and not settings.STRIPE_SECRET_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment service not configured"
+        )
+    for subscription in subscriptions:
+        try:
+            await stripe_client.call(
+                stripe.Subscription.cancel,
+                subscription.id,
+                idempotency_key=f"cancel-subscription-{subscription.id}"
+            )
+        except stripe.error.InvalidRequestError:
+            # Already canceled or deleted on Stripe's side
+            pass
+        except CircuitOpenError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
+            )
+        except stripe.error.StripeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Payment error: {str(e)}"
+            )
+        subscription.status = "canceled"
+    
     # Downgrade to free plan
-    current_user.subscription_tier = "free"
-    current_user.usage_limit = 10
+    apply_plan(current_user, plan_registry.default.id)
     current_user.usage_count = 0  # Reset usage
     
     db.commit()
@@ -216,8 +198,44 @@ async def get_payment_methods(
     return []
 
 @router.post("/webhook")
-async def stripe_webhook(request: dict):
-    """Handle Stripe webhooks"""
-    # Implement Stripe webhook handling
-    # This should verify the webhook signature and process events
-    return {"status": "received"}
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Handle Stripe webhooks: verify and store the event, then acknowledge.
+
+    Events are applied by the stripe_events background job, so Stripe gets
+    its response quickly; redeliveries of a stored event are acknowledged
+    without being stored again.
+    """
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment service not configured"
+        )
+    
+    try:
+        payload = (await request.body()).decode("utf-8")
+        stripe.WebhookSignature.verify_header(
+            payload,
+            stripe_signature or "",
+            settings.STRIPE_WEBHOOK_SECRET,
+            settings.STRIPE_WEBHOOK_TOLERANCE_SECONDS
+        )
+        event = json.loads(payload)
+        if not isinstance(event.get("id"), str) or not isinstance(event.get("type"), str) or not isinstance(event.get("created"), int):
+            raise ValueError("Not a Stripe event")
+    except stripe.error.SignatureVerificationError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook signature"
+        )
+    except (ValueError, AttributeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook payload"
+        )
+    
+    stored = record_event(db, event, payload)
+    return {"status": "received" if stored else "duplicate"}
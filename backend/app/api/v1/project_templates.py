@@ -1,16 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
 
 from ...core.database import get_db
 from ...core.security import get_current_user
+from ...core.project_templates import InvalidTemplateError, instantiate_template
 from ...models.user import User
 from ...models.project_template import ProjectTemplate
-from ...models.project import Project
-from ...models.task import Task
-from ...models.milestone import Milestone
 from ...schemas.project_template import (
     ProjectTemplateCreate,
     ProjectTemplateUpdate,
@@ -163,68 +160,13 @@ async def create_project_from_template(
             detail="Project template not found"
         )
     
-    # Calculate dates
-    start_date = request.start_date or datetime.utcnow()
-    deadline = request.deadline
-    if not deadline and template.default_duration_days:
-        deadline = start_date + timedelta(days=template.default_duration_days)
-    
-    # Create project
-    project = Project(
-        title=request.project_name,
-        description=template.description,
-        status="active",
-        client_name=request.client_name,
-        client_email=request.client_email,
-        budget=request.budget or template.default_budget,
-        currency=request.currency or template.default_currency,
-        start_date=start_date,
-        deadline=deadline,
-        hourly_rate=request.budget or template.default_hourly_rate,
-        user_id=current_user.id
-    )
-    
-    db.add(project)
-    db.commit()
-    db.refresh(project)
-    
-    # Create tasks from template
-    if template.default_tasks:
-        try:
-            default_tasks = json.loads(template.default_tasks)
-            for task_data in default_tasks:
-                task = Task(
-                    title=task_data.get("title", ""),
-                    description=task_data.get("description", ""),
-                    status="pending",
-                    priority=task_data.get("priority", "medium"),
-                    project_id=project.id,
-                    user_id=current_user.id
-                )
-                db.add(task)
-        except json.JSONDecodeError:
-            pass  # Skip if JSON is invalid
-    
-    # Create milestones from template
-    if template.default_milestones:
-        try:
-            default_milestones = json.loads(template.default_milestones)
-            for milestone_data in default_milestones:
-                milestone = Milestone(
-                    title=milestone_data.get("title", ""),
-                    description=milestone_data.get("description", ""),
-                    status="pending",
-                    due_date=start_date + timedelta(days=milestone_data.get("days_from_start", 0)),
-                    project_id=project.id,
-                    user_id=current_user.id
-                )
-                db.add(milestone)
-        except json.JSONDecodeError:
-            pass  # Skip if JSON is invalid
-    
-    # Update template usage count
-    template.usage_count += 1
-    db.commit()
+    try:
+        project = instantiate_template(db, template, request, current_user.id)
+    except InvalidTemplateError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Template is invalid: {e}"
+        )
     
     return {
         "message": "Project created successfully from template",
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
+from ...core.fieldsets import parse_fields, select_fields, sparse_response
 from ...models.user import User
 from ...models.project import Project
 from ...schemas.project import (
@@ -18,11 +20,14 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ProjectResponse])
 async def get_projects(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     status: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all projects for the current user"""
     query = db.query(Project).filter(Project.user_id == current_user.id)
@@ -30,7 +35,13 @@ async def get_projects(
     if status:
         query = query.filter(Project.status == status)
     
-    projects = query.offset(skip).limit(limit).all()
+    field_names = parse_fields(fields, Project, ProjectResponse)
+    if field_names:
+        query = select_fields(query, Project, field_names)
+    
+    projects = paginate(query, Project, response, skip, limit, cursor)
+    if field_names:
+        return sparse_response(projects, field_names, ProjectResponse, response)
     return projects
 
 @router.get("/{project_id}", response_model=ProjectResponse)
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
+from ...core.recurring import generate_and_send, last_run_date, next_occurrence
 from ...models.user import User
-from ...models.recurring_invoice import RecurringInvoice, RecurringFrequency
+from ...models.recurring_invoice import RecurringInvoice
 from ...schemas.recurring_invoice import (
     RecurringInvoiceCreate,
     RecurringInvoiceUpdate,
@@ -18,11 +21,13 @@ router = APIRouter()
 
 @router.get("/", response_model=List[RecurringInvoiceResponse])
 async def get_recurring_invoices(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get recurring invoices for the current user"""
     query = db.query(RecurringInvoice).filter(RecurringInvoice.user_id == current_user.id)
@@ -30,7 +35,7 @@ async def get_recurring_invoices(
     if is_active is not None:
         query = query.filter(RecurringInvoice.is_active == is_active)
     
-    recurring_invoices = query.order_by(RecurringInvoice.created_at.desc()).offset(skip).limit(limit).all()
+    recurring_invoices = paginate(query.order_by(RecurringInvoice.created_at.desc()), RecurringInvoice, response, skip, limit, cursor)
     return recurring_invoices
 
 @router.get("/{recurring_invoice_id}", response_model=RecurringInvoiceResponse)
@@ -61,17 +66,9 @@ async def create_recurring_invoice(
 ):
     """Create a new recurring invoice"""
     # Calculate next invoice date based on frequency
-    next_date = recurring_invoice.start_date
-    if recurring_invoice.frequency == RecurringFrequency.DAILY:
-        next_date += timedelta(days=recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.WEEKLY:
-        next_date += timedelta(weeks=recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.MONTHLY:
-        next_date += timedelta(days=30 * recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.QUARTERLY:
-        next_date += timedelta(days=90 * recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.YEARLY:
-        next_date += timedelta(days=365 * recurring_invoice.interval)
+    next_date = next_occurrence(
+        recurring_invoice.start_date, recurring_invoice.frequency, recurring_invoice.interval
+    )
     
     db_recurring_invoice = RecurringInvoice(
         title=recurring_invoice.title,
@@ -123,23 +120,19 @@ async def update_recurring_invoice(
     
     # Update only provided fields
     update_data = recurring_invoice_update.dict(exclude_unset=True)
+    previous_schedule = (recurring_invoice.frequency, recurring_invoice.interval)
     for field, value in update_data.items():
         setattr(recurring_invoice, field, value)
     
-    # Recalculate next invoice date if frequency or interval changed
-    if 'frequency' in update_data or 'interval' in update_data:
-        next_date = recurring_invoice.start_date
-        if recurring_invoice.frequency == RecurringFrequency.DAILY:
-            next_date += timedelta(days=recurring_invoice.interval)
-        elif recurring_invoice.frequency == RecurringFrequency.WEEKLY:
-            next_date += timedelta(weeks=recurring_invoice.interval)
-        elif recurring_invoice.frequency == RecurringFrequency.MONTHLY:
-            next_date += timedelta(days=30 * recurring_invoice.interval)
-        elif recurring_invoice.frequency == RecurringFrequency.QUARTERLY:
-            next_date += timedelta(days=90 * recurring_invoice.interval)
-        elif recurring_invoice.frequency == RecurringFrequency.YEARLY:
-            next_date += timedelta(days=365 * recurring_invoice.interval)
-        recurring_invoice.next_invoice_date = next_date
+    # A new frequency or interval takes effect after the last generated occurrence;
+    # until one has been generated, the pending first occurrence stands
+    if (recurring_invoice.frequency, recurring_invoice.interval) != previous_schedule:
+        last_run = last_run_date(db, recurring_invoice)
+        if last_run is not None:
+            recurring_invoice.next_invoice_date = next_occurrence(
+                last_run, recurring_invoice.frequency, recurring_invoice.interval,
+                recurring_invoice.start_date.day
+            )
     
     db.commit()
     db.refresh(recurring_invoice)
@@ -187,50 +180,24 @@ async def generate_invoice_from_recurring(
             detail="Recurring invoice not found"
         )
     
-    # Create a regular invoice from the recurring invoice
-    from ...models.invoice import Invoice
-    from ...models.invoice_item import InvoiceItem
-    
-    new_invoice = Invoice(
-        title=f"{recurring_invoice.title} - {datetime.now().strftime('%Y-%m-%d')}",
-        description=recurring_invoice.description,
-        client_id=recurring_invoice.client_id,
-        project_id=recurring_invoice.project_id,
-        subtotal=recurring_invoice.subtotal,
-        tax_rate=recurring_invoice.tax_rate,
-        tax_amount=recurring_invoice.tax_amount,
-        total_amount=recurring_invoice.total_amount,
-        status="pending",
-        payment_terms=recurring_invoice.payment_terms,
-        notes=recurring_invoice.notes,
-        user_id=current_user.id
+    # Generate the next occurrence now; the schedule then moves on to the one after
+    invoice_ids = await run_in_threadpool(
+        generate_and_send, db, [recurring_invoice], datetime.utcnow(), True
     )
     
-    db.add(new_invoice)
-    db.commit()
-    db.refresh(new_invoice)
-    
-    # Update next invoice date
-    if recurring_invoice.frequency == RecurringFrequency.DAILY:
-        recurring_invoice.next_invoice_date += timedelta(days=recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.WEEKLY:
-        recurring_invoice.next_invoice_date += timedelta(weeks=recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.MONTHLY:
-        recurring_invoice.next_invoice_date += timedelta(days=30 * recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.QUARTERLY:
-        recurring_invoice.next_invoice_date += timedelta(days=90 * recurring_invoice.interval)
-    elif recurring_invoice.frequency == RecurringFrequency.YEARLY:
-        recurring_invoice.next_invoice_date += timedelta(days=365 * recurring_invoice.interval)
-    
-    db.commit()
+    if not invoice_ids:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This occurrence was just generated; try again"
+        )
     
-    return {"message": "Invoice generated successfully", "invoice_id": new_invoice.id}
+    return {"message": "Invoice generated successfully", "invoice_id": invoice_ids[0]}
 
 @router.get("/due/upcoming")
 async def get_upcoming_recurring_invoices(
     days: int = Query(7, ge=1, le=30),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get recurring invoices due in the next N days"""
     cutoff_date = datetime.utcnow() + timedelta(days=days)
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ...core.database import get_read_db
+from ...core.security import get_current_user
+from ...core.search import ranked_search
+from ...models.user import User
+from ...models.client import Client
+from ...models.invoice import Invoice
+from ...models.project import Project
+
+router = APIRouter()
+
+SEARCHABLE_TYPES = {
+    "client": Client,
+    "invoice": Invoice,
+    "project": Project,
+}
+
+def _format_result(entity_type: str, item, score: float) -> dict:
+    if entity_type == "client":
+        title, subtitle = item.name, item.company or item.email
+    elif entity_type == "invoice":
+        title, subtitle = item.title or item.invoice_number, f"{item.invoice_number} - {item.client_name}"
+    else:
+        title, subtitle = item.title, item.client_name
+
+    return {
+        "type": entity_type,
+        "id": item.id,
+        "title": title,
+        "subtitle": subtitle,
+        "score": score
+    }
+
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = Query(None, description="Comma-separated: client, invoice, project"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Ranked search across clients, invoices and projects"""
+    requested_types = [t.strip() for t in types.split(",") if t.strip()] if types else list(SEARCHABLE_TYPES)
+    invalid_types = [t for t in requested_types if t not in SEARCHABLE_TYPES]
+    if invalid_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid search types: {invalid_types}. Allowed types: {list(SEARCHABLE_TYPES)}"
+        )
+
+    # Each entity contributes its best skip + limit hits; merge them by score
+    hits = []
+    for entity_type in requested_types:
+        for entity_id, score in ranked_search(db, SEARCHABLE_TYPES[entity_type], current_user.id, q, skip + limit):
+            hits.append((score, entity_type, entity_id))
+    hits.sort(key=lambda hit: hit[0], reverse=True)
+    page = hits[skip:skip + limit]
+
+    # Load display fields for the page in one query per entity type
+    items = {}
+    for entity_type in requested_types:
+        ids = [entity_id for _, hit_type, entity_id in page if hit_type == entity_type]
+        if ids:
+            model = SEARCHABLE_TYPES[entity_type]
+            for item in db.query(model).filter(model.id.in_(ids)).all():
+                items[(entity_type, item.id)] = item
+
+    results = [
+        _format_result(entity_type, items[(entity_type, entity_id)], score)
+        for score, entity_type, entity_id in page
+        if (entity_type, entity_id) in items
+    ]
+
+    return {
+        "query": q,
+        "results": results,
+        "skip": skip,
+        "limit": limit,
+        "has_more": len(hits) > skip + limit
+    }
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
+from ...core.fieldsets import parse_fields, select_fields, sparse_response
 from ...models.user import User
 from ...models.task import Task
 from ...models.project import Project
@@ -19,13 +21,16 @@ router = APIRouter()
 
 @router.get("/", response_model=List[TaskResponse])
 async def get_tasks(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     project_id: Optional[int] = None,
     status: Optional[str] = None,
     priority: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all tasks for the current user"""
     query = db.query(Task).filter(Task.user_id == current_user.id)
@@ -37,7 +42,13 @@ async def get_tasks(
     if priority:
         query = query.filter(Task.priority == priority)
     
-    tasks = query.offset(skip).limit(limit).all()
+    field_names = parse_fields(fields, Task, TaskResponse)
+    if field_names:
+        query = select_fields(query, Task, field_names)
+    
+    tasks = paginate(query, Task, response, skip, limit, cursor)
+    if field_names:
+        return sparse_response(tasks, field_names, TaskResponse, response)
     return tasks
 
 @router.get("/{task_id}", response_model=TaskResponse)
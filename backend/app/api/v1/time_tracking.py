@@ -5,8 +5,9 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.responses import FastJSONResponse
 from ...models.user import User
 from ...models.work_log import WorkLog
 from ...models.project import Project
@@ -156,7 +157,7 @@ async def stop_timer(
 async def get_daily_time_report(
     date: Optional[date] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get daily time tracking report"""
     
@@ -201,7 +202,7 @@ async def get_daily_time_report(
                 "description": log.description
             })
     
-    return {
+    return FastJSONResponse({
         "date": target_date.isoformat(),
         "total_hours": total_hours,
         "billable_hours": billable_hours,
@@ -220,13 +221,13 @@ async def get_daily_time_report(
             }
             for log in work_logs
         ]
-    }
+    })
 
 @router.get("/reports/weekly", response_model=Dict[str, Any])
 async def get_weekly_time_report(
     week_start: Optional[date] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get weekly time tracking report"""
     
@@ -286,21 +287,21 @@ async def get_weekly_time_report(
     for project in project_summary.values():
         project["days_worked"] = len(project["days_worked"])
     
-    return {
+    return FastJSONResponse({
         "week_start": start_date.isoformat(),
         "week_end": end_date.isoformat(),
         "total_hours": total_hours,
         "billable_hours": billable_hours,
         "daily_totals": daily_totals,
         "project_summary": project_summary
-    }
+    })
 
 @router.get("/reports/monthly", response_model=Dict[str, Any])
 async def get_monthly_time_report(
     year: Optional[int] = None,
     month: Optional[int] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get monthly time tracking report"""
     
@@ -364,14 +365,14 @@ async def get_monthly_time_report(
     for project in project_summary.values():
         project["days_worked"] = len(project["days_worked"])
     
-    return {
+    return FastJSONResponse({
         "year": target_year,
         "month": target_month,
         "total_hours": total_hours,
         "billable_hours": billable_hours,
         "daily_totals": daily_totals,
         "project_summary": project_summary
-    }
+    })
 
 @router.get("/reports/project/{project_id}", response_model=Dict[str, Any])
 async def get_project_time_report(
@@ -379,7 +380,7 @@ async def get_project_time_report(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get time tracking report for a specific project"""
     
@@ -446,7 +447,7 @@ async def get_project_time_report(
                 "is_billable": log.is_billable
             })
     
-    return {
+    return FastJSONResponse({
         "project_id": project_id,
         "project_title": project.title,
         "start_date": start_date.isoformat(),
@@ -466,4 +467,4 @@ async def get_project_time_report(
             }
             for log in work_logs
         ]
-    }
+    })
@@ -1,15 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form, status
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.config import settings
+from ...core.plans import plan_registry
+from ...core.responses import ranged_file_response
+from ...core.storage import blob_key, delete_file, get_usage, store_upload
+from ...core.storage_backends import storage_backend
 from ...models.user import User
-import aiofiles
-import os
-from datetime import datetime
-import uuid
+from ...models.file import StoredFile
 
 router = APIRouter()
 
+def storage_quota_bytes(user: User) -> int:
+    """Total storage allowed by the user's plan (its storage_gb limit)"""
+    return plan_registry.storage_quota_bytes(user.subscription_tier)
+
+def file_url(stored_file: StoredFile) -> str:
+    return f"/api/v1/files/{stored_file.id}"
+
 @router.post("/resume")
 async def upload_resume(
     file: UploadFile = File(...),
@@ -17,40 +27,31 @@ async def upload_resume(
     db: Session = Depends(get_db)
 ):
     """Upload resume and update user AI profile"""
-    
+
     # Validate file type (only PDF for resume)
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(
             status_code=400,
             detail="Only PDF files are allowed for resume upload"
         )
-    
-    # Create user-specific directory
-    user_dir = f"uploads/{current_user.id}/resume"
-    os.makedirs(user_dir, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_filename = f"resume_{timestamp}_{uuid.uuid4().hex[:8]}.pdf"
-    file_path = os.path.join(user_dir, unique_filename)
-    
+
     try:
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # Return file URL
-        file_url = f"/uploads/{current_user.id}/resume/{unique_filename}"
-        
+        # Stream file into the blob store
+        stored_file = await store_upload(
+            db, current_user.id, file, "resume", "pdf", storage_quota_bytes(current_user)
+        )
+
         return {
             "message": "Resume uploaded successfully",
             "filename": file.filename,
-            "file_url": file_url,
-            "size": len(content),
+            "file_url": file_url(stored_file),
+            "size": stored_file.size,
+            "sha256": stored_file.sha256,
             "ai_profile_updated": True
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -65,43 +66,35 @@ async def upload_document(
     db: Session = Depends(get_db)
 ):
     """Upload a document for AI context"""
-    
+
     # Validate file type
     allowed_types = ['pdf', 'txt', 'doc', 'docx']
     file_extension = file.filename.split('.')[-1].lower()
-    
+
     if file_extension not in allowed_types:
         raise HTTPException(
             status_code=400,
             detail=f"File type {file_extension} not allowed. Allowed types: {allowed_types}"
         )
-    
-    # Create user-specific directory
-    user_dir = f"uploads/{current_user.id}/documents"
-    os.makedirs(user_dir, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    unique_filename = f"{document_type}_{timestamp}_{uuid.uuid4().hex[:8]}.{file_extension}"
-    file_path = os.path.join(user_dir, unique_filename)
-    
+
     try:
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # Return file URL
-        file_url = f"/uploads/{current_user.id}/documents/{unique_filename}"
-        
+        # Stream file into the blob store
+        stored_file = await store_upload(
+            db, current_user.id, file, "document", file_extension,
+            storage_quota_bytes(current_user), document_type=document_type
+        )
+
         return {
             "message": "Document uploaded successfully",
             "filename": file.filename,
-            "file_url": file_url,
+            "file_url": file_url(stored_file),
             "document_type": document_type,
-            "size": len(content)
+            "size": stored_file.size,
+            "sha256": stored_file.sha256
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -111,62 +104,115 @@ async def upload_document(
 @router.get("/resume")
 async def get_resume(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get user's current resume"""
-    
-    # Check if user has a resume
-    user_dir = f"uploads/{current_user.id}/resume"
-    if not os.path.exists(user_dir):
-        return {"resume_url": None, "message": "No resume found"}
-    
-    # Find the most recent resume file
-    resume_files = [f for f in os.listdir(user_dir) if f.startswith("resume_") and f.endswith(".pdf")]
-    if not resume_files:
+
+    latest_resume = db.query(StoredFile).filter(
+        StoredFile.user_id == current_user.id,
+        StoredFile.category == "resume"
+    ).order_by(StoredFile.created_at.desc(), StoredFile.id.desc()).first()
+
+    if not latest_resume:
         return {"resume_url": None, "message": "No resume found"}
-    
-    # Get the most recent one (by filename timestamp)
-    latest_resume = sorted(resume_files)[-1]
-    resume_url = f"/uploads/{current_user.id}/resume/{latest_resume}"
-    
+
     return {
-        "resume_url": resume_url,
-        "filename": latest_resume,
+        "resume_url": file_url(latest_resume),
+        "filename": latest_resume.filename,
         "message": "Resume found"
     }
 
 @router.get("/documents")
 async def get_documents(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get user's uploaded documents"""
-    
-    user_dir = f"uploads/{current_user.id}/documents"
-    if not os.path.exists(user_dir):
-        return {"documents": []}
-    
-    documents = []
-    for filename in os.listdir(user_dir):
-        if filename.endswith(('.pdf', '.txt', '.doc', '.docx')):
-            file_path = os.path.join(user_dir, filename)
-            file_url = f"/uploads/{current_user.id}/documents/{filename}"
-            
-            # Get file size
-            file_size = os.path.getsize(file_path)
-            
-            # Extract document type from filename
-            doc_type = filename.split('_')[0] if '_' in filename else 'unknown'
-            
-            documents.append({
-                "filename": filename,
-                "file_url": file_url,
-                "document_type": doc_type,
-                "size": file_size,
-                "uploaded_at": datetime.fromtimestamp(os.path.getctime(file_path)).isoformat()
-            })
-    
-    return {"documents": documents}
+
+    documents = db.query(StoredFile).filter(
+        StoredFile.user_id == current_user.id,
+        StoredFile.category == "document"
+    ).order_by(StoredFile.created_at.desc(), StoredFile.id.desc()).all()
+
+    return {"documents": [
+        {
+            "id": document.id,
+            "filename": document.filename,
+            "file_url": file_url(document),
+            "document_type": document.document_type or "unknown",
+            "size": document.size,
+            "uploaded_at": document.created_at.isoformat() if document.created_at else None
+        }
+        for document in documents
+    ]}
+
+@router.get("/storage/usage")
+async def get_storage_usage(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get storage used against the plan's quota"""
+    usage = get_usage(db, current_user.id)
+    db.commit()
+
+    return {
+        "bytes_used": usage.bytes_used,
+        "file_count": usage.file_count,
+        "quota_bytes": storage_quota_bytes(current_user)
+    }
+
+@router.get("/files/{file_id}")
+async def download_file(
+    file_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Download an uploaded file"""
+    stored_file = db.query(StoredFile).filter(
+        StoredFile.id == file_id,
+        StoredFile.user_id == current_user.id
+    ).first()
+
+    if not stored_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    key = blob_key(stored_file.sha256)
+    content_type = stored_file.content_type or "application/octet-stream"
+
+    # Object storage serves the bytes itself; the API only hands out a short-lived link
+    url = storage_backend.presigned_url(key, stored_file.filename, content_type, settings.STORAGE_PRESIGNED_URL_SECONDS)
+    if url:
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    return ranged_file_response(
+        request, storage_backend.local_path(key), content_type, stored_file.filename, etag=stored_file.sha256
+    )
+
+@router.delete("/files/{file_id}")
+async def delete_uploaded_file(
+    file_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Delete an uploaded file"""
+    stored_file = db.query(StoredFile).filter(
+        StoredFile.id == file_id,
+        StoredFile.user_id == current_user.id
+    ).first()
+
+    if not stored_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    await delete_file(db, stored_file)
+
+    return {"message": "File deleted successfully"}
 
 # Keep the old upload endpoint for backward compatibility
 @router.post("/upload")
@@ -177,36 +223,33 @@ async def upload_file(
     db: Session = Depends(get_db)
 ):
     """Upload a file and return the URL (legacy endpoint)"""
-    
+
     # Validate file type
     allowed_types = ['pdf', 'txt', 'doc', 'docx', 'png', 'jpg', 'jpeg']
     file_extension = file.filename.split('.')[-1].lower()
-    
+
     if file_extension not in allowed_types:
         raise HTTPException(
             status_code=400,
             detail=f"File type {file_extension} not allowed. Allowed types: {allowed_types}"
         )
-    
-    # Create uploads directory if it doesn't exist
-    upload_dir = f"uploads/{current_user.id}"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(upload_dir, filename)
-    
+
     try:
-        # Save file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        # Return file URL
-        file_url = f"/uploads/{current_user.id}/{filename}"
-        return {"url": file_url, "filename": filename}
-        
+        # Stream file into the blob store
+        stored_file = await store_upload(
+            db, current_user.id, file, "general", file_extension,
+            storage_quota_bytes(current_user), document_type=type
+        )
+
+        return {
+            "url": file_url(stored_file),
+            "filename": stored_file.filename,
+            "size": stored_file.size,
+            "sha256": stored_file.sha256
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
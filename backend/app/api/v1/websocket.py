@@ -1,41 +1,102 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from sqlalchemy.orm import Session
-from typing import Dict, List
+from typing import Dict, List, Optional, Set
 import json
 import asyncio
+import logging
+import threading
+import time
 from datetime import datetime
 
-from ...core.database import get_db
+from ...core.config import settings
+from ...core.database import SessionLocal
+from ...core.security import verify_token
+from ...core.backplane import backplane
+from ...core.notifications import publish_counters, send_notifications, update_notifications
+from ...core.deadlines import project_deadline_notification
+from ...core.stripe_webhooks import invoice_payment_notification
 from ...models.user import User
 from ...models.notification import Notification
+from ...schemas.notification import NotificationCreate, NotificationType, NotificationPriority
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+class ClientConnection:
+    """An open socket with its own bounded send queue drained by a writer task"""
+
+    def __init__(self, websocket: WebSocket, user_id: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.WEBSOCKET_SEND_QUEUE_SIZE)
+        self.last_seen = time.monotonic()
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+
+    def enqueue(self, payload: str) -> bool:
+        """Queue a serialized message; returns False if the client is too slow to keep"""
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            if settings.WEBSOCKET_SLOW_CONSUMER_POLICY == "disconnect":
+                return False
+            # drop_oldest: the newest state is more useful than a stale backlog
+            self.queue.get_nowait()
+            self.queue.put_nowait(payload)
+            self.dropped += 1
+        return True
+
+    async def write(self, on_error):
+        while True:
+            payload = await self.queue.get()
+            try:
+                await self.websocket.send_text(payload)
+            except Exception:
+                await on_error(self)
+                return
+
 class ConnectionManager:
     def __init__(self):
         # Store active connections by user_id
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        self.active_connections: Dict[int, List[ClientConnection]] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
 
-    async def connect(self, websocket: WebSocket, user_id: int):
+    async def connect(self, websocket: WebSocket, user_id: int) -> ClientConnection:
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        connection = ClientConnection(websocket, user_id)
+        connection.writer = asyncio.create_task(connection.write(self.close))
+        self.active_connections.setdefault(user_id, []).append(connection)
+        return connection
+
+    def disconnect(self, connection: ClientConnection):
+        connections = self.active_connections.get(connection.user_id, [])
+        if connection in connections:
+            connections.remove(connection)
+            if not connections:
+                del self.active_connections[connection.user_id]
+        if connection.writer and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    async def close(self, connection: ClientConnection, code: int = 1000, reason: str = ""):
+        """Drop a connection and close its socket, ignoring already-dead sockets"""
+        self.disconnect(connection)
+        try:
+            await connection.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
 
-    def disconnect(self, websocket: WebSocket, user_id: int):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
+    async def deliver_local(self, user_id: int, message: dict):
+        """Queue a message for the user's connections on this worker"""
+        # Serialize once; each connection's writer sends at its own pace
+        payload = json.dumps(message)
+        for connection in list(self.active_connections.get(user_id, [])):
+            if not connection.enqueue(payload):
+                await self.close(connection, code=1008, reason="Client too slow")
 
     async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_text(json.dumps(message))
-                except:
-                    # Remove broken connections
-                    self.active_connections[user_id].remove(connection)
+        # Published through the backplane so connections on every worker receive it
+        backplane.publish(user_id, message)
 
     async def broadcast_to_user(self, user_id: int, notification: dict):
         await self.send_personal_message({
@@ -43,74 +104,161 @@ class ConnectionManager:
             "data": notification
         }, user_id)
 
+    def start(self):
+        """Start heartbeat-based reaping of dead connections"""
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections):
+                await self.close(connection, code=1001)
+
+    async def _heartbeat_loop(self):
+        interval = settings.WEBSOCKET_HEARTBEAT_SECONDS
+        ping = json.dumps({"type": "ping"})
+        while True:
+            await asyncio.sleep(interval)
+            # Clients that stayed silent for two intervals are treated as dead
+            deadline = time.monotonic() - 2 * interval
+            for connections in list(self.active_connections.values()):
+                for connection in list(connections):
+                    if connection.last_seen < deadline:
+                        await self.close(connection, code=1001, reason="Heartbeat timeout")
+                    else:
+                        connection.enqueue(ping)
+
 manager = ConnectionManager()
 
-@router.websocket("/ws/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, user_id: int, db: Session = Depends(get_db)):
-    # Verify user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        await websocket.close(code=1008, reason="User not found")
+class ReadReceiptBatcher:
+    """Collects ``mark_read`` acknowledgements and applies them in periodic bulk UPDATEs"""
+
+    def __init__(self):
+        self.pending: Dict[int, Set[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        # mark() runs on the event loop while flush() runs in a worker thread
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: int, notification_id: int):
+        with self._lock:
+            self.pending.setdefault(user_id, set()).add(notification_id)
+
+    def _restore(self, pending: Dict[int, Set[int]]):
+        """Put back acknowledgements whose write failed so the next flush retries them"""
+        with self._lock:
+            for user_id, notification_ids in pending.items():
+                self.pending.setdefault(user_id, set()).update(notification_ids)
+
+    def start(self):
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.WEBSOCKET_READ_FLUSH_SECONDS)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Error flushing read receipts: {e}")
+
+    def flush(self):
+        """Apply all pending acknowledgements in one transaction"""
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+        db = SessionLocal()
+        try:
+            read_at = datetime.utcnow()
+            changed = set()
+            try:
+                for user_id, notification_ids in pending.items():
+                    changed |= update_notifications(db, [
+                        Notification.user_id == user_id,
+                        Notification.id.in_(notification_ids),
+                        Notification.is_read == False
+                    ], {"is_read": True, "read_at": read_at})
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._restore(pending)
+                raise
+            publish_counters(db, changed)
+        finally:
+            db.close()
+
+read_receipts = ReadReceiptBatcher()
+
+def _authenticate(token: str) -> Optional[int]:
+    """Resolve an access token to an active user's id using a short-lived session"""
+    payload = verify_token(token)
+    if payload is None or payload.get("sub") is None:
+        return None
+    try:
+        user_id = int(payload["sub"])
+    except ValueError:
+        return None
+
+    with SessionLocal() as db:
+        user = db.query(User.id).filter(User.id == user_id, User.is_active == True).first()
+    return user.id if user else None
+
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, token: str = Query(...)):
+    # No DB session is held while the socket is open; each message borrows one if needed
+    user_id = await asyncio.to_thread(_authenticate, token)
+    if user_id is None:
+        await websocket.close(code=1008, reason="Could not validate credentials")
         return
 
-    await manager.connect(websocket, user_id)
+    connection = await manager.connect(websocket, user_id)
     
     try:
         while True:
             # Keep connection alive and handle incoming messages
             data = await websocket.receive_text()
+            connection.last_seen = time.monotonic()
             message = json.loads(data)
             
-            # Handle different message types
+            # Handle different message types ("pong" only refreshes last_seen)
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                connection.enqueue(json.dumps({"type": "pong"}))
             elif message.get("type") == "mark_read":
-                # Mark notification as read
+                # Applied with other acknowledgements in the next bulk update
                 notification_id = message.get("notification_id")
-                if notification_id:
-                    notification = db.query(Notification).filter(
-                        Notification.id == notification_id,
-                        Notification.user_id == user_id
-                    ).first()
-                    if notification:
-                        notification.is_read = True
-                        db.commit()
+                if isinstance(notification_id, int):
+                    read_receipts.mark(user_id, notification_id)
                         
     except WebSocketDisconnect:
-        manager.disconnect(websocket, user_id)
+        pass
+    finally:
+        manager.disconnect(connection)
 
 # Helper function to send notifications
-async def send_notification_to_user(user_id: int, title: str, message: str, notification_type: str = "info", db: Session = None):
+async def send_notification_to_user(
+    user_id: int,
+    title: str,
+    message: str,
+    notification_type: NotificationType = NotificationType.GENERAL,
+    db: Session = None,
+    **fields
+):
     """Send a notification to a specific user via WebSocket and save to database"""
+    notification = NotificationCreate(title=title, message=message, type=notification_type, **fields)
     
-    # Save to database
     if db:
-        notification = Notification(
-            user_id=user_id,
-            title=title,
-            message=message,
-            notification_type=notification_type,
-            is_read=False
-        )
-        db.add(notification)
-        db.commit()
-        db.refresh(notification)
-        
-        # Send via WebSocket
-        await manager.broadcast_to_user(user_id, {
-            "id": notification.id,
-            "title": title,
-            "message": message,
-            "type": notification_type,
-            "created_at": notification.created_at.isoformat(),
-            "is_read": False
-        })
+        send_notifications(db, [(user_id, notification)])
     else:
         # Just send via WebSocket if no database session
         await manager.broadcast_to_user(user_id, {
-            "title": title,
-            "message": message,
-            "type": notification_type,
+            **notification.model_dump(mode="json"),
             "created_at": datetime.utcnow().isoformat(),
             "is_read": False
         })
@@ -118,40 +266,32 @@ async def send_notification_to_user(user_id: int, title: str, message: str, noti
 # Notification triggers
 async def notify_project_deadline_approaching(project, db: Session):
     """Notify when project deadline is approaching"""
-    await send_notification_to_user(
-        project.user_id,
-        "Project Deadline Approaching",
-        f"Project '{project.title}' deadline is approaching on {project.deadline.strftime('%B %d, %Y')}",
-        "warning",
-        db
-    )
+    await notify_project_deadlines_approaching([project], db)
+
+async def notify_project_deadlines_approaching(projects, db: Session):
+    """Notify owners of many projects in one batch"""
+    send_notifications(db, [(project.user_id, project_deadline_notification(project)) for project in projects])
 
 async def notify_invoice_payment_received(invoice, db: Session):
     """Notify when invoice payment is received"""
-    await send_notification_to_user(
-        invoice.user_id,
-        "Payment Received",
-        f"Payment received for invoice {invoice.invoice_number} - ${invoice.total_amount:,.2f}",
-        "success",
-        db
-    )
+    send_notifications(db, [(invoice.user_id, invoice_payment_notification(invoice))])
 
 async def notify_task_assigned(task, db: Session):
     """Notify when a task is assigned"""
-    await send_notification_to_user(
-        task.user_id,
-        "New Task Assigned",
-        f"You have been assigned a new task: '{task.title}'",
-        "info",
-        db
-    )
+    send_notifications(db, [(task.user_id, NotificationCreate(
+        title="New Task Assigned",
+        message=f"You have been assigned a new task: '{task.title}'",
+        type=NotificationType.GENERAL,
+        related_entity_type="task",
+        related_entity_id=task.id
+    ))])
 
 async def notify_milestone_completed(milestone, db: Session):
     """Notify when a milestone is completed"""
-    await send_notification_to_user(
-        milestone.user_id,
-        "Milestone Completed",
-        f"Milestone '{milestone.title}' has been completed",
-        "success",
-        db
-    )
+    send_notifications(db, [(milestone.user_id, NotificationCreate(
+        title="Milestone Completed",
+        message=f"Milestone '{milestone.title}' has been completed",
+        type=NotificationType.MILESTONE_COMPLETED,
+        related_entity_type="milestone",
+        related_entity_id=milestone.id
+    ))])
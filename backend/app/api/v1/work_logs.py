@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
 
-from ...core.database import get_db
+from ...core.database import get_db, get_read_db
 from ...core.security import get_current_user
+from ...core.pagination import paginate
+from ...core.fieldsets import parse_fields, select_fields, sparse_response
 from ...models.user import User
 from ...models.work_log import WorkLog
 from ...models.task import Task
@@ -22,8 +24,11 @@ router = APIRouter()
 
 @router.get("/", response_model=List[WorkLogResponse])
 async def get_work_logs(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
     task_id: Optional[int] = Query(None),
     project_id: Optional[int] = Query(None),
     status: Optional[str] = Query(None),
@@ -32,7 +37,7 @@ async def get_work_logs(
     end_date: Optional[datetime] = Query(None),
     search: Optional[str] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all work logs for the current user"""
     query = db.query(WorkLog).filter(WorkLog.user_id == current_user.id)
@@ -56,7 +61,13 @@ async def get_work_logs(
             (WorkLog.description.ilike(search_filter))
         )
     
-    work_logs = query.order_by(WorkLog.created_at.desc()).offset(skip).limit(limit).all()
+    field_names = parse_fields(fields, WorkLog, WorkLogResponse)
+    if field_names:
+        query = select_fields(query, WorkLog, field_names)
+    
+    work_logs = paginate(query.order_by(WorkLog.created_at.desc()), WorkLog, response, skip, limit, cursor)
+    if field_names:
+        return sparse_response(work_logs, field_names, WorkLogResponse, response)
     return work_logs
 
 @router.get("/{work_log_id}", response_model=WorkLogResponse)
@@ -275,7 +286,7 @@ async def get_work_log_stats(
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get work log statistics"""
     query = db.query(WorkLog).filter(WorkLog.user_id == current_user.id)
@@ -0,0 +1,269 @@
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from collections import OrderedDict
+from sqlalchemy import text
+import asyncio
+import itertools
+import json
+import logging
+import select
+import threading
+
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[int, dict], Awaitable[None]]
+
+class Backplane(ABC):
+    """Delivers WebSocket messages published on any worker to every worker.
+
+    Messages are buffered briefly and sent in batches. A message published
+    with a ``coalesce_key`` replaces any still-pending message for the same
+    user and key, so only the latest state update goes out.
+    """
+
+    def __init__(self, flush_interval: float = 0.01, max_batch: int = 100):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.handler: Optional[MessageHandler] = None
+        self._pending: "OrderedDict[Tuple[int, Any], dict]" = OrderedDict()
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.running = False
+
+    async def start(self, handler: MessageHandler):
+        """Start delivering messages from every worker to ``handler``"""
+        self.handler = handler
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.running = True
+        await self._connect()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"{type(self).__name__} started")
+
+    async def stop(self):
+        self.running = False
+        if self._flush_task:
+            self._wakeup.set()
+            await self._flush_task
+            self._flush_task = None
+        await self._disconnect()
+        logger.info(f"{type(self).__name__} stopped")
+
+    def publish(self, user_id: int, message: dict, coalesce_key: Optional[str] = None):
+        """Queue a message for all of a user's connections on every worker"""
+        if self._loop is not None and not self._on_loop():
+            # Called from a worker thread (e.g. a background job); hand over to the event loop
+            self._loop.call_soon_threadsafe(self.publish, user_id, message, coalesce_key)
+            return
+        key = (user_id, coalesce_key if coalesce_key is not None else next(self._sequence))
+        self._pending.pop(key, None)
+        self._pending[key] = {"user_id": user_id, "message": message}
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def _flush_loop(self):
+        while self.running or self._pending:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Give concurrent publishers a moment so their messages share a batch
+            await asyncio.sleep(self.flush_interval)
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.max_batch:
+                    batch.append(self._pending.popitem(last=False)[1])
+                try:
+                    await self._send(batch)
+                except Exception as e:
+                    logger.error(f"Error publishing {len(batch)} WebSocket messages: {e}")
+
+    async def _dispatch(self, batch: List[dict]):
+        """Deliver a received batch to this worker's local connections"""
+        for item in batch:
+            try:
+                await self.handler(item["user_id"], item["message"])
+            except Exception as e:
+                logger.error(f"Error delivering WebSocket message to user {item['user_id']}: {e}")
+
+    async def _connect(self):
+        pass
+
+    async def _disconnect(self):
+        pass
+
+    @abstractmethod
+    async def _send(self, batch: List[dict]):
+        """Publish a batch to every worker, this one included"""
+
+class InProcessBackplane(Backplane):
+    """Single-worker backplane: batches are delivered straight to local connections"""
+
+    async def _send(self, batch: List[dict]):
+        await self._dispatch(batch)
+
+class PostgresBackplane(Backplane):
+    """Backplane built on PostgreSQL LISTEN/NOTIFY"""
+
+    # NOTIFY payloads must stay below 8000 bytes
+    MAX_PAYLOAD_BYTES = 7900
+
+    # Delay before reconnecting the listener, doubling per failed attempt up to the maximum
+    RECONNECT_DELAY = 1.0
+    MAX_RECONNECT_DELAY = 30.0
+
+    def __init__(self, channel: str, **kwargs):
+        super().__init__(**kwargs)
+        self.channel = channel
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._reconnect_delay = self.RECONNECT_DELAY
+
+    async def _connect(self):
+        loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._listener = threading.Thread(target=self._listen, args=(loop,), daemon=True)
+        self._listener.start()
+
+    async def _disconnect(self):
+        self._stopping.set()
+        if self._listener:
+            await asyncio.to_thread(self._listener.join, 5)
+            self._listener = None
+
+    def _listen(self, loop: asyncio.AbstractEventLoop):
+        """Keep a LISTEN connection open, reconnecting with backoff until stopped"""
+        while not self._stopping.is_set():
+            try:
+                self._listen_once(loop)
+            except Exception as e:
+                # Notifications sent while disconnected are lost, as with Redis pub/sub
+                delay = self._reconnect_delay
+                logger.error(f"PostgreSQL backplane listener error, reconnecting in {delay:.0f}s: {e}")
+                self._stopping.wait(delay)
+                self._reconnect_delay = min(delay * 2, self.MAX_RECONNECT_DELAY)
+
+    def _listen_once(self, loop: asyncio.AbstractEventLoop):
+        import psycopg2
+
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            self._reconnect_delay = self.RECONNECT_DELAY
+            while not self._stopping.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    batch = json.loads(notify.payload)
+                    asyncio.run_coroutine_threadsafe(self._dispatch(batch), loop)
+        finally:
+            conn.close()
+
+    def _payloads(self, batch: List[dict]) -> List[str]:
+        """Split a batch into NOTIFY payloads that fit the size limit"""
+        payloads, current = [], []
+        for item in batch:
+            candidate = json.dumps(current + [item], default=str)
+            if len(candidate.encode()) <= self.MAX_PAYLOAD_BYTES:
+                current.append(item)
+                continue
+            if current:
+                payloads.append(json.dumps(current, default=str))
+            single = json.dumps([item], default=str)
+            if len(single.encode()) > self.MAX_PAYLOAD_BYTES:
+                logger.warning(f"Dropping oversized WebSocket message for user {item['user_id']}")
+                current = []
+            else:
+                current = [item]
+        if current:
+            payloads.append(json.dumps(current, default=str))
+        return payloads
+
+    def _notify(self, payloads: List[str]):
+        with engine.begin() as conn:
+            for payload in payloads:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+
+    async def _send(self, batch: List[dict]):
+        await asyncio.to_thread(self._notify, self._payloads(batch))
+
+class RedisBackplane(Backplane):
+    """Backplane built on Redis PUBLISH/SUBSCRIBE.
+
+    ``fakeredis://`` uses an in-memory fakeredis server, which is handy for
+    local development without a Redis instance.
+    """
+
+    def __init__(self, url: str, channel: str, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def _connect(self):
+        if self.url.startswith("fakeredis://"):
+            from fakeredis import aioredis as fake_redis
+            self._client = fake_redis.FakeRedis()
+        else:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._reader = asyncio.create_task(self._read())
+
+    async def _disconnect(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.close()
+        if self._client:
+            await self._client.close()
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    await self._dispatch(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis backplane read error: {e}")
+                await asyncio.sleep(1)
+
+    async def _send(self, batch: List[dict]):
+        await self._client.publish(self.channel, json.dumps(batch, default=str))
+
+def create_backplane() -> Backplane:
+    """Build the backplane selected by WEBSOCKET_BACKPLANE (memory, postgres or redis)"""
+    kind = settings.WEBSOCKET_BACKPLANE.lower()
+    if kind == "postgres":
+        return PostgresBackplane(settings.WEBSOCKET_BACKPLANE_CHANNEL)
+    if kind == "redis":
+        return RedisBackplane(settings.REDIS_URL, settings.WEBSOCKET_BACKPLANE_CHANNEL)
+    return InProcessBackplane()
+
+# Global backplane instance
+backplane = create_backplane()
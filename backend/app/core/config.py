@@ -1,3 +1,4 @@
+from pydantic import validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 import os
@@ -10,6 +11,8 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./quickbird.db"
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated read replica URLs
+    READ_YOUR_WRITES_SECONDS: int = 5  # Keep a user's reads on the primary after they write
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-this-in-production"
@@ -35,31 +38,111 @@ class Settings(BaseSettings):
     STRIPE_PUBLISHABLE_KEY: Optional[str] = None
     STRIPE_SECRET_KEY: Optional[str] = None
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
+    STRIPE_API_BASE: Optional[str] = None  # e.g. http://localhost:12111 to run against stripe-mock
+    STRIPE_TIMEOUT_SECONDS: int = 10  # Per HTTP request to Stripe
+    STRIPE_MAX_CONCURRENCY: int = 8  # Threads available for Stripe calls
+    STRIPE_MAX_RETRIES: int = 2  # Retries of network, rate-limit and 5xx failures
+    STRIPE_BREAKER_FAILURES: int = 5  # Consecutive failures that open the circuit
+    STRIPE_BREAKER_RESET_SECONDS: int = 30  # How long the circuit stays open before a trial call
+    STRIPE_WEBHOOK_TOLERANCE_SECONDS: int = 300  # Reject signatures older than this (replay protection)
+    STRIPE_EVENT_POLL_SECONDS: int = 5  # How often received webhook events are processed
+    STRIPE_EVENT_BATCH_SIZE: int = 100  # Events claimed from the inbox at a time
+    STRIPE_EVENT_MAX_ATTEMPTS: int = 8  # Then the event is marked failed
+    STRIPE_EVENT_RETRY_BASE_SECONDS: int = 30  # Backoff doubles with every failed attempt
     
     # File Storage
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_BUCKET_NAME: Optional[str] = None
     AWS_REGION: str = "us-east-1"
+    AWS_S3_ENDPOINT_URL: Optional[str] = None  # For S3-compatible stores such as MinIO
+    STORAGE_BACKEND: str = "local"  # local or s3
+    STORAGE_LOCAL_ROOT: str = "storage"  # Local blob store; never served directly
+    S3_MULTIPART_THRESHOLD_MB: int = 8  # Larger files use multipart uploads
+    STORAGE_PRESIGNED_URL_SECONDS: int = 300
+    STORAGE_BLOB_COLLECTION_MINUTES: int = 60  # How often blobs left unreferenced by a failed delete are removed
+    
+    # Invoice numbering; fields: {user_id}, {seq}, {year}, {month}. Numbers are unique across users
+    INVOICE_NUMBER_FORMAT: str = "INV-{user_id:04d}-{seq:04d}"
+    INVOICE_NUMBER_RESET: str = "never"  # never or yearly
+    
+    # Recurring invoices
+    RECURRING_INVOICE_SCAN_MINUTES: int = 15
+    RECURRING_INVOICE_BATCH_SIZE: int = 500  # Schedules generated per transaction
+    
+    # Invoice PDFs
+    PDF_RENDER_WORKERS: int = 2  # Processes rendering PDFs off the event loop
+    INVOICE_PDF_CACHE_DIR: str = "cache/invoice_pdfs"
+    INVOICE_PDF_PRUNE_MINUTES: int = 60  # How often old renders are removed from the cache
+    INVOICE_PDF_SUPERSEDED_MINUTES: int = 60  # Renders replaced by a newer one are kept this long for requests still reading them
+    INVOICE_PDF_CACHE_DAYS: int = 7  # Renders not served for this long are removed
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
+    # WebSocket fan-out across workers
+    WEBSOCKET_BACKPLANE: str = "memory"  # memory, postgres or redis
+    WEBSOCKET_BACKPLANE_CHANNEL: str = "quickbird_ws"
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 100  # Pending messages per connection
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # drop_oldest or disconnect
+    WEBSOCKET_HEARTBEAT_SECONDS: int = 30
+    WEBSOCKET_READ_FLUSH_SECONDS: float = 1.0  # How often batched mark_read acks are written
+    
+    # Notifications
+    NOTIFICATION_DEDUPE_MINUTES: int = 60  # Skip repeats of an unread notification within this window
+    NOTIFICATION_COUNTER_RECONCILE_MINUTES: int = 60  # How often badge counters are recomputed
+    NOTIFICATION_RETENTION_SWEEP_MINUTES: int = 60  # How often expired and archived rows are swept
+    NOTIFICATION_RETENTION_BATCH_SIZE: int = 1000  # Rows deleted or moved per transaction
+    NOTIFICATION_ARCHIVE_AFTER_DAYS: int = 30  # Archived notifications older than this leave the live table
+    NOTIFICATION_ARCHIVE_RETENTION_DAYS: int = 365  # Archive rows older than this are purged
+    NOTIFICATION_ARCHIVE_PARTITIONED: bool = False  # Monthly range partitions for the archive (PostgreSQL)
+    
+    # Deadline scanner
+    DEADLINE_SCAN_MINUTES: int = 15
+    DEADLINE_SCAN_BATCH_SIZE: int = 1000
+    DEADLINE_LOOKAHEAD_DAYS: int = 3  # Project deadlines within this many days count as upcoming
+    DEADLINE_BACKFILL_HOURS: int = 24  # How far back the first scan looks for already-due rows
+    
     # Email
     SMTP_HOST: Optional[str] = None
     SMTP_PORT: int = 587
     SMTP_USERNAME: Optional[str] = None
     SMTP_PASSWORD: Optional[str] = None
     SMTP_TLS: bool = True
+    MAIL_FROM_ADDRESS: str = "QuickBird <no-reply@quickbird.app>"
+    MAIL_POLL_SECONDS: int = 10  # How often the outbound queue is drained
+    MAIL_BATCH_SIZE: int = 50  # Emails claimed from the queue at a time
+    MAIL_MESSAGES_PER_CONNECTION: int = 100  # Reconnect after this many messages
+    MAIL_MAX_ATTEMPTS: int = 6  # Then the email is marked failed
+    MAIL_RETRY_BASE_SECONDS: int = 60  # Backoff doubles with every failed attempt
     
     # Usage Limits
     FREE_TIER_DAILY_LIMIT: int = 10
     PRO_TIER_DAILY_LIMIT: int = 100
     ENTERPRISE_TIER_DAILY_LIMIT: int = 1000
+    PLAN_CATALOG_CACHE_SECONDS: int = 3600  # Cache-Control max-age of the plan catalog
     
     # Currency
     DEFAULT_CURRENCY: str = "PKR"
     SUPPORTED_CURRENCIES: list = ["USD", "PKR", "EUR", "GBP", "CAD", "AUD"]
+    CURRENCY_RATE_BASE: str = "USD"  # Stored exchange rates are quoted against this currency
+    CURRENCY_RATE_CACHE_SECONDS: int = 3600  # How long loaded rates are reused before re-reading them; also how long workers may lag a rate load
+    
+    @validator("INVOICE_NUMBER_FORMAT")
+    def validate_invoice_number_format(cls, v):
+        # Sequences are per user but numbers are unique across users
+        if "{seq" not in v or "{user_id" not in v:
+            raise ValueError("INVOICE_NUMBER_FORMAT must contain {seq} and {user_id}")
+        return v
+    
+    @validator("INVOICE_NUMBER_RESET")
+    def validate_invoice_number_reset(cls, v, values):
+        if v not in ("never", "yearly"):
+            raise ValueError("INVOICE_NUMBER_RESET must be never or yearly")
+        # Without the year, a reset would hand out last year's numbers again
+        if v == "yearly" and "{year" not in values.get("INVOICE_NUMBER_FORMAT", ""):
+            raise ValueError("INVOICE_NUMBER_RESET=yearly requires {year} in INVOICE_NUMBER_FORMAT")
+        return v
     
     class Config:
         env_file = "env.local"
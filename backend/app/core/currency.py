@@ -0,0 +1,185 @@
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+import csv
+import threading
+import time
+
+from .config import settings
+from ..models.exchange_rate import ExchangeRate
+from ..models.invoice import Invoice
+
+def resolve_currency(currency: Optional[str]) -> str:
+    """The reporting currency for a request: the one asked for, or the default"""
+    currency = (currency or settings.DEFAULT_CURRENCY).upper()
+    if currency not in settings.SUPPORTED_CURRENCIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported currency {currency}. Supported: {settings.SUPPORTED_CURRENCIES}"
+        )
+    return currency
+
+def reporting_currency(db: Session, user_id: int, currency: Optional[str]) -> str:
+    """The reporting currency for a user's invoices.
+
+    The one asked for, else the currency all their invoices share, else the default.
+    """
+    if currency is None:
+        currencies = [row.currency for row in db.query(Invoice.currency).filter(
+            Invoice.user_id == user_id
+        ).distinct().limit(2)]
+        if len(currencies) == 1 and currencies[0] in settings.SUPPORTED_CURRENCIES:
+            return currencies[0]
+    return resolve_currency(currency)
+
+def _rate_lookup(currency, on_date, before: bool):
+    """Correlated subquery for the closest rate on or before (or else after) ``on_date``"""
+    if before:
+        condition, order = ExchangeRate.rate_date <= on_date, ExchangeRate.rate_date.desc()
+    else:
+        condition, order = ExchangeRate.rate_date > on_date, ExchangeRate.rate_date.asc()
+    return select(ExchangeRate.rate).where(
+        ExchangeRate.currency == currency, condition
+    ).order_by(order).limit(1).correlate_except(ExchangeRate).scalar_subquery()
+
+def rate_expression(currency, on_date):
+    """SQL for the rate of ``currency`` on ``on_date``.
+
+    Uses the latest rate on or before the date, falling back to the earliest
+    one after it for dates that predate the loaded history.
+    """
+    return case(
+        (currency == settings.CURRENCY_RATE_BASE, literal(1)),
+        else_=func.coalesce(_rate_lookup(currency, on_date, True), _rate_lookup(currency, on_date, False))
+    )
+
+def converted_amount(amount, currency, on_datetime, target: str):
+    """SQL expression converting ``amount`` in ``currency`` into ``target`` at the rate of the row's date.
+
+    NULL where either currency has no loaded rate, so SUM() leaves those rows
+    out rather than adding them at 1:1; ``missing_rates`` names them.
+    """
+    on_date = func.date(on_datetime)
+    return case(
+        (currency == target, amount),
+        else_=amount * rate_expression(literal(target), on_date) / rate_expression(currency, on_date)
+    )
+
+def missing_rates(db: Session, user_id: int, target: str) -> List[str]:
+    """Currencies of the user's invoices that can't be converted into ``target`` for lack of any loaded rate"""
+    currencies = {row.currency for row in db.query(Invoice.currency).filter(
+        Invoice.user_id == user_id,
+        Invoice.currency != target
+    ).distinct()}
+    if not currencies:
+        return []
+    needed = (currencies | {target}) - {settings.CURRENCY_RATE_BASE}
+    loaded = {row.currency for row in db.query(ExchangeRate.currency).filter(
+        ExchangeRate.currency.in_(needed)
+    ).distinct()}
+    if target != settings.CURRENCY_RATE_BASE and target not in loaded:
+        return sorted(currencies)
+    return sorted(currencies & (needed - loaded))
+
+class RateCache:
+    """Exchange rates held in memory for conversions done in Python, reloaded when stale"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._rates: Dict[str, Tuple[List[date], List[Decimal]]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Reload on next use; only affects this process, other workers pick up new rates within ``ttl_seconds``"""
+        self._loaded_at = None
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return
+            rates: Dict[str, Tuple[List[date], List[Decimal]]] = {}
+            for currency, rate_date, rate in db.query(
+                ExchangeRate.currency, ExchangeRate.rate_date, ExchangeRate.rate
+            ).order_by(ExchangeRate.currency, ExchangeRate.rate_date):
+                dates, values = rates.setdefault(currency, ([], []))
+                dates.append(rate_date)
+                values.append(Decimal(rate))
+            self._rates = rates
+            self._loaded_at = time.monotonic()
+
+    def rate(self, db: Session, currency: str, on: date) -> Optional[Decimal]:
+        """Rate of ``currency`` on ``on``, chosen the same way as ``rate_expression``"""
+        if currency == settings.CURRENCY_RATE_BASE:
+            return Decimal(1)
+        self._ensure_loaded(db)
+        history = self._rates.get(currency)
+        if not history:
+            return None
+        dates, values = history
+        return values[max(bisect_right(dates, on) - 1, 0)]
+
+    def convert(self, db: Session, amount: Decimal, from_currency: str, to_currency: str, on: date) -> Optional[Decimal]:
+        if from_currency == to_currency:
+            return amount
+        source, target = self.rate(db, from_currency, on), self.rate(db, to_currency, on)
+        if source is None or target is None:
+            return None
+        return amount * target / source
+
+    def latest(self, db: Session, currencies: Iterable[str]) -> Dict[str, Optional[Decimal]]:
+        """Most recent rate of each currency against the base currency"""
+        return {currency: self.rate(db, currency, date.max) for currency in currencies}
+
+def parse_rates_csv(source: TextIO) -> List[dict]:
+    """Read ``date,currency,rate`` rows (rate = units of currency per one base currency unit)"""
+    reader = csv.DictReader(source)
+    missing = {"date", "currency", "rate"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV is missing columns: {sorted(missing)}")
+
+    rows = []
+    for line_number, record in enumerate(reader, start=2):
+        base = (record.get("base") or settings.CURRENCY_RATE_BASE).strip().upper()
+        if base != settings.CURRENCY_RATE_BASE:
+            raise ValueError(f"Line {line_number}: rates must be quoted against {settings.CURRENCY_RATE_BASE}, not {base}")
+        try:
+            rate = Decimal(record["rate"].strip())
+            rate_date = date.fromisoformat(record["date"].strip())
+        except (InvalidOperation, ValueError, AttributeError) as e:
+            raise ValueError(f"Line {line_number}: {e}") from e
+        if rate <= 0:
+            raise ValueError(f"Line {line_number}: rate must be positive")
+        rows.append({"currency": record["currency"].strip().upper(), "rate_date": rate_date, "rate": rate})
+    return rows
+
+def load_rates(db: Session, rows: List[dict], batch_size: int = 1000) -> int:
+    """Insert or overwrite rates in batches; returns the number of rows written"""
+    dialect_name = db.get_bind().dialect.name
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if dialect_name in ("postgresql", "sqlite"):
+            if dialect_name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            stmt = dialect_insert(ExchangeRate).values(batch)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[ExchangeRate.currency, ExchangeRate.rate_date],
+                set_={"rate": stmt.excluded.rate, "updated_at": func.now()}
+            ))
+        else:
+            for row in batch:
+                db.merge(ExchangeRate(**row))
+    db.commit()
+    rate_cache.invalidate()
+    return len(rows)
+
+# Global rate cache instance
+rate_cache = RateCache(settings.CURRENCY_RATE_CACHE_SECONDS)
@@ -1,19 +1,156 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from fastapi import Depends, Request
 from .config import settings
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import hashlib
+import hmac
+import itertools
+import threading
+import time
 import os
 
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        connect_args={"check_same_thread": False} if "sqlite" in url else {},
+        echo=settings.DEBUG
+    )
+
 # Create database engine
 database_url = os.getenv("DATABASE_URL", "sqlite:///./quickbird.db")
-engine = create_engine(
-    database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in database_url else {},
-    echo=settings.DEBUG
-)
+engine = _create_engine(database_url)
+
+# Optional read replicas (comma-separated URLs). Without any, reads use the primary.
+replica_urls = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+replica_engines: List = [_create_engine(url) for url in replica_urls]
+_replica_cycle = itertools.cycle(replica_engines) if replica_engines else None
+_replica_lock = threading.Lock()
+
+class ReadYourWritesTracker:
+    """Remembers when each user last committed a write so their reads stay on the primary.
+
+    Only covers this process; the last-write cookie carries the same guarantee
+    across workers for clients that send it back.
+    """
+
+    def __init__(self):
+        self.last_write: Dict[int, float] = {}
+        self.last_cleanup = time.monotonic()
+        # Commits are recorded from threadpool threads
+        self._lock = threading.Lock()
+
+    def record_write(self, user_id: int):
+        now = time.monotonic()
+        with self._lock:
+            self.last_write[user_id] = now
+
+            # Cleanup stale entries every 5 minutes
+            if now - self.last_cleanup > 300:
+                cutoff = now - settings.READ_YOUR_WRITES_SECONDS
+                for uid in [uid for uid, ts in self.last_write.items() if ts <= cutoff]:
+                    self.last_write.pop(uid, None)
+                self.last_cleanup = now
+
+    def is_sticky(self, user_id: int) -> bool:
+        last_write = self.last_write.get(user_id)
+        if last_write is None:
+            return False
+        return time.monotonic() - last_write < settings.READ_YOUR_WRITES_SECONDS
+
+# Global read-your-writes tracker (per process)
+read_your_writes = ReadYourWritesTracker()
+
+# Signed wall-clock time of the client's last write, readable by every worker
+LAST_WRITE_COOKIE = "qb_last_write"
+
+# Per request: "last_write" from the client's cookie and "wrote_at" if this request committed a write
+_request_writes: ContextVar[Optional[dict]] = ContextVar("request_writes", default=None)
+
+def _sign(value: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), value.encode(), hashlib.sha256).hexdigest()
+
+def last_write_cookie(wrote_at: float) -> str:
+    value = f"{wrote_at:.3f}"
+    return f"{value}.{_sign(value)}"
+
+def parse_last_write_cookie(cookie: Optional[str]) -> Optional[float]:
+    """The write time in a last-write cookie, or None if it is missing or not signed by us"""
+    if not cookie or "." not in cookie:
+        return None
+    value, signature = cookie.rsplit(".", 1)
+    if not hmac.compare_digest(signature, _sign(value)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _recently_wrote() -> bool:
+    state = _request_writes.get()
+    last_write = state.get("last_write") if state else None
+    return last_write is not None and time.time() - last_write < settings.READ_YOUR_WRITES_SECONDS
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """Keep a client's reads on the primary for a while after it writes, whichever worker serves them"""
+    state = {"last_write": parse_last_write_cookie(request.cookies.get(LAST_WRITE_COOKIE)), "wrote_at": None}
+    _request_writes.set(state)
+    response = await call_next(request)
+    if state["wrote_at"] is not None:
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            last_write_cookie(state["wrote_at"]),
+            max_age=settings.READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+class RoutingSession(Session):
+    """Session that sends read-only work to a replica and everything else to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self.info.get("read_only") or _replica_cycle is None:
+            return engine
+
+        # Read-your-writes: users who wrote recently keep reading from the primary
+        primary_session = self.info.get("primary_session")
+        user_id = primary_session.info.get("user_id") if primary_session is not None else None
+        if (user_id is not None and read_your_writes.is_sticky(user_id)) or _recently_wrote():
+            return engine
+
+        with _replica_lock:
+            return next(_replica_cycle)
+
+    def flush(self, objects=None):
+        if self.info.get("read_only") and (self.new or self.dirty or self.deleted):
+            raise RuntimeError("Attempted to write through a read-only session")
+        super().flush(objects)
+
+# Create session factories
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession, info={"read_only": True})
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_session_wrote(session, flush_context):
+    session.info["has_writes"] = True
+
+@event.listens_for(SessionLocal, "after_bulk_update")
+@event.listens_for(SessionLocal, "after_bulk_delete")
+def _mark_session_bulk_wrote(update_context):
+    update_context.session.info["has_writes"] = True
+
+@event.listens_for(SessionLocal, "after_commit")
+def _record_user_write(session):
+    if not session.info.pop("has_writes", False):
+        return
+    if session.info.get("user_id") is not None:
+        read_your_writes.record_write(session.info["user_id"])
+    state = _request_writes.get()
+    if state is not None:
+        state["wrote_at"] = time.time()
 
 # Create base class for models
 Base = declarative_base()
@@ -25,3 +162,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db(primary: Session = Depends(get_db)):
+    """Dependency to get a read-only session routed to a replica when one is configured"""
+    db = ReadSessionLocal(info={"primary_session": primary})
+    try:
+        yield db
+    finally:
+        db.close()
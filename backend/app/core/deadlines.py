@@ -0,0 +1,240 @@
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import List
+import logging
+
+from .config import settings
+from .database import SessionLocal
+from .notifications import publish_notifications, store_notifications
+from .scheduler import claim_job_lease, release_job_lease
+from ..models.task import Task
+from ..models.invoice import Invoice
+from ..models.project import Project
+from ..models.scan_watermark import DeadlineNotice, ScanWatermark
+from ..schemas.notification import NotificationCreate, NotificationType, NotificationPriority
+
+logger = logging.getLogger(__name__)
+
+# How long one worker may hold the scan before another may take over
+LEASE = timedelta(minutes=10)
+
+# Invoices that have gone out but are not settled
+OPEN_INVOICE_STATUSES = ("sent", "overdue")
+
+def project_deadline_notification(project) -> NotificationCreate:
+    return NotificationCreate(
+        title="Project Deadline Approaching",
+        message=f"Project '{project.title}' deadline is approaching on {project.deadline.strftime('%B %d, %Y')}",
+        type=NotificationType.PROJECT_DEADLINE,
+        priority=NotificationPriority.HIGH,
+        related_entity_type="project",
+        related_entity_id=project.id
+    )
+
+def task_overdue_notification(task) -> NotificationCreate:
+    return NotificationCreate(
+        title="Task Overdue",
+        message=f"Task '{task.title}' was due on {task.due_date.strftime('%B %d, %Y')}",
+        type=NotificationType.TASK_DUE,
+        priority=NotificationPriority.HIGH,
+        related_entity_type="task",
+        related_entity_id=task.id
+    )
+
+def invoice_overdue_notification(invoice) -> NotificationCreate:
+    return NotificationCreate(
+        title="Invoice Overdue",
+        message=f"Invoice {invoice.invoice_number} for {invoice.client_name} was due on {invoice.due_date.strftime('%B %d, %Y')}",
+        type=NotificationType.INVOICE_OVERDUE,
+        priority=NotificationPriority.HIGH,
+        related_entity_type="invoice",
+        related_entity_id=invoice.id
+    )
+
+# (name, model, date column, filters, selected columns, notification builder, looks ahead of now,
+#  columns whose change marks a row as created or edited)
+SCANNERS = [
+    (
+        "task_overdue", Task, Task.due_date,
+        [Task.status != "completed"],
+        [Task.id, Task.user_id, Task.title, Task.due_date],
+        task_overdue_notification, False,
+        [Task.updated_at]
+    ),
+    (
+        "invoice_overdue", Invoice, Invoice.due_date,
+        [Invoice.status.in_(OPEN_INVOICE_STATUSES)],
+        [Invoice.id, Invoice.user_id, Invoice.invoice_number, Invoice.client_name, Invoice.due_date],
+        invoice_overdue_notification, False,
+        [Invoice.created_at, Invoice.updated_at]
+    ),
+    (
+        "project_deadline", Project, Project.deadline,
+        [Project.status == "active", Project.is_archived == False],
+        [Project.id, Project.user_id, Project.title, Project.deadline],
+        project_deadline_notification, True,
+        [Project.updated_at]
+    ),
+]
+
+def ensure_deadline_indexes(engine):
+    """Create the date indexes the scanner relies on for tables created before they existed"""
+    for _, model, date_column, *_, changed in SCANNERS:
+        for column in [date_column, *changed]:
+            for index in model.__table__.indexes:
+                if [c.name for c in index.columns] == [column.key]:
+                    index.create(bind=engine, checkfirst=True)
+
+def _watermark(db: Session, name: str, now: datetime) -> ScanWatermark:
+    watermark = db.query(ScanWatermark).filter(ScanWatermark.name == name).first()
+    if watermark is None:
+        # Don't flood users with notifications about everything that was already due
+        watermark = ScanWatermark(name=name, scanned_until=now - timedelta(hours=settings.DEADLINE_BACKFILL_HOURS))
+        db.add(watermark)
+    return watermark
+
+def _record_notices(db: Session, name: str, notices: List[dict]):
+    """Insert or overwrite the notified date of each row"""
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(DeadlineNotice).values(notices)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[DeadlineNotice.scanner, DeadlineNotice.entity_id],
+            set_={"notified_date": stmt.excluded.notified_date, "notified_at": func.now()}
+        ))
+    else:
+        for notice in notices:
+            db.merge(DeadlineNotice(**notice))
+
+def _notify(db: Session, name: str, date_key: str, build, rows, stored: List[dict]) -> int:
+    """Store notifications for rows not yet notified about their current date, in the caller's transaction"""
+    notified = dict(db.query(DeadlineNotice.entity_id, DeadlineNotice.notified_date).filter(
+        DeadlineNotice.scanner == name,
+        DeadlineNotice.entity_id.in_([row.id for row in rows])
+    ).all())
+    rows = [row for row in rows if notified.get(row.id) != getattr(row, date_key)]
+    if not rows:
+        return 0
+    stored.extend(store_notifications(db, [(row.user_id, build(row)) for row in rows]))
+    _record_notices(db, name, [
+        {"scanner": name, "entity_id": row.id, "notified_date": getattr(row, date_key)} for row in rows
+    ])
+    return len(rows)
+
+def scan(db: Session, name: str, now: datetime) -> int:
+    """Notify about rows whose date entered the scanner's window since its last run.
+
+    Rows created or edited since then with a date the window had already passed
+    are found through the scanner's change columns; they are notified only if
+    their date differs from the one last notified about. Notifications, notices
+    and watermarks are committed together, then pushed.
+    """
+    _, model, date_column, filters, columns, build, lookahead, changed = next(s for s in SCANNERS if s[0] == name)
+    watermark = _watermark(db, name, now)
+    changes = _watermark(db, f"{name}_changes", now)
+    lower = watermark.scanned_until
+    upper = now + timedelta(days=settings.DEADLINE_LOOKAHEAD_DAYS) if lookahead else now
+
+    sent = 0
+    stored: List[dict] = []
+    last_key = None
+    while upper > lower:
+        # Range query on the indexed date column, walked in keyset batches
+        query = db.query(*columns).filter(date_column > lower, date_column <= upper, *filters)
+        if last_key is not None:
+            query = query.filter((date_column > last_key[0]) | ((date_column == last_key[0]) & (model.id > last_key[1])))
+        rows = query.order_by(date_column, model.id).limit(settings.DEADLINE_SCAN_BATCH_SIZE).all()
+        if not rows:
+            break
+
+        sent += _notify(db, name, date_column.key, build, rows, stored)
+        last_row = rows[-1]
+        last_key = (getattr(last_row, date_column.key), last_row.id)
+        if len(rows) < settings.DEADLINE_SCAN_BATCH_SIZE:
+            break
+
+    # Rows the date window can no longer see: their date was already behind it when they were saved
+    passed = [date_column <= lower]
+    if lookahead:
+        passed.append(date_column > now)
+    changed_since = or_(*((column > changes.scanned_until) & (column <= now) for column in changed))
+    last_id = None
+    while True:
+        query = db.query(*columns).filter(changed_since, *passed, *filters)
+        if last_id is not None:
+            query = query.filter(model.id > last_id)
+        rows = query.order_by(model.id).limit(settings.DEADLINE_SCAN_BATCH_SIZE).all()
+        if not rows:
+            break
+
+        sent += _notify(db, name, date_column.key, build, rows, stored)
+        last_id = rows[-1].id
+        if len(rows) < settings.DEADLINE_SCAN_BATCH_SIZE:
+            break
+
+    watermark.scanned_until = max(upper, lower)
+    changes.scanned_until = now
+    db.commit()
+    publish_notifications(db, stored)
+    return sent
+
+def run_deadline_scan(now: datetime = None):
+    """Periodic job: notify about overdue tasks and invoices and approaching project deadlines.
+
+    Every worker runs the job; the lease lets only one of them scan at a time.
+    """
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        token = claim_job_lease(db, "deadline_scan", LEASE)
+        if token is None:
+            return
+        try:
+            for name, *_ in SCANNERS:
+                sent = scan(db, name, now)
+                if sent:
+                    logger.info(f"Deadline scan {name}: {sent} notifications")
+        finally:
+            db.rollback()
+            release_job_lease(db, "deadline_scan", token)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def deadline_stats(db: Session, user_id: int, now: datetime = None) -> dict:
+    """Overdue and upcoming counts for the notification stats endpoint"""
+    now = now or datetime.utcnow()
+    horizon = now + timedelta(days=settings.DEADLINE_LOOKAHEAD_DAYS)
+
+    overdue_tasks = db.query(Task).filter(
+        Task.user_id == user_id,
+        Task.due_date < now,
+        Task.status != "completed"
+    ).count()
+
+    overdue_invoices = db.query(Invoice).filter(
+        Invoice.user_id == user_id,
+        Invoice.due_date < now,
+        Invoice.status.in_(OPEN_INVOICE_STATUSES)
+    ).count()
+
+    upcoming_deadlines = db.query(Project).filter(
+        Project.user_id == user_id,
+        Project.deadline >= now,
+        Project.deadline <= horizon,
+        Project.status == "active",
+        Project.is_archived == False
+    ).count()
+
+    return {
+        "overdue_tasks": overdue_tasks,
+        "overdue_invoices": overdue_invoices,
+        "upcoming_deadlines": upcoming_deadlines
+    }
@@ -0,0 +1,56 @@
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import Query
+from typing import Any, List, Optional, Tuple, Type
+from functools import lru_cache
+
+from .pagination import NEXT_CURSOR_HEADER
+from .responses import FastJSONResponse
+
+def parse_fields(fields: Optional[str], model: Any, schema: Type[BaseModel]) -> Optional[List[str]]:
+    """Parse a ``?fields=`` value into column names allowed for ``model``.
+
+    Only plain columns that are also part of the response schema can be
+    selected, so relationships and internal columns are never exposed.
+    Returns None when no sparse fieldset was requested.
+    """
+    if not fields:
+        return None
+
+    allowed = set(schema.model_fields) & {column.key for column in model.__table__.columns}
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    invalid = [name for name in names if name not in allowed]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid fields: {invalid}. Allowed fields: {sorted(allowed)}"
+        )
+
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+def select_fields(query: Query, model: Any, names: List[str]) -> Query:
+    """Restrict a query to the requested columns (plus the pagination keys)"""
+    selected = list(dict.fromkeys(["id", "created_at", *names]))
+    return query.with_entities(*(getattr(model, name) for name in selected))
+
+@lru_cache(maxsize=256)
+def _partial_adapter(schema: Type[BaseModel], names: Tuple[str, ...]) -> TypeAdapter:
+    """List adapter for a copy of ``schema`` holding only ``names``, so values serialize the same way"""
+    partial = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, None) for name in names}
+    )
+    return TypeAdapter(List[partial])
+
+def sparse_response(rows: List[Any], names: List[str], schema: Type[BaseModel], response: Response) -> FastJSONResponse:
+    """Serialize projected rows, keeping pagination headers set on ``response``"""
+    headers = {}
+    if NEXT_CURSOR_HEADER in response.headers:
+        headers[NEXT_CURSOR_HEADER] = response.headers[NEXT_CURSOR_HEADER]
+
+    adapter = _partial_adapter(schema, tuple(names))
+    content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+    return FastJSONResponse(content=content, headers=headers)
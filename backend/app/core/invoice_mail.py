@@ -0,0 +1,146 @@
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional, Tuple
+import html
+
+from .mailer import enqueue_email
+from ..models.invoice import Invoice
+from ..models.user import User
+
+def _details(invoice: Invoice) -> Tuple[str, str, str, str]:
+    client_name = invoice.client.name if invoice.client else invoice.client_name or "Client"
+    issued = (invoice.sent_date or invoice.created_at or datetime.utcnow()).strftime('%B %d, %Y')
+    due = invoice.due_date.strftime('%B %d, %Y') if invoice.due_date else 'N/A'
+    total = f"{invoice.currency} {invoice.total_amount:,.2f}"
+    return client_name, issued, due, total
+
+def build_invoice_email(invoice: Invoice, user: User, custom_message: Optional[str]) -> Tuple[str, str, str]:
+    """Subject, plain-text and HTML bodies of an invoice email"""
+    sender = user.full_name or user.username
+    client_name, issued, due, total = _details(invoice)
+
+    subject = f"Invoice {invoice.invoice_number} from {sender}"
+
+    text_body = "\n".join([
+        f"Dear {client_name},",
+        "",
+        "Please find attached your invoice for the services provided.",
+        "",
+        f"Invoice Number: {invoice.invoice_number}",
+        f"Date: {issued}",
+        f"Due Date: {due}",
+        f"Total Amount: {total}",
+        "",
+        *([custom_message, ""] if custom_message else []),
+        "Thank you for your business!",
+        "",
+        "Best regards,",
+        sender,
+        user.email,
+    ])
+
+    # HTML email template
+    html_body = f"""
+    <html>
+    <body>
+        <h2>Invoice {html.escape(invoice.invoice_number)}</h2>
+        <p>Dear {html.escape(client_name)},</p>
+
+        <p>Please find attached your invoice for the services provided.</p>
+
+        <h3>Invoice Details:</h3>
+        <ul>
+            <li><strong>Invoice Number:</strong> {html.escape(invoice.invoice_number)}</li>
+            <li><strong>Date:</strong> {issued}</li>
+            <li><strong>Due Date:</strong> {due}</li>
+            <li><strong>Total Amount:</strong> {html.escape(total)}</li>
+        </ul>
+
+        {f'<p>{html.escape(custom_message)}</p>' if custom_message else ''}
+
+        <p>Thank you for your business!</p>
+
+        <p>Best regards,<br>
+        {html.escape(sender)}<br>
+        {html.escape(user.email)}</p>
+    </body>
+    </html>
+    """
+
+    return subject, text_body, html_body
+
+def build_invoice_reminder_email(invoice: Invoice, user: User) -> Tuple[str, str, str]:
+    """Subject, plain-text and HTML bodies of a payment reminder"""
+    sender = user.full_name or user.username
+    client_name, _, due, total = _details(invoice)
+
+    subject = f"Reminder: invoice {invoice.invoice_number} is due {due}"
+
+    text_body = "\n".join([
+        f"Dear {client_name},",
+        "",
+        f"This is a friendly reminder that invoice {invoice.invoice_number} for {total} is due on {due}.",
+        "",
+        "If you have already paid, please disregard this message.",
+        "",
+        "Best regards,",
+        sender,
+        user.email,
+    ])
+
+    html_body = f"""
+    <html>
+    <body>
+        <p>Dear {html.escape(client_name)},</p>
+
+        <p>This is a friendly reminder that invoice <strong>{html.escape(invoice.invoice_number)}</strong>
+        for <strong>{html.escape(total)}</strong> is due on {due}.</p>
+
+        <p>If you have already paid, please disregard this message.</p>
+
+        <p>Best regards,<br>
+        {html.escape(sender)}<br>
+        {html.escape(user.email)}</p>
+    </body>
+    </html>
+    """
+
+    return subject, text_body, html_body
+
+def queue_invoice_email(
+    db: Session,
+    invoice: Invoice,
+    user: User,
+    recipient_email: str,
+    pdf: bytes,
+    custom_message: Optional[str] = None
+):
+    """Queue an invoice email with its PDF attached; sent once the caller commits"""
+    subject, text_body, html_body = build_invoice_email(invoice, user, custom_message)
+    enqueue_email(
+        db,
+        to_address=recipient_email,
+        subject=subject,
+        text_body=text_body,
+        html_body=html_body,
+        reply_to=user.email,
+        user_id=user.id,
+        related_entity_type="invoice",
+        related_entity_id=invoice.id,
+        attachments=[(f"{invoice.invoice_number}.pdf", "application/pdf", pdf)]
+    )
+
+def queue_invoice_reminder(db: Session, invoice: Invoice, user: User):
+    """Queue a payment reminder to the invoice's client"""
+    subject, text_body, html_body = build_invoice_reminder_email(invoice, user)
+    enqueue_email(
+        db,
+        to_address=invoice.client_email,
+        subject=subject,
+        text_body=text_body,
+        html_body=html_body,
+        reply_to=user.email,
+        user_id=user.id,
+        related_entity_type="invoice",
+        related_entity_id=invoice.id
+    )
@@ -0,0 +1,102 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from datetime import datetime
+from string import Formatter
+from typing import List, Optional
+import re
+
+from .config import settings
+from ..models.invoice import Invoice, InvoiceSequence
+
+def _period(now: datetime) -> str:
+    return str(now.year) if settings.INVOICE_NUMBER_RESET == "yearly" else ""
+
+def _number_pattern(user_id: int, period: str) -> "re.Pattern[str]":
+    """Matches the user's numbers in INVOICE_NUMBER_FORMAT for ``period``, capturing the sequence"""
+    parts = []
+    for literal, field, spec, _ in Formatter().parse(settings.INVOICE_NUMBER_FORMAT):
+        parts.append(re.escape(literal))
+        if field is None:
+            continue
+        if field == "seq":
+            parts.append(r"(?P<seq>\d+)")
+        elif field == "user_id":
+            parts.append(re.escape(format(user_id, spec)))
+        elif field == "year" and period:
+            parts.append(re.escape(format(int(period), spec)))
+        else:
+            parts.append(r"\d+")
+    return re.compile("".join(parts))
+
+def _seed(db: Session, user_id: int, period: str) -> int:
+    """Starting point for a new sequence: the highest number the user already has.
+
+    Counting invoices would fall short once some were deleted and hand out a
+    number that is still taken.
+    """
+    pattern = _number_pattern(user_id, period)
+    seed = 0
+    for (number,) in db.query(Invoice.invoice_number).filter(Invoice.user_id == user_id):
+        match = pattern.fullmatch(number or "")
+        if match:
+            seed = max(seed, int(match.group("seq")))
+    return seed
+
+def _increment(db: Session, user_id: int, period: str, count: int) -> Optional[int]:
+    """Advance an existing sequence by ``count`` and return the new value, or None if there is none yet"""
+    stmt = update(InvoiceSequence).where(
+        InvoiceSequence.user_id == user_id,
+        InvoiceSequence.period == period
+    ).values(last_value=InvoiceSequence.last_value + count)
+
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(InvoiceSequence.last_value)).scalar()
+
+    # The UPDATE holds the row lock until commit, so reading it back is race-free
+    if not db.execute(stmt).rowcount:
+        return None
+    return db.query(InvoiceSequence.last_value).filter(
+        InvoiceSequence.user_id == user_id,
+        InvoiceSequence.period == period
+    ).scalar()
+
+def _create(db: Session, user_id: int, period: str, count: int) -> int:
+    """Start a sequence, or advance it if a concurrent request just started it"""
+    last_value = _seed(db, user_id, period) + count
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(InvoiceSequence).values(user_id=user_id, period=period, last_value=last_value)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[InvoiceSequence.user_id, InvoiceSequence.period],
+            set_={"last_value": InvoiceSequence.last_value + count}
+        )
+        return db.execute(stmt.returning(InvoiceSequence.last_value)).scalar()
+
+    db.add(InvoiceSequence(user_id=user_id, period=period, last_value=last_value))
+    db.flush()
+    return last_value
+
+def next_invoice_numbers(db: Session, user_id: int, count: int, now: Optional[datetime] = None) -> List[str]:
+    """Allocate a block of ``count`` consecutive invoice numbers for the user.
+
+    The sequence row stays locked until the caller's transaction ends, so
+    allocate as late as possible and commit promptly. A rolled-back
+    transaction gives its numbers back.
+    """
+    now = now or datetime.utcnow()
+    period = _period(now)
+    last = _increment(db, user_id, period, count)
+    if last is None:
+        last = _create(db, user_id, period, count)
+    return [
+        settings.INVOICE_NUMBER_FORMAT.format(user_id=user_id, seq=seq, year=now.year, month=now.month)
+        for seq in range(last - count + 1, last + 1)
+    ]
+
+def next_invoice_number(db: Session, user_id: int, now: Optional[datetime] = None) -> str:
+    """Allocate the user's next invoice number"""
+    return next_invoice_numbers(db, user_id, 1, now)[0]
@@ -0,0 +1,324 @@
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import textwrap
+import time
+import uuid
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, in points
+MARGIN = 50
+ROW_HEIGHT = 16
+
+# Helvetica advance widths (per 1000 em) for the characters used in amounts; others use the average
+_CHAR_WIDTHS = {**{digit: 556 for digit in "0123456789"}, ".": 278, ",": 278, " ": 278, "-": 333, "%": 889}
+
+def _text_width(text: str, size: float) -> float:
+    return sum(_CHAR_WIDTHS.get(char, 556) for char in text) * size / 1000
+
+def _escape(text: str) -> str:
+    # Content streams are written out as latin-1, so this leaves the fonts' WinAnsi (cp1252) bytes, e.g. for "€"
+    text = text.encode("cp1252", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _money(amount, currency: str) -> str:
+    return f"{currency} {Decimal(str(amount)):,.2f}"
+
+def _number(value: str) -> str:
+    return f"{Decimal(value).normalize():f}"
+
+def _date(value) -> str:
+    return value.strftime("%B %d, %Y") if value else "N/A"
+
+def invoice_document(invoice, user) -> dict:
+    """Plain, picklable snapshot of everything that appears on the PDF"""
+    return {
+        "invoice_number": invoice.invoice_number,
+        "title": invoice.title,
+        "status": invoice.status,
+        "issued": _date(invoice.sent_date or invoice.created_at),
+        "due": _date(invoice.due_date),
+        "from_name": user.full_name or user.username,
+        "from_email": user.email,
+        "client_name": invoice.client_name,
+        "client_email": invoice.client_email,
+        "client_address": invoice.client_address,
+        "project_title": invoice.project_title,
+        "currency": invoice.currency,
+        "items": [
+            [item.description, str(item.quantity), str(item.unit_price), str(item.total_price)]
+            for item in sorted(invoice.items, key=lambda item: item.id)
+        ],
+        "subtotal": str(invoice.subtotal),
+        "tax_rate": str(invoice.tax_rate),
+        "tax_amount": str(invoice.tax_amount),
+        "total_amount": str(invoice.total_amount),
+        "notes": invoice.notes,
+        "terms": invoice.terms,
+    }
+
+def document_hash(document: dict) -> str:
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()
+
+class _Page:
+    def __init__(self):
+        self.ops: List[str] = []
+
+    def text(self, x: float, y: float, text: str, size: float = 10, bold: bool = False):
+        font = "F2" if bold else "F1"
+        self.ops.append(f"BT /{font} {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET")
+
+    def text_right(self, right: float, y: float, text: str, size: float = 10, bold: bool = False):
+        self.text(right - _text_width(text, size), y, text, size, bold)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float):
+        self.ops.append(f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+
+def _item_header(page: _Page, y: float):
+    page.text(MARGIN, y, "Description", bold=True)
+    page.text_right(380, y, "Qty", bold=True)
+    page.text_right(470, y, "Unit price", bold=True)
+    page.text_right(PAGE_WIDTH - MARGIN, y, "Amount", bold=True)
+    page.line(MARGIN, y - 5, PAGE_WIDTH - MARGIN, y - 5)
+
+def _layout(document: dict) -> List[_Page]:
+    currency = document["currency"]
+    pages = [_Page()]
+    page = pages[0]
+    y = PAGE_HEIGHT - MARGIN - 10
+
+    page.text(MARGIN, y, "INVOICE", size=22, bold=True)
+    page.text_right(PAGE_WIDTH - MARGIN, y, document["invoice_number"], size=12, bold=True)
+    y -= 20
+    page.text_right(PAGE_WIDTH - MARGIN, y, f"Issued: {document['issued']}")
+    y -= 14
+    page.text_right(PAGE_WIDTH - MARGIN, y, f"Due: {document['due']}")
+    if document["title"]:
+        page.text(MARGIN, y, document["title"], size=12)
+    y -= 36
+
+    page.text(MARGIN, y, "From", bold=True)
+    page.text(320, y, "Bill to", bold=True)
+    from_lines = [document["from_name"], document["from_email"]]
+    to_lines = [document["client_name"], document["client_email"]]
+    to_lines += (document["client_address"] or "").splitlines()
+    for index in range(max(len(from_lines), len(to_lines))):
+        y -= 14
+        if index < len(from_lines):
+            page.text(MARGIN, y, from_lines[index])
+        if index < len(to_lines):
+            page.text(320, y, to_lines[index])
+    if document["project_title"]:
+        y -= 24
+        page.text(MARGIN, y, f"Project: {document['project_title']}")
+    y -= 36
+
+    _item_header(page, y)
+    y -= ROW_HEIGHT + 4
+    for description, quantity, unit_price, total_price in document["items"]:
+        lines = textwrap.wrap(description, 55) or [""]
+        if y - ROW_HEIGHT * len(lines) < MARGIN + 40:
+            page = _Page()
+            pages.append(page)
+            y = PAGE_HEIGHT - MARGIN - 10
+            _item_header(page, y)
+            y -= ROW_HEIGHT + 4
+        page.text_right(380, y, _number(quantity))
+        page.text_right(470, y, _money(unit_price, currency))
+        page.text_right(PAGE_WIDTH - MARGIN, y, _money(total_price, currency))
+        for line in lines:
+            page.text(MARGIN, y, line)
+            y -= ROW_HEIGHT
+
+    footer = [("Subtotal", _money(document["subtotal"], currency), False)]
+    if Decimal(document["tax_amount"]):
+        footer.append((f"Tax ({_number(document['tax_rate'])}%)", _money(document["tax_amount"], currency), False))
+    footer.append(("Total", _money(document["total_amount"], currency), True))
+
+    notes = []
+    for heading, body in (("Notes", document["notes"]), ("Terms", document["terms"])):
+        if body:
+            notes.append((heading, [line for paragraph in body.splitlines() for line in (textwrap.wrap(paragraph, 95) or [""])]))
+    needed = 10 + len(footer) * ROW_HEIGHT + sum(30 + 13 * len(lines) for _, lines in notes)
+    if y - needed < MARGIN:
+        page = _Page()
+        pages.append(page)
+        y = PAGE_HEIGHT - MARGIN - 10
+
+    page.line(330, y + 8, PAGE_WIDTH - MARGIN, y + 8)
+    y -= 6
+    for label, amount, bold in footer:
+        page.text(340, y, label, bold=bold)
+        page.text_right(PAGE_WIDTH - MARGIN, y, amount, bold=bold)
+        y -= ROW_HEIGHT
+
+    for heading, lines in notes:
+        y -= 14
+        page.text(MARGIN, y, heading, bold=True)
+        for line in lines:
+            y -= 13
+            page.text(MARGIN, y, line, size=9)
+
+    return pages
+
+def render_invoice_pdf(document: dict) -> bytes:
+    """Render an invoice document to PDF bytes (pure function, safe to run in a worker process)"""
+    pages = _layout(document)
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in once the page objects are numbered
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    page_refs = []
+    for page in pages:
+        stream = "\n".join(page.ops).encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        content_number = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_number} 0 R >>"
+        )
+        page_refs.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(page_refs)} >>"
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        body = body if isinstance(body, bytes) else body.encode("latin-1")
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    return bytes(output)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _render_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs threads can copy held locks into the child
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+def shutdown_render_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def render_invoice_pdfs(documents: List[dict]) -> List[bytes]:
+    """Render many documents across the process pool, blocking until all are done"""
+    return list(_render_pool().map(render_invoice_pdf, documents))
+
+def _cache_dir(invoice_id: int) -> str:
+    return os.path.join(settings.INVOICE_PDF_CACHE_DIR, str(invoice_id))
+
+def _store_render(directory: str, path: str, pdf: bytes):
+    """Write a render atomically, so concurrent readers see the whole file or none of it"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    for attempt in range(2):
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pdf)
+            break
+        except FileNotFoundError:
+            # The pruning job removed the directory after it was created
+            if attempt:
+                raise
+    os.replace(tmp_path, path)
+
+def _touch(path: str) -> bool:
+    """Mark a cached render as just served; False if it isn't cached"""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+async def get_invoice_pdf(invoice, user) -> Tuple[str, str]:
+    """Path to the invoice's PDF, rendering it in the process pool on a cache miss.
+
+    Renders are keyed by invoice id and a hash of the rendered content, so
+    any edit produces a new cache entry. Returns (path, content hash).
+    Nothing here deletes renders; prune_invoice_pdf_cache removes them once
+    no request can still be reading them.
+    """
+    document = invoice_document(invoice, user)
+    digest = document_hash(document)
+    directory = _cache_dir(invoice.id)
+    path = os.path.join(directory, f"{digest}.pdf")
+    loop = asyncio.get_running_loop()
+    if await loop.run_in_executor(None, _touch, path):
+        return path, digest
+
+    pdf = await loop.run_in_executor(_render_pool(), render_invoice_pdf, document)
+    await loop.run_in_executor(None, _store_render, directory, path, pdf)
+    return path, digest
+
+def prune_invoice_pdf_cache(now: Optional[float] = None) -> int:
+    """Remove superseded renders after a grace period and renders not served for a while.
+
+    An invoice's newest render is kept until it goes unserved for
+    INVOICE_PDF_CACHE_DAYS; older ones (and leftover temp files) go after
+    INVOICE_PDF_SUPERSEDED_MINUTES. Returns the number of files removed.
+    """
+    now = now or time.time()
+    superseded_before = now - settings.INVOICE_PDF_SUPERSEDED_MINUTES * 60
+    unused_before = now - settings.INVOICE_PDF_CACHE_DAYS * 86400
+    if not os.path.isdir(settings.INVOICE_PDF_CACHE_DIR):
+        return 0
+
+    removed = 0
+    for invoice_dir in os.scandir(settings.INVOICE_PDF_CACHE_DIR):
+        if not invoice_dir.is_dir():
+            continue
+        entries = []
+        for entry in os.scandir(invoice_dir.path):
+            try:
+                entries.append((entry.stat().st_mtime, entry))
+            except FileNotFoundError:
+                pass
+        renders = sorted((item for item in entries if item[1].name.endswith(".pdf")), key=lambda item: item[0])
+        newest = renders[-1][1].path if renders else None
+        for mtime, entry in entries:
+            cutoff = unused_before if entry.path == newest else superseded_before
+            if mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        try:
+            os.rmdir(invoice_dir.path)
+        except OSError:
+            # Not empty, or already gone
+            pass
+    return removed
+
+def run_invoice_pdf_pruning():
+    """Periodic job: remove old renders from the invoice PDF cache"""
+    removed = prune_invoice_pdf_cache()
+    if removed:
+        logger.info(f"Invoice PDF cache: {removed} renders removed")
@@ -0,0 +1,205 @@
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import make_msgid
+from typing import Iterable, List, Optional, Tuple
+import logging
+import smtplib
+
+from .config import settings
+from .database import SessionLocal
+from ..models.outbound_email import OutboundEmail, OutboundEmailAttachment
+
+logger = logging.getLogger(__name__)
+
+# How long a worker may hold a claimed email before another worker may retry it
+LEASE = timedelta(minutes=5)
+
+# Upper bound for the retry delay, however many attempts have failed
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+class TransientConnectionError(Exception):
+    """The SMTP server couldn't be reached; the rest of the batch should wait too"""
+
+def enqueue_email(
+    db: Session,
+    to_address: str,
+    subject: str,
+    text_body: str,
+    html_body: Optional[str] = None,
+    reply_to: Optional[str] = None,
+    user_id: Optional[int] = None,
+    related_entity_type: Optional[str] = None,
+    related_entity_id: Optional[int] = None,
+    attachments: Iterable[Tuple[str, str, bytes]] = ()
+) -> OutboundEmail:
+    """Queue an email for delivery; it is sent once the caller commits.
+
+    ``attachments`` are (filename, content type, content) tuples.
+    """
+    email = OutboundEmail(
+        user_id=user_id,
+        to_address=to_address,
+        reply_to=reply_to,
+        subject=subject,
+        text_body=text_body,
+        html_body=html_body,
+        related_entity_type=related_entity_type,
+        related_entity_id=related_entity_id,
+        next_attempt_at=datetime.utcnow(),
+        attachments=[
+            OutboundEmailAttachment(filename=filename, content_type=content_type, content=content)
+            for filename, content_type, content in attachments
+        ]
+    )
+    db.add(email)
+    return email
+
+def build_message(email: OutboundEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = email.subject
+    message["From"] = settings.MAIL_FROM_ADDRESS
+    message["To"] = email.to_address
+    if email.reply_to:
+        message["Reply-To"] = email.reply_to
+    message["Message-ID"] = make_msgid()
+    message.set_content(email.text_body)
+    if email.html_body:
+        message.add_alternative(email.html_body, subtype="html")
+    for attachment in email.attachments:
+        maintype, _, subtype = attachment.content_type.partition("/")
+        message.add_attachment(attachment.content, maintype=maintype, subtype=subtype, filename=attachment.filename)
+    return message
+
+class SMTPConnection:
+    """One SMTP session reused across messages, reopened when dropped or after a message limit"""
+
+    def __init__(self):
+        self.smtp: Optional[smtplib.SMTP] = None
+        self.sent = 0
+
+    def _connect(self):
+        self.close()
+        try:
+            smtp = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=30)
+            if settings.SMTP_TLS:
+                smtp.starttls()
+            if settings.SMTP_USERNAME:
+                smtp.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        except (OSError, smtplib.SMTPException) as e:
+            raise TransientConnectionError(f"SMTP connection failed: {e}") from e
+        self.smtp = smtp
+        self.sent = 0
+
+    def send(self, message: EmailMessage):
+        if self.smtp is None or self.sent >= settings.MAIL_MESSAGES_PER_CONNECTION:
+            self._connect()
+        try:
+            self.smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections get closed by the server; retry once on a fresh one
+            self._connect()
+            self.smtp.send_message(message)
+        self.sent += 1
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+            self.smtp = None
+
+def _claim_batch(db: Session, batch_size: int) -> List[OutboundEmail]:
+    """Lease up to ``batch_size`` due emails; the conditional update keeps workers from sharing one"""
+    now = datetime.utcnow()
+    ids = [row.id for row in db.query(OutboundEmail.id).filter(
+        OutboundEmail.status == "pending",
+        OutboundEmail.next_attempt_at <= now,
+        or_(OutboundEmail.locked_until.is_(None), OutboundEmail.locked_until < now)
+    ).order_by(OutboundEmail.next_attempt_at, OutboundEmail.id).limit(batch_size)]
+
+    claimed = []
+    for email_id in ids:
+        if db.query(OutboundEmail).filter(
+            OutboundEmail.id == email_id,
+            OutboundEmail.status == "pending",
+            or_(OutboundEmail.locked_until.is_(None), OutboundEmail.locked_until < now)
+        ).update({OutboundEmail.locked_until: now + LEASE}, synchronize_session=False):
+            claimed.append(email_id)
+    db.commit()
+
+    if not claimed:
+        return []
+    return db.query(OutboundEmail).options(selectinload(OutboundEmail.attachments)).filter(
+        OutboundEmail.id.in_(claimed)
+    ).order_by(OutboundEmail.id).all()
+
+def _is_permanent(error: Exception) -> bool:
+    """5xx replies and refused recipients won't succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+def _record_failure(email: OutboundEmail, error: Exception, permanent: bool):
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+    email.locked_until = None
+    if permanent or email.attempts >= settings.MAIL_MAX_ATTEMPTS:
+        email.status = "failed"
+        logger.error(f"Giving up on email {email.id} to {email.to_address}: {error}")
+    else:
+        delay = timedelta(seconds=settings.MAIL_RETRY_BASE_SECONDS * 2 ** (email.attempts - 1))
+        email.next_attempt_at = datetime.utcnow() + min(delay, MAX_RETRY_DELAY)
+        logger.warning(f"Email {email.id} attempt {email.attempts} failed, retrying: {error}")
+
+def deliver_pending(db: Session, connection: SMTPConnection, batch_size: int) -> int:
+    """Send due emails until the queue is drained, reusing ``connection``; returns the number sent"""
+    sent = 0
+    while True:
+        batch = _claim_batch(db, batch_size)
+        if not batch:
+            return sent
+        for index, email in enumerate(batch):
+            try:
+                connection.send(build_message(email))
+            except TransientConnectionError as e:
+                # The server is unreachable: back off this email and release the rest
+                _record_failure(email, e, permanent=False)
+                for waiting in batch[index + 1:]:
+                    waiting.locked_until = None
+                db.commit()
+                return sent
+            except (OSError, smtplib.SMTPException) as e:
+                _record_failure(email, e, _is_permanent(e))
+                db.commit()
+                continue
+
+            email.status = "sent"
+            email.sent_at = datetime.utcnow()
+            email.locked_until = None
+            email.last_error = None
+            email.attachments = []
+            # Commit per message so a crash never re-sends what already went out
+            db.commit()
+            sent += 1
+
+def run_mail_delivery():
+    """Periodic job: drain the outbound email queue over a single SMTP connection"""
+    if not settings.SMTP_HOST:
+        return
+
+    db = SessionLocal()
+    connection = SMTPConnection()
+    try:
+        sent = deliver_pending(db, connection, settings.MAIL_BATCH_SIZE)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        connection.close()
+        db.close()
+
+    if sent:
+        logger.info(f"Outbound mail: {sent} emails sent")
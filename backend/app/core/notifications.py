@@ -0,0 +1,282 @@
+from sqlalchemy import bindparam, func, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+
+from .config import settings
+from .backplane import backplane
+from .database import SessionLocal
+from .scheduler import claim_job_lease, release_job_lease
+from ..models.notification import Notification, NotificationCounter
+from ..schemas.notification import NotificationCreate, NotificationPriority
+
+# (user_id, notification) pairs accepted by the pipeline
+PendingNotification = Tuple[int, NotificationCreate]
+
+# (is_read, is_archived, priority) of a notification, or None if it doesn't exist
+NotificationState = Optional[Tuple[bool, bool, Any]]
+
+HIGH_PRIORITIES = (NotificationPriority.HIGH, NotificationPriority.URGENT)
+COUNTER_COLUMNS = ("total", "unread", "high_priority_unread")
+
+# Held while a worker reconciles every user's counters
+RECONCILE_LEASE = timedelta(minutes=30)
+
+def notification_state(notification: Notification) -> NotificationState:
+    return (notification.is_read, notification.is_archived, notification.priority)
+
+def _counts(state: NotificationState) -> Tuple[int, int, int]:
+    """Contribution of one notification to (total, unread, high_priority_unread)"""
+    if state is None:
+        return (0, 0, 0)
+    is_read, is_archived, priority = state
+    if is_archived:
+        return (0, 0, 0)
+    unread = 0 if is_read else 1
+    return (1, unread, unread if priority in HIGH_PRIORITIES else 0)
+
+def adjust_counters(db: Session, changes: Iterable[Tuple[int, NotificationState, NotificationState]]) -> Set[int]:
+    """Apply (user_id, before, after) changes to the counters in the caller's transaction.
+
+    Only existing counter rows are adjusted; a user without one gets it from
+    reconcile_counters the first time their counters are read.
+    Returns the ids of users whose counters changed.
+    """
+    deltas: Dict[int, List[int]] = {}
+    for user_id, before, after in changes:
+        delta = deltas.setdefault(user_id, [0, 0, 0])
+        for i, (old, new) in enumerate(zip(_counts(before), _counts(after))):
+            delta[i] += new - old
+
+    params = [
+        {"uid": user_id, **{f"d_{column}": value for column, value in zip(COUNTER_COLUMNS, delta)}}
+        for user_id, delta in deltas.items() if any(delta)
+    ]
+    if params:
+        db.connection().execute(
+            update(NotificationCounter.__table__)
+            .where(NotificationCounter.user_id == bindparam("uid"))
+            .values({column: getattr(NotificationCounter, column) + bindparam(f"d_{column}") for column in COUNTER_COLUMNS}),
+            params
+        )
+    return {param["uid"] for param in params}
+
+def update_notifications(db: Session, criteria: list, values: dict) -> Set[int]:
+    """Bulk-update notifications matching ``criteria`` and adjust counters to match.
+
+    Returns the ids of users whose counters changed; the caller commits.
+    """
+    rows = db.query(
+        Notification.user_id, Notification.is_read, Notification.is_archived, Notification.priority
+    ).filter(*criteria).all()
+    if not rows:
+        return set()
+
+    changes = []
+    for user_id, is_read, is_archived, priority in rows:
+        before = (is_read, is_archived, priority)
+        after = (values.get("is_read", is_read), values.get("is_archived", is_archived), values.get("priority", priority))
+        changes.append((user_id, before, after))
+
+    db.query(Notification).filter(*criteria).update(values, synchronize_session=False)
+    return adjust_counters(db, changes)
+
+def _insert_missing_counters(db: Session, user_ids: Optional[List[int]]):
+    """Create zeroed counter rows for users that have none yet, leaving existing rows alone"""
+    candidates = db.query(Notification.user_id).distinct() if user_ids is None else [(user_id,) for user_id in user_ids]
+    existing = db.query(NotificationCounter.user_id)
+    if user_ids is not None:
+        existing = existing.filter(NotificationCounter.user_id.in_(user_ids))
+    existing_ids = {user_id for user_id, in existing}
+    values = [
+        {"user_id": user_id, **{column: 0 for column in COUNTER_COLUMNS}}
+        for user_id, in candidates if user_id not in existing_ids
+    ]
+    if not values:
+        return
+
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.execute(dialect_insert(NotificationCounter).values(values).on_conflict_do_nothing(
+            index_elements=[NotificationCounter.user_id]
+        ))
+    else:
+        for value in values:
+            try:
+                with db.begin_nested():
+                    db.add(NotificationCounter(**value))
+            except IntegrityError:
+                pass
+
+def _visible_count(*criteria):
+    """Correlated count of the counter row's user's non-archived notifications"""
+    return select(func.count(Notification.id)).where(
+        Notification.user_id == NotificationCounter.user_id,
+        Notification.is_archived == False,
+        *criteria
+    ).scalar_subquery()
+
+def reconcile_counters(db: Session, user_ids: Optional[List[int]] = None):
+    """Recompute counters from the notifications table (all users when ``user_ids`` is None).
+
+    The counts are taken inside the UPDATE itself rather than read first and
+    written back, so a delta from adjust_counters that commits in between is
+    not overwritten with a stale total.
+    """
+    _insert_missing_counters(db, user_ids)
+
+    unread = (Notification.is_read == False)
+    stmt = update(NotificationCounter.__table__).values(
+        total=_visible_count(),
+        unread=_visible_count(unread),
+        high_priority_unread=_visible_count(unread, Notification.priority.in_(HIGH_PRIORITIES)),
+        updated_at=func.now()
+    )
+    if user_ids is not None:
+        stmt = stmt.where(NotificationCounter.user_id.in_(user_ids))
+    db.execute(stmt)
+    db.commit()
+
+def reconcile_all_counters():
+    """Periodic job: correct any drift in the cached counters.
+
+    Every worker runs the job; the lease lets only one of them rewrite the
+    whole counters table per interval.
+    """
+    db = SessionLocal()
+    try:
+        token = claim_job_lease(db, "notification_counters", RECONCILE_LEASE)
+        if token is None:
+            return
+        try:
+            reconcile_counters(db)
+        finally:
+            db.rollback()
+            release_job_lease(db, "notification_counters", token)
+    finally:
+        db.close()
+
+def get_counters(db: Session, user_id: int) -> NotificationCounter:
+    counter = db.query(NotificationCounter).filter(NotificationCounter.user_id == user_id).first()
+    if counter is None:
+        reconcile_counters(db, [user_id])
+        counter = db.query(NotificationCounter).filter(NotificationCounter.user_id == user_id).first()
+    return counter
+
+def publish_counters(db: Session, user_ids: Iterable[int]):
+    """Push current counters to the users' WebSockets; call after committing"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    counters = db.query(NotificationCounter).filter(NotificationCounter.user_id.in_(user_ids)).all()
+    for counter in counters:
+        # Only the latest counters matter, so pending updates are coalesced
+        backplane.publish(counter.user_id, {
+            "type": "notification_counters",
+            "data": {column: getattr(counter, column) for column in COUNTER_COLUMNS}
+        }, coalesce_key="notification_counters")
+
+def _dedupe_key(user_id: int, notification: NotificationCreate):
+    """Notifications about the same entity and event are duplicates; others never are"""
+    if notification.related_entity_id is None:
+        return None
+    return (user_id, notification.type, notification.related_entity_type, notification.related_entity_id)
+
+def _drop_duplicates(db: Session, pending: List[PendingNotification]) -> List[PendingNotification]:
+    """Remove duplicates within the batch and of unread notifications sent within the dedupe window"""
+    unique, seen = [], set()
+    for user_id, notification in pending:
+        key = _dedupe_key(user_id, notification)
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        unique.append((user_id, notification))
+
+    if not seen:
+        return unique
+
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.NOTIFICATION_DEDUPE_MINUTES)
+    existing = set(
+        tuple(row) for row in db.query(
+            Notification.user_id,
+            Notification.type,
+            Notification.related_entity_type,
+            Notification.related_entity_id
+        ).filter(
+            tuple_(
+                Notification.user_id,
+                Notification.type,
+                Notification.related_entity_type,
+                Notification.related_entity_id
+            ).in_(list(seen)),
+            Notification.is_read == False,
+            Notification.is_archived == False,
+            Notification.created_at >= cutoff
+        ).all()
+    )
+    return [item for item in unique if _dedupe_key(*item) not in existing]
+
+def _message(row: dict) -> dict:
+    return {
+        "type": "notification",
+        "data": {
+            **row,
+            "type": row["type"].value,
+            "priority": row["priority"].value,
+            "expires_at": row["expires_at"].isoformat() if row["expires_at"] else None,
+            "created_at": row["created_at"].isoformat() if row["created_at"] else None,
+            "is_read": False
+        }
+    }
+
+def store_notifications(db: Session, pending: List[PendingNotification]) -> List[dict]:
+    """Insert a batch of notifications and adjust counters in the caller's transaction.
+
+    Duplicates of unread notifications within NOTIFICATION_DEDUPE_MINUTES are
+    skipped. Returns the stored rows; pass them to publish_notifications once committed.
+    """
+    pending = _drop_duplicates(db, pending)
+    if not pending:
+        return []
+
+    rows = [
+        {"user_id": user_id, "is_read": False, "is_archived": False, **notification.model_dump()}
+        for user_id, notification in pending
+    ]
+    result = db.execute(
+        insert(Notification).returning(Notification.id, Notification.created_at, sort_by_parameter_order=True),
+        rows
+    ).all()
+    adjust_counters(db, [
+        (row["user_id"], None, (False, False, row["priority"])) for row in rows
+    ])
+    for row, (notification_id, created_at) in zip(rows, result):
+        row.update(id=notification_id, created_at=created_at)
+    return rows
+
+def publish_notifications(db: Session, rows: List[dict]):
+    """Push stored notifications and their users' counters over WebSockets; call after committing"""
+    for row in rows:
+        backplane.publish(row["user_id"], _message(row))
+    publish_counters(db, {row["user_id"] for row in rows})
+
+def send_notifications(db: Session, pending: List[PendingNotification]) -> List[int]:
+    """Store a batch of notifications in one transaction, then push them over WebSockets.
+
+    Returns the ids of the notifications that were created; duplicates of
+    unread notifications within NOTIFICATION_DEDUPE_MINUTES are skipped.
+    """
+    rows = store_notifications(db, pending)
+    if not rows:
+        return []
+    db.commit()
+
+    # Fan out only after the rows are committed
+    publish_notifications(db, rows)
+    return [row["id"] for row in rows]
@@ -0,0 +1,90 @@
+from fastapi import HTTPException, Response, status
+from sqlalchemy import String, cast, literal, select, tuple_
+from sqlalchemy.orm import Query, Session
+from typing import Any, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+from ..models import Client, Invoice, Milestone, Notification, Project, RecurringInvoice, Task, WorkLog
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Models listed with paginate(); each has a (user_id, created_at, id) index
+PAGINATED_MODELS = [Client, Invoice, Milestone, Notification, Project, RecurringInvoice, Task, WorkLog]
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor"""
+    raw = json.dumps([created_at.isoformat(), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode an opaque cursor back into a (created_at, id) position"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def _cursor_filter(session: Session, model: Any, created_at: datetime, last_id: int) -> Any:
+    """Rows after the cursor position in (created_at, id) descending order.
+
+    Compares the raw columns so the (user_id, created_at, id) indexes serve it.
+    SQLite stores server-side timestamps as "YYYY-MM-DD HH:MM:SS" and Python-side
+    ones with ".000000" microseconds. The two spellings of a whole second sort
+    apart, so such a cursor compares against its own row's stored spelling.
+    """
+    column = model.created_at
+    position = literal(created_at, column.type)
+    if session.get_bind().dialect.name == "sqlite" and not created_at.microsecond:
+        stored = session.execute(select(cast(column, String())).where(model.id == last_id)).scalar()
+        if stored is not None:
+            position = literal(stored, String())
+    # A row-value comparison, unlike the equivalent OR, is a range seek on the index
+    return tuple_(column, model.id) < tuple_(position, literal(last_id))
+
+def ensure_pagination_indexes(engine):
+    """Create the (user_id, created_at, id) indexes for tables created before they existed"""
+    for model in PAGINATED_MODELS:
+        for index in model.__table__.indexes:
+            if [c.name for c in index.columns] == ["user_id", "created_at", "id"]:
+                index.create(bind=engine, checkfirst=True)
+
+def paginate(
+    query: Query,
+    model: Any,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> List[Any]:
+    """Return one page of results using offset mode or keyset (cursor) mode.
+
+    Cursor mode is used when ``cursor`` is given (an empty string requests the
+    first page). Rows are ordered newest first by ``(created_at, id)`` and the
+    cursor for the following page is returned in the ``X-Next-Cursor`` header.
+    Offset mode keeps the query's existing ordering for backward compatibility.
+    """
+    if cursor is None:
+        return query.offset(skip).limit(limit).all()
+
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query = query.filter(_cursor_filter(query.session, model, created_at, last_id))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(None).order_by(
+        model.created_at.desc(),
+        model.id.desc()
+    ).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+    return rows
@@ -0,0 +1,110 @@
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional, Tuple
+import hashlib
+import json
+
+from .config import settings
+from ..models.user import User
+from ..schemas.payment import SubscriptionPlan
+
+def _catalog() -> Tuple[SubscriptionPlan, ...]:
+    """The plans on offer; AI request limits come from the *_TIER_DAILY_LIMIT settings"""
+    return (
+        SubscriptionPlan(
+            id="free",
+            name="Free",
+            price=0,
+            currency="USD",
+            interval="month",
+            features=[
+                f"{settings.FREE_TIER_DAILY_LIMIT} AI requests per day",
+                "Basic project management",
+                "Community support"
+            ],
+            limits={
+                "daily_ai_requests": settings.FREE_TIER_DAILY_LIMIT,
+                "storage_gb": 0.1,
+                "projects": 5
+            }
+        ),
+        SubscriptionPlan(
+            id="pro",
+            name="Pro",
+            price=2900,  # $29.00 in cents
+            currency="USD",
+            interval="month",
+            features=[
+                f"{settings.PRO_TIER_DAILY_LIMIT} AI requests per day",
+                "Advanced project management",
+                "Priority support",
+                "File uploads",
+                "Time tracking"
+            ],
+            limits={
+                "daily_ai_requests": settings.PRO_TIER_DAILY_LIMIT,
+                "storage_gb": 1,
+                "projects": 50
+            }
+        ),
+        SubscriptionPlan(
+            id="enterprise",
+            name="Enterprise",
+            price=9900,  # $99.00 in cents
+            currency="USD",
+            interval="month",
+            features=[
+                f"{settings.ENTERPRISE_TIER_DAILY_LIMIT} AI requests per day",
+                "Unlimited projects",
+                "Custom integrations",
+                "Dedicated support",
+                "Team collaboration"
+            ],
+            limits={
+                "daily_ai_requests": settings.ENTERPRISE_TIER_DAILY_LIMIT,
+                "storage_gb": 10,
+                "projects": -1  # Unlimited
+            }
+        )
+    )
+
+class PlanRegistry:
+    """The plan catalog, built once and indexed by plan id.
+
+    The first plan is the default for users whose tier isn't in the catalog.
+    The serialized catalog and its ETag are computed up front for the /plans endpoint.
+    """
+
+    def __init__(self, plans: Iterable[SubscriptionPlan]):
+        self.plans: Tuple[SubscriptionPlan, ...] = tuple(plans)
+        self.default = self.plans[0]
+        self._by_id: Mapping[str, SubscriptionPlan] = MappingProxyType({plan.id: plan for plan in self.plans})
+        self._daily_limits: Mapping[str, int] = MappingProxyType({
+            plan.id: plan.limits["daily_ai_requests"] for plan in self.plans
+        })
+        self._storage_bytes: Mapping[str, int] = MappingProxyType({
+            plan.id: int(plan.limits["storage_gb"] * 1024 * 1024 * 1024) for plan in self.plans
+        })
+        self.body = json.dumps([plan.model_dump() for plan in self.plans], separators=(",", ":")).encode()
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+    def __contains__(self, plan_id: object) -> bool:
+        return plan_id in self._by_id
+
+    def get(self, plan_id: Optional[str]) -> Optional[SubscriptionPlan]:
+        return self._by_id.get(plan_id)
+
+    def daily_limit(self, plan_id: Optional[str]) -> int:
+        """AI requests per day allowed by a plan"""
+        return self._daily_limits.get(plan_id, self._daily_limits[self.default.id])
+
+    def storage_quota_bytes(self, plan_id: Optional[str]) -> int:
+        """Total storage allowed by a plan"""
+        return self._storage_bytes.get(plan_id, self._storage_bytes[self.default.id])
+
+def apply_plan(user: User, plan_id: str):
+    """Move the user onto a plan and its daily usage limit"""
+    user.subscription_tier = plan_id
+    user.usage_limit = plan_registry.daily_limit(plan_id)
+
+# Global plan registry instance
+plan_registry = PlanRegistry(_catalog())
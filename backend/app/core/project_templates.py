@@ -0,0 +1,127 @@
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple, Tuple
+import threading
+
+from ..models.milestone import Milestone
+from ..models.project import Project
+from ..models.project_template import ProjectTemplate
+from ..models.task import Task
+from ..schemas.project_template import (
+    ProjectFromTemplateRequest,
+    TemplateMilestone,
+    TemplateTask,
+    parse_template_items
+)
+
+# Parsed templates kept in memory; each entry is one template version
+STRUCTURE_CACHE_SIZE = 256
+
+class TemplateStructure(NamedTuple):
+    tasks: Tuple[TemplateTask, ...]
+    milestones: Tuple[TemplateMilestone, ...]
+
+class InvalidTemplateError(ValueError):
+    """A stored template's tasks or milestones don't parse"""
+
+_structures: "OrderedDict[Tuple[int, datetime], TemplateStructure]" = OrderedDict()
+_structures_lock = threading.Lock()
+
+def template_structure(template: ProjectTemplate) -> TemplateStructure:
+    """The template's typed tasks and milestones, parsed once per template version"""
+    key = (template.id, template.updated_at)
+    with _structures_lock:
+        structure = _structures.get(key)
+        if structure is not None:
+            _structures.move_to_end(key)
+            return structure
+
+    try:
+        structure = TemplateStructure(
+            tasks=tuple(parse_template_items(template.default_tasks, TemplateTask)),
+            milestones=tuple(parse_template_items(template.default_milestones, TemplateMilestone))
+        )
+    except ValueError as e:
+        raise InvalidTemplateError(str(e)) from e
+
+    with _structures_lock:
+        _structures[key] = structure
+        while len(_structures) > STRUCTURE_CACHE_SIZE:
+            _structures.popitem(last=False)
+    return structure
+
+def instantiate_template(
+    db: Session,
+    template: ProjectTemplate,
+    request: ProjectFromTemplateRequest,
+    user_id: int
+) -> Project:
+    """Create a project with all of the template's tasks and milestones in one transaction.
+
+    The template is parsed before anything is written, so an invalid template
+    raises InvalidTemplateError instead of leaving a partial project behind.
+    """
+    structure = template_structure(template)
+
+    # Calculate dates
+    start_date = request.start_date or datetime.utcnow()
+    deadline = request.deadline
+    if not deadline and template.default_duration_days:
+        deadline = start_date + timedelta(days=template.default_duration_days)
+
+    project = Project(
+        title=request.project_name,
+        description=template.description,
+        status="active",
+        client_name=request.client_name,
+        client_email=request.client_email,
+        budget=request.budget or template.default_budget,
+        currency=request.currency or template.default_currency,
+        start_date=start_date,
+        deadline=deadline,
+        hourly_rate=request.budget or template.default_hourly_rate,
+        user_id=user_id
+    )
+    db.add(project)
+    try:
+        db.flush()
+
+        if structure.tasks:
+            db.execute(insert(Task), [
+                {
+                    "title": task.title,
+                    "description": task.description,
+                    "status": "pending",
+                    "priority": task.priority,
+                    "project_id": project.id,
+                    "user_id": user_id,
+                }
+                for task in structure.tasks
+            ])
+        if structure.milestones:
+            db.execute(insert(Milestone), [
+                {
+                    "title": milestone.title,
+                    "description": milestone.description,
+                    "status": "pending",
+                    "due_date": start_date + timedelta(days=milestone.days_from_start),
+                    "project_id": project.id,
+                    "user_id": user_id,
+                }
+                for milestone in structure.milestones
+            ])
+
+        # updated_at is set to itself so its onupdate doesn't fire and invalidate the parsed structure
+        db.execute(
+            update(ProjectTemplate)
+            .where(ProjectTemplate.id == template.id)
+            .values(usage_count=ProjectTemplate.usage_count + 1, updated_at=ProjectTemplate.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return project
@@ -0,0 +1,294 @@
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm import Session, selectinload
+from calendar import monthrange
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+import re
+
+from .config import settings
+from .database import SessionLocal
+from .deadlines import OPEN_INVOICE_STATUSES
+from .invoice_mail import queue_invoice_email, queue_invoice_reminder
+from .invoice_numbers import next_invoice_numbers
+from .invoice_pdf import invoice_document, render_invoice_pdfs
+from ..models.client import Client
+from ..models.invoice import Invoice
+from ..models.project import Project
+from ..models.recurring_invoice import RecurringInvoice, RecurringInvoiceRun
+from ..models.user import User
+from ..schemas.recurring_invoice import RecurringFrequency
+
+logger = logging.getLogger(__name__)
+
+# Calendar months per period for month-based frequencies
+MONTHS = {
+    RecurringFrequency.MONTHLY: 1,
+    RecurringFrequency.QUARTERLY: 3,
+    RecurringFrequency.YEARLY: 12,
+}
+
+def _naive_utc(value: datetime) -> datetime:
+    """Schedule dates come back timezone-aware from PostgreSQL; the engine works in naive UTC"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _add_months(value: datetime, months: int, anchor_day: int) -> datetime:
+    """Move ``months`` calendar months, keeping to ``anchor_day`` where the month has it"""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(anchor_day, monthrange(year, month)[1]))
+
+def next_occurrence(current: datetime, frequency: RecurringFrequency, interval: int, anchor_day: Optional[int] = None) -> datetime:
+    """The occurrence after ``current``, ``interval`` periods of ``frequency`` later.
+
+    Month-based frequencies land on ``anchor_day`` (the start date's day) so a
+    schedule starting on the 31st doesn't drift to the 28th after February.
+    """
+    interval = max(interval, 1)
+    if frequency == RecurringFrequency.DAILY:
+        return current + timedelta(days=interval)
+    if frequency == RecurringFrequency.WEEKLY:
+        return current + timedelta(weeks=interval)
+    return _add_months(current, MONTHS[frequency] * interval, anchor_day or current.day)
+
+def payment_terms_days(payment_terms: Optional[str]) -> int:
+    """Days until due for terms like "Net 30"; due on receipt when no number is given"""
+    match = re.search(r"\d+", payment_terms or "")
+    return int(match.group()) if match else 0
+
+def _due_occurrences(schedule: RecurringInvoice, now: datetime) -> Tuple[List[datetime], datetime]:
+    """Every occurrence that has come due, and the next one after them"""
+    anchor_day = _naive_utc(schedule.start_date).day
+    end_date = _naive_utc(schedule.end_date) if schedule.end_date else None
+    occurrence = _naive_utc(schedule.next_invoice_date)
+    occurrences = []
+    while occurrence <= now and (end_date is None or occurrence <= end_date):
+        occurrences.append(occurrence)
+        occurrence = next_occurrence(occurrence, schedule.frequency, schedule.interval, anchor_day)
+    return occurrences, occurrence
+
+def _claim_statement(ends: bool):
+    values = {"next_invoice_date": bindparam("next_date")}
+    if ends:
+        values["is_active"] = False
+    return update(RecurringInvoice.__table__).where(
+        RecurringInvoice.id == bindparam("schedule_id"),
+        RecurringInvoice.next_invoice_date == bindparam("read_date")
+    ).values(values)
+
+# Built once: claims run one row at a time, since each needs its own rowcount
+_ADVANCE = _claim_statement(ends=False)
+_ADVANCE_AND_END = _claim_statement(ends=True)
+
+def _claim(db: Session, schedule: RecurringInvoice, next_date: datetime, end_date: Optional[datetime]) -> bool:
+    """Advance the schedule only if nobody else has since it was read, so each occurrence is generated once"""
+    statement = _ADVANCE_AND_END if end_date is not None and next_date > end_date else _ADVANCE
+    return bool(db.connection().execute(statement, {
+        "schedule_id": schedule.id,
+        "read_date": schedule.next_invoice_date,
+        "next_date": next_date
+    }).rowcount)
+
+def _without_existing_runs(
+    db: Session, occurrences: List[Tuple[RecurringInvoice, datetime]]
+) -> List[Tuple[RecurringInvoice, datetime]]:
+    """Drop occurrences that were already billed, e.g. after a schedule was moved back"""
+    if not occurrences:
+        return occurrences
+    billed = set(db.query(RecurringInvoiceRun.recurring_invoice_id, RecurringInvoiceRun.scheduled_for).filter(
+        RecurringInvoiceRun.recurring_invoice_id.in_({schedule.id for schedule, _ in occurrences}),
+        RecurringInvoiceRun.scheduled_for.in_({occurrence for _, occurrence in occurrences})
+    ))
+    return [
+        (schedule, occurrence) for schedule, occurrence in occurrences
+        if (schedule.id, occurrence) not in billed
+    ]
+
+def last_run_date(db: Session, schedule: RecurringInvoice) -> Optional[datetime]:
+    """The most recent occurrence the schedule has generated, if any"""
+    return db.query(func.max(RecurringInvoiceRun.scheduled_for)).filter(
+        RecurringInvoiceRun.recurring_invoice_id == schedule.id
+    ).scalar()
+
+def generate_invoices(db: Session, schedules: List[RecurringInvoice], now: datetime, force: bool = False) -> List[int]:
+    """Generate the due invoices of ``schedules`` and advance them; returns the new invoice ids.
+
+    With ``force``, each schedule's next occurrence is generated even if it isn't due.
+    The caller commits, then emails the auto-sent ones with send_generated_invoices.
+    """
+    occurrences: List[Tuple[RecurringInvoice, datetime]] = []
+    for schedule in schedules:
+        if force:
+            due = [_naive_utc(schedule.next_invoice_date)]
+            following = next_occurrence(due[0], schedule.frequency, schedule.interval, _naive_utc(schedule.start_date).day)
+        else:
+            due, following = _due_occurrences(schedule, now)
+        end_date = _naive_utc(schedule.end_date) if schedule.end_date else None
+        if not _claim(db, schedule, following, end_date):
+            continue
+        occurrences.extend((schedule, occurrence) for occurrence in due)
+    occurrences = _without_existing_runs(db, occurrences)
+    if not occurrences:
+        return []
+
+    clients = {client.id: client for client in db.query(Client).filter(
+        Client.id.in_({schedule.client_id for schedule, _ in occurrences})
+    )}
+    project_ids = {schedule.project_id for schedule, _ in occurrences if schedule.project_id}
+    projects = {
+        project.id: project for project in db.query(Project.id, Project.title, Project.currency).filter(Project.id.in_(project_ids))
+    } if project_ids else {}
+
+    by_user: Dict[int, List[Tuple[RecurringInvoice, datetime]]] = defaultdict(list)
+    for schedule, occurrence in occurrences:
+        by_user[schedule.user_id].append((schedule, occurrence))
+
+    rows, runs, ordered = [], [], []
+    for user_id, user_occurrences in by_user.items():
+        numbers = next_invoice_numbers(db, user_id, len(user_occurrences), now)
+        for (schedule, occurrence), number in zip(user_occurrences, numbers):
+            ordered.append(schedule)
+            client = clients[schedule.client_id]
+            project = projects.get(schedule.project_id)
+            due_date = occurrence + timedelta(days=payment_terms_days(schedule.payment_terms))
+            rows.append({
+                "invoice_number": number,
+                "title": f"{schedule.title} - {occurrence.strftime('%Y-%m-%d')}",
+                "description": schedule.description,
+                "client_id": client.id,
+                "client_name": client.name,
+                "client_email": client.email,
+                "client_address": client.address,
+                "project_id": schedule.project_id,
+                "project_title": project.title if project else None,
+                "subtotal": schedule.subtotal,
+                "tax_rate": schedule.tax_rate,
+                "tax_amount": schedule.tax_amount,
+                "total_amount": schedule.total_amount,
+                # Schedules have no currency of their own; bill in the project's
+                "currency": project.currency if project else settings.DEFAULT_CURRENCY,
+                "status": "sent" if schedule.auto_send else "draft",
+                "sent_date": now if schedule.auto_send else None,
+                "due_date": due_date,
+                "notes": schedule.notes,
+                "terms": schedule.payment_terms,
+                "is_recurring": True,
+                "recurring_frequency": schedule.frequency.value,
+                "user_id": user_id,
+            })
+            reminder_due_at = due_date - timedelta(days=schedule.reminder_days) if schedule.send_reminders else None
+            runs.append({
+                "recurring_invoice_id": schedule.id,
+                "scheduled_for": occurrence,
+                # Caught-up invoices already past their reminder date get none; the overdue scan covers them
+                "reminder_due_at": reminder_due_at if reminder_due_at and reminder_due_at > now else None,
+            })
+
+    invoice_ids = db.execute(
+        insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    # Occurrences with runs were filtered out above; the unique key is the last line of defence
+    db.execute(insert(RecurringInvoiceRun), [
+        {**run, "invoice_id": invoice_id} for run, invoice_id in zip(runs, invoice_ids)
+    ])
+
+    return invoice_ids
+
+def send_generated_invoices(db: Session, invoice_ids: List[int]) -> int:
+    """Email the auto-sent invoices among ``invoice_ids`` to their clients; returns the number queued.
+
+    Call after the invoices are committed: the PDFs render in the process pool
+    without the transaction that holds the invoice sequence locks.
+    """
+    if not invoice_ids:
+        return 0
+    invoices = db.query(Invoice).options(
+        selectinload(Invoice.items), selectinload(Invoice.client)
+    ).filter(Invoice.id.in_(invoice_ids), Invoice.status == "sent").order_by(Invoice.id).all()
+    if not invoices:
+        return 0
+    users = {user.id: user for user in db.query(User).filter(User.id.in_({invoice.user_id for invoice in invoices}))}
+    documents = [invoice_document(invoice, users[invoice.user_id]) for invoice in invoices]
+    # End the read transaction so nothing is held while rendering
+    db.commit()
+
+    pdfs = render_invoice_pdfs(documents)
+    for invoice, pdf in zip(invoices, pdfs):
+        queue_invoice_email(db, invoice, users[invoice.user_id], invoice.client_email, pdf)
+    db.commit()
+    return len(invoices)
+
+def generate_and_send(db: Session, schedules: List[RecurringInvoice], now: datetime, force: bool = False) -> List[int]:
+    """Generate and commit the due invoices of ``schedules``, then email the auto-sent ones"""
+    invoice_ids = generate_invoices(db, schedules, now, force)
+    db.commit()
+    try:
+        send_generated_invoices(db, invoice_ids)
+    except Exception:
+        # The invoices stand; a rendering or queueing failure must not stall generation
+        db.rollback()
+        logger.exception(f"Could not email generated invoices {invoice_ids}")
+    return invoice_ids
+
+def send_due_reminders(db: Session, now: datetime, batch_size: int) -> int:
+    """Queue payment reminders for generated invoices whose reminder date has passed"""
+    queued = 0
+    while True:
+        runs = db.query(RecurringInvoiceRun).filter(
+            RecurringInvoiceRun.reminder_due_at <= now,
+            RecurringInvoiceRun.reminder_sent_at.is_(None)
+        ).order_by(RecurringInvoiceRun.reminder_due_at, RecurringInvoiceRun.id).limit(batch_size).all()
+        if not runs:
+            return queued
+
+        invoices = {invoice.id: invoice for invoice in db.query(Invoice).options(selectinload(Invoice.client)).filter(
+            Invoice.id.in_({run.invoice_id for run in runs if run.invoice_id})
+        )}
+        users = {user.id: user for user in db.query(User).filter(User.id.in_({invoice.user_id for invoice in invoices.values()}))}
+        for run in runs:
+            invoice = invoices.get(run.invoice_id)
+            # Paid, cancelled, never-sent and deleted invoices need no reminder
+            if invoice is not None and invoice.status in OPEN_INVOICE_STATUSES:
+                queue_invoice_reminder(db, invoice, users[invoice.user_id])
+                queued += 1
+            run.reminder_sent_at = now
+        db.commit()
+
+def run_recurring_invoices(now: Optional[datetime] = None):
+    """Periodic job: generate due recurring invoices, catching up on missed periods, and send reminders"""
+    now = now or datetime.utcnow()
+    batch_size = settings.RECURRING_INVOICE_BATCH_SIZE
+
+    db = SessionLocal()
+    try:
+        generated = 0
+        while True:
+            schedules = db.query(RecurringInvoice).filter(
+                RecurringInvoice.is_active == True,
+                RecurringInvoice.next_invoice_date <= now
+            ).order_by(RecurringInvoice.next_invoice_date, RecurringInvoice.id).limit(batch_size).all()
+            if not schedules:
+                break
+            generated += len(generate_and_send(db, schedules, now))
+            # Claimed schedules moved past ``now``, so the next query sees new ones
+            db.expire_all()
+
+        reminders = send_due_reminders(db, now, batch_size)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if generated or reminders:
+        logger.info(f"Recurring invoices: {generated} generated, {reminders} reminders queued")
+
+def ensure_recurring_indexes(engine):
+    """Create the next_invoice_date index for tables created before it existed"""
+    for index in RecurringInvoice.__table__.indexes:
+        if [c.name for c in index.columns] == ["next_invoice_date"]:
+            index.create(bind=engine, checkfirst=True)
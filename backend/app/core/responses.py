@@ -0,0 +1,129 @@
+from fastapi import Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from typing import Any, Optional, Tuple
+from urllib.parse import quote
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+import aiofiles
+import json
+import os
+
+from .uploads import CHUNK_SIZE
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """Encode types the JSON serializers don't handle natively, matching FastAPI's encoders"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        # Same rule as fastapi.encoders.decimal_encoder
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when installed, falling back to the stdlib encoder"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content,
+            default=_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=start-end`` range into inclusive offsets; None if unsatisfiable"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    try:
+        if start:
+            first = int(start)
+            last = min(int(end), size - 1) if end else size - 1
+        else:
+            # Suffix range: the last N bytes
+            first = max(size - int(end), 0)
+            last = size - 1
+    except ValueError:
+        return None
+    if first > last or first >= size:
+        return None
+    return first, last
+
+async def _file_chunks(path: str, offset: int, length: int):
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(offset)
+        while length > 0:
+            chunk = await f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+def ranged_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: str,
+    inline: bool = False,
+    etag: Optional[str] = None
+) -> Response:
+    """Stream a file with Content-Length, answering single-range requests with 206"""
+    size = os.path.getsize(path)
+    disposition = "inline" if inline else "attachment"
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"{disposition}; filename*=utf-8''{quote(filename)}"
+    }
+    if etag:
+        headers["ETag"] = f'"{etag}"'
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    first, last = 0, size - 1
+    status_code = status.HTTP_200_OK
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A range for an older version (If-Range mismatch) gets the whole file
+    if range_header and size and (if_range is None or if_range == headers.get("ETag")):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}", "Accept-Ranges": "bytes"}
+            )
+        first, last = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+
+    length = max(last - first + 1, 0)
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _file_chunks(path, first, length),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
@@ -0,0 +1,207 @@
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+import logging
+import time
+
+from .config import settings
+from .database import SessionLocal
+from .notifications import adjust_counters, publish_counters
+from .scheduler import claim_job_lease, release_job_lease
+from ..models.notification import Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+# Columns copied from the live table into the archive
+ARCHIVE_COLUMNS = [
+    "id", "created_at", "user_id", "title", "message", "type", "priority",
+    "related_entity_type", "related_entity_id", "is_read", "action_url",
+    "action_text", "read_at", "expires_at",
+]
+
+# How long one worker may hold the retention run before another may take over
+LEASE = timedelta(minutes=30)
+
+# Per-process totals since startup, reported by the admin metrics endpoint. Only
+# the worker holding the lease runs the job, so each worker counts just its own runs.
+retention_metrics = {
+    "runs": 0,
+    "expired_deleted": 0,
+    "archived_moved": 0,
+    "archive_purged": 0,
+    "partitions_dropped": 0,
+    "last_run_at": None,
+    "last_run_seconds": None,
+}
+
+def _partitioned(db: Session) -> bool:
+    return settings.NOTIFICATION_ARCHIVE_PARTITIONED and db.get_bind().dialect.name == "postgresql"
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+def _next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+def _ensure_partitions(db: Session, created_at: Iterable[datetime]):
+    """Create the monthly archive partitions that rows with these timestamps fall into"""
+    for month in {_month_start(value) for value in created_at}:
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS notifications_archive_{month:%Y_%m} "
+            f"PARTITION OF notifications_archive "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+        ))
+
+def _delete_expired(db: Session, rows: list, now: datetime) -> list:
+    """Delete the given expired notifications and return the ones this call actually removed.
+
+    Another worker may sweep the same rows concurrently; only rows deleted here
+    may be taken off the counters, or they would be decremented twice.
+    """
+    expired = (Notification.expires_at.isnot(None), Notification.expires_at <= now)
+    if db.get_bind().dialect.delete_returning:
+        return db.execute(
+            delete(Notification).where(Notification.id.in_([row.id for row in rows]), *expired).returning(
+                Notification.user_id, Notification.is_read, Notification.is_archived, Notification.priority
+            ).execution_options(synchronize_session=False)
+        ).all()
+    return [
+        row for row in rows
+        if db.execute(
+            delete(Notification).where(Notification.id == row.id, *expired)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    ]
+
+def sweep_expired(db: Session, batch_size: int) -> int:
+    """Delete expired notifications in batches of ``batch_size``, one transaction each"""
+    deleted = 0
+    while True:
+        now = datetime.utcnow()
+        rows = db.query(
+            Notification.id, Notification.user_id, Notification.is_read,
+            Notification.is_archived, Notification.priority
+        ).filter(
+            Notification.expires_at.isnot(None),
+            Notification.expires_at <= now
+        ).order_by(Notification.id).limit(batch_size).all()
+        if not rows:
+            return deleted
+
+        removed = _delete_expired(db, rows, now)
+        changed = adjust_counters(db, [
+            (row.user_id, (row.is_read, row.is_archived, row.priority), None) for row in removed
+        ])
+        db.commit()
+        publish_counters(db, changed)
+
+        deleted += len(removed)
+        if len(rows) < batch_size:
+            return deleted
+
+def archive_old(db: Session, older_than: datetime, batch_size: int) -> int:
+    """Move archived notifications created before ``older_than`` into the archive table"""
+    moved = 0
+    while True:
+        rows = db.query(Notification.id, Notification.created_at).filter(
+            Notification.is_archived == True,
+            Notification.created_at < older_than
+        ).order_by(Notification.id).limit(batch_size).all()
+        if not rows:
+            return moved
+
+        ids = [row.id for row in rows]
+        if _partitioned(db):
+            _ensure_partitions(db, [row.created_at for row in rows])
+
+        # Archived rows don't count towards the badge counters, so no adjustment is needed
+        db.execute(insert(NotificationArchive).from_select(
+            ARCHIVE_COLUMNS,
+            select(*(getattr(Notification, column) for column in ARCHIVE_COLUMNS)).where(Notification.id.in_(ids))
+        ))
+        db.query(Notification).filter(Notification.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+        moved += len(rows)
+        if len(rows) < batch_size:
+            return moved
+
+def _archive_partitions(db: Session) -> List[str]:
+    return list(db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = 'notifications_archive'"
+    )).scalars())
+
+def purge_archive(db: Session, older_than: datetime, batch_size: int) -> int:
+    """Remove archive rows created before ``older_than``; whole partitions are dropped when possible"""
+    if _partitioned(db):
+        for name in _archive_partitions(db):
+            try:
+                month = datetime.strptime(name[-7:], "%Y_%m")
+            except ValueError:
+                continue
+            if _next_month(month) <= older_than:
+                db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                retention_metrics["partitions_dropped"] += 1
+        db.commit()
+
+    purged = 0
+    while True:
+        keys = db.query(NotificationArchive.id, NotificationArchive.created_at).filter(
+            NotificationArchive.created_at < older_than
+        ).limit(batch_size).all()
+        if not keys:
+            return purged
+
+        db.query(NotificationArchive).filter(
+            NotificationArchive.created_at < older_than,
+            NotificationArchive.id.in_([key.id for key in keys])
+        ).delete(synchronize_session=False)
+        db.commit()
+
+        purged += len(keys)
+        if len(keys) < batch_size:
+            return purged
+
+def run_retention(now: Optional[datetime] = None):
+    """Periodic job: sweep expired notifications, archive old ones and purge the archive.
+
+    Every worker runs the job; the lease lets only one of them work at a time,
+    so two workers never copy the same rows into the archive.
+    """
+    now = now or datetime.utcnow()
+    batch_size = settings.NOTIFICATION_RETENTION_BATCH_SIZE
+    started = time.monotonic()
+
+    db = SessionLocal()
+    try:
+        token = claim_job_lease(db, "notification_retention", LEASE)
+        if token is None:
+            return
+        try:
+            expired = sweep_expired(db, batch_size)
+            moved = archive_old(db, now - timedelta(days=settings.NOTIFICATION_ARCHIVE_AFTER_DAYS), batch_size)
+            purged = purge_archive(db, now - timedelta(days=settings.NOTIFICATION_ARCHIVE_RETENTION_DAYS), batch_size)
+        finally:
+            db.rollback()
+            release_job_lease(db, "notification_retention", token)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    elapsed = time.monotonic() - started
+    retention_metrics["runs"] += 1
+    retention_metrics["expired_deleted"] += expired
+    retention_metrics["archived_moved"] += moved
+    retention_metrics["archive_purged"] += purged
+    retention_metrics["last_run_at"] = now.isoformat()
+    retention_metrics["last_run_seconds"] = round(elapsed, 3)
+    logger.info(
+        f"Notification retention: {expired} expired deleted, {moved} archived, "
+        f"{purged} purged from archive in {elapsed:.2f}s"
+    )
@@ -1,7 +1,11 @@
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from typing import Callable, List, Optional, Tuple
 import asyncio
+import uuid
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from .database import SessionLocal
+from ..models.job_lease import JobLease
 from ..models.user import User
 import logging
 
@@ -53,5 +57,75 @@ class UsageScheduler:
         finally:
             db.close()
 
-# Global scheduler instance
+class PeriodicJobs:
+    """Runs registered maintenance jobs at fixed intervals in worker threads"""
+
+    def __init__(self):
+        self.jobs: List[Tuple[str, float, Callable[[], None]]] = []
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, name: str, interval_seconds: float, job: Callable[[], None]):
+        self.jobs.append((name, interval_seconds, job))
+
+    def start(self):
+        """Start every registered job"""
+        for name, interval_seconds, job in self.jobs:
+            self._tasks.append(asyncio.create_task(self._run(name, interval_seconds, job)))
+        logger.info(f"Periodic jobs started: {[name for name, _, _ in self.jobs]}")
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        logger.info("Periodic jobs stopped")
+
+    async def _run(self, name: str, interval_seconds: float, job: Callable[[], None]):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(job)
+            except Exception as e:
+                logger.error(f"Error in periodic job {name}: {e}")
+
+def claim_job_lease(db: Session, name: str, duration: timedelta) -> Optional[str]:
+    """Take the job's lease for ``duration`` unless another worker holds it; returns the holder token.
+
+    Periodic jobs run in every worker process; jobs that must not overlap claim
+    the lease first and skip the run when they don't get it.
+    """
+    now = datetime.utcnow()
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.execute(dialect_insert(JobLease).values(name=name, locked_until=datetime.min).on_conflict_do_nothing(
+            index_elements=[JobLease.name]
+        ))
+    elif db.get(JobLease, name) is None:
+        try:
+            with db.begin_nested():
+                db.add(JobLease(name=name, locked_until=datetime.min))
+        except IntegrityError:
+            pass
+
+    token = uuid.uuid4().hex
+    claimed = db.query(JobLease).filter(
+        JobLease.name == name,
+        JobLease.locked_until < now
+    ).update({JobLease.holder: token, JobLease.locked_until: now + duration}, synchronize_session=False)
+    db.commit()
+    return token if claimed else None
+
+def release_job_lease(db: Session, name: str, token: str):
+    """Give the lease back early, if it is still ours"""
+    db.query(JobLease).filter(
+        JobLease.name == name,
+        JobLease.holder == token
+    ).update({JobLease.holder: None, JobLease.locked_until: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+# Global scheduler instances
 usage_scheduler = UsageScheduler()
+periodic_jobs = PeriodicJobs()
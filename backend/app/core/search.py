@@ -0,0 +1,193 @@
+from sqlalchemy import text, or_
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import re
+import threading
+import time
+
+from .database import replica_engines
+
+logger = logging.getLogger(__name__)
+
+# Searchable columns for each indexed table
+SEARCH_INDEXES: Dict[str, List[str]] = {
+    "clients": ["name", "email", "company"],
+    "invoices": ["invoice_number", "title", "client_name"],
+    "projects": ["title", "description", "client_name"],
+}
+
+# (engine url, table) -> whether that database has the table's full-text index.
+# Missing indexes are looked for again after a while, e.g. once a replica catches up.
+_available: Dict[Tuple[str, str], Tuple[bool, float]] = {}
+_available_lock = threading.Lock()
+_RECHECK_SECONDS = 60
+
+def _tokens(term: str) -> List[str]:
+    return re.findall(r"\w+", term.lower())
+
+def _pg_document(table: str) -> str:
+    columns = " || ' ' || ".join(f"coalesce({table}.{column}, '')" for column in SEARCH_INDEXES[table])
+    return f"to_tsvector('simple', {columns})"
+
+def _install_sqlite(conn, table: str):
+    columns = SEARCH_INDEXES[table]
+    fts = f"{table}_fts"
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": fts}
+    ).first()
+
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{column_list}, content='{table}', content_rowid='id')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.id, {new_values}); END"
+    ))
+
+    # Index rows that existed before the search table was created
+    if not exists:
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+def _install_postgresql(conn, table: str):
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN ({_pg_document(table)})"
+    ))
+
+def install_search_indexes(engine):
+    """Create full-text indexes (FTS5 on SQLite, tsvector GIN on PostgreSQL)"""
+    installers = {"sqlite": _install_sqlite, "postgresql": _install_postgresql}
+    installer = installers.get(engine.dialect.name)
+    if installer is None:
+        logger.info(f"Full-text search not supported on {engine.dialect.name}, using LIKE search")
+        return
+
+    for table in SEARCH_INDEXES:
+        try:
+            with engine.begin() as conn:
+                installer(conn, table)
+            with _available_lock:
+                _available[(str(engine.url), table)] = (True, time.monotonic())
+        except Exception as e:
+            logger.warning(f"Could not install search index for {table}, using LIKE search: {e}")
+
+def _match_sql(dialect_name: str, table: str) -> Tuple[str, str]:
+    """Return (match condition, score expression) SQL for a table; higher scores rank first"""
+    if dialect_name == "sqlite":
+        return f"{table}_fts MATCH :query", f"-bm25({table}_fts)"
+    tsquery = "to_tsquery('simple', :query)"
+    return f"{_pg_document(table)} @@ {tsquery}", f"ts_rank({_pg_document(table)}, {tsquery})"
+
+def _match_query(dialect_name: str, tokens: List[str]) -> str:
+    if dialect_name == "sqlite":
+        return " ".join(f'"{token}"*' for token in tokens)
+    return " & ".join(f"{token}:*" for token in tokens)
+
+def _index_exists(conn, dialect_name: str, table: str) -> bool:
+    if dialect_name == "sqlite":
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+        name = f"{table}_fts"
+    else:
+        sql = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+        name = f"ix_{table}_search"
+    return conn.execute(text(sql), {"name": name}).first() is not None
+
+def _index_available(engine, table: str) -> bool:
+    """Whether ``engine``'s database has the table's full-text index, remembered per process"""
+    key = (str(engine.url), table)
+    with _available_lock:
+        cached = _available.get(key)
+    if cached is not None and (cached[0] or time.monotonic() - cached[1] < _RECHECK_SECONDS):
+        return cached[0]
+
+    try:
+        with engine.connect() as conn:
+            available = _index_exists(conn, engine.dialect.name, table)
+    except Exception as e:
+        logger.warning(f"Could not check the search index for {table} on {engine.url!r}, using LIKE search: {e}")
+        available = False
+    with _available_lock:
+        _available[key] = (available, time.monotonic())
+    return available
+
+def _use_index(db: Session, table: str, term: str) -> Optional[str]:
+    """The dialect to run an indexed search with, or None to fall back to LIKE.
+
+    The index is checked on the database the session reads from. Replica
+    sessions rotate through every replica, so all of them must have it.
+    """
+    bind = db.get_bind()
+    dialect_name = bind.dialect.name
+    if dialect_name not in ("sqlite", "postgresql") or not _tokens(term):
+        return None
+    engines = replica_engines if bind in replica_engines else [bind]
+    if all(_index_available(engine, table) for engine in engines):
+        return dialect_name
+    return None
+
+def search_filter(db: Session, model: Any, term: str):
+    """Filter clause restricting ``model`` rows to those matching ``term``"""
+    table = model.__tablename__
+    dialect_name = _use_index(db, table, term)
+
+    if dialect_name is None:
+        search_pattern = f"%{term}%"
+        return or_(*(getattr(model, column).ilike(search_pattern) for column in SEARCH_INDEXES[table]))
+
+    condition, _ = _match_sql(dialect_name, table)
+    if dialect_name == "sqlite":
+        matching_ids = text(f"SELECT rowid FROM {table}_fts WHERE {condition}")
+    else:
+        matching_ids = text(f"SELECT id FROM {table} WHERE {condition}")
+    return model.id.in_(
+        matching_ids.bindparams(query=_match_query(dialect_name, _tokens(term))).columns(id=model.id.type)
+    )
+
+def ranked_search(db: Session, model: Any, user_id: int, term: str, limit: int) -> List[Tuple[int, float]]:
+    """Return up to ``limit`` (id, score) pairs for the user's matching rows, best first"""
+    table = model.__tablename__
+    dialect_name = _use_index(db, table, term)
+
+    if dialect_name is None:
+        rows = db.query(model.id).filter(
+            model.user_id == user_id,
+            search_filter(db, model, term)
+        ).order_by(model.id.desc()).limit(limit).all()
+        return [(row.id, 0.0) for row in rows]
+
+    condition, score = _match_sql(dialect_name, table)
+    if dialect_name == "sqlite":
+        sql = (
+            f"SELECT {table}.id AS id, {score} AS score FROM {table}_fts "
+            f"JOIN {table} ON {table}.id = {table}_fts.rowid "
+            f"WHERE {condition} AND {table}.user_id = :user_id "
+            f"ORDER BY score DESC, {table}.id DESC LIMIT :limit"
+        )
+    else:
+        sql = (
+            f"SELECT {table}.id AS id, {score} AS score FROM {table} "
+            f"WHERE {condition} AND {table}.user_id = :user_id "
+            f"ORDER BY score DESC, {table}.id DESC LIMIT :limit"
+        )
+
+    rows = db.execute(text(sql), {
+        "query": _match_query(dialect_name, _tokens(term)),
+        "user_id": user_id,
+        "limit": limit
+    }).all()
+    return [(row.id, float(row.score)) for row in rows]
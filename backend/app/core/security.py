@@ -94,6 +94,9 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Lets the session router keep this user's reads on the primary after a write
+    db.info["user_id"] = user.id
+    
     return user
 
 def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
@@ -0,0 +1,293 @@
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import uuid
+
+from .config import settings
+from .database import SessionLocal
+from .uploads import CHUNK_SIZE, save_upload
+from .storage_backends import storage_backend
+from ..models.file import Blob, StoredFile, StorageUsage
+from ..models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Uploads are staged here while they stream in, before moving to the storage backend
+TMP_DIR = os.path.join(settings.STORAGE_LOCAL_ROOT, "tmp")
+
+# Names the pre-blob-store upload endpoints gave files under uploads/{user_id}/
+LEGACY_DOCUMENT_NAME = re.compile(r"^(?P<document_type>.+)_\d{8}_\d{6}_[0-9a-f]{8}\.\w+$")
+LEGACY_GENERAL_NAME = re.compile(r"^\d{8}_\d{6}_(?P<filename>.+)$")
+
+def blob_key(sha256: str) -> str:
+    """Storage key of a blob, sharded by hash prefix to keep directories small"""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+def get_usage(db: Session, user_id: int) -> StorageUsage:
+    usage = db.query(StorageUsage).filter(StorageUsage.user_id == user_id).first()
+    if usage is None:
+        try:
+            with db.begin_nested():
+                usage = StorageUsage(user_id=user_id, bytes_used=0, file_count=0)
+                db.add(usage)
+        except IntegrityError:
+            # Created concurrently by another request
+            usage = db.query(StorageUsage).filter(StorageUsage.user_id == user_id).one()
+    return usage
+
+def _charge_quota(db: Session, user_id: int, size: int, quota_bytes: int):
+    """Add ``size`` to the user's usage unless it would exceed the quota"""
+    charged = db.query(StorageUsage).filter(
+        StorageUsage.user_id == user_id,
+        StorageUsage.bytes_used + size <= quota_bytes
+    ).update({
+        StorageUsage.bytes_used: StorageUsage.bytes_used + size,
+        StorageUsage.file_count: StorageUsage.file_count + 1
+    }, synchronize_session=False)
+    if not charged:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Storage quota for your plan exceeded"
+        )
+
+def _reference_blob(db: Session, sha256: str) -> bool:
+    """Count one more reference to an existing blob; False if there is no such blob"""
+    return bool(db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count + 1}, synchronize_session=False
+    ))
+
+def _add_blob(db: Session, sha256: str, size: int):
+    try:
+        with db.begin_nested():
+            db.add(Blob(sha256=sha256, size=size, ref_count=1))
+    except IntegrityError:
+        # Same content stored concurrently; the file we moved is identical
+        _reference_blob(db, sha256)
+
+async def store_upload(
+    db: Session,
+    user_id: int,
+    file: UploadFile,
+    category: str,
+    extension: str,
+    quota_bytes: int,
+    document_type: Optional[str] = None
+) -> StoredFile:
+    """Stream an upload into the blob store and record it, charging the user's quota.
+
+    New content is put into storage before the write transaction starts, so the
+    usage row isn't locked for the length of an S3 upload.
+    """
+    remaining = quota_bytes - get_usage(db, user_id).bytes_used
+    db.commit()
+    if remaining <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Storage quota for your plan exceeded"
+        )
+
+    os.makedirs(TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(TMP_DIR, uuid.uuid4().hex)
+    stored = await save_upload(file, tmp_path, extension, remaining)
+
+    content_type = mimetypes.guess_type(file.filename)[0] or file.content_type
+    uploaded = False
+    try:
+        while True:
+            if not uploaded and db.query(Blob.sha256).filter(Blob.sha256 == stored.sha256).first() is None:
+                db.commit()
+                await asyncio.to_thread(storage_backend.put, tmp_path, blob_key(stored.sha256), content_type)
+                uploaded = True
+
+            _charge_quota(db, user_id, stored.size, quota_bytes)
+            if not _reference_blob(db, stored.sha256):
+                if not uploaded:
+                    # The blob was deleted since we looked; store our copy instead
+                    db.rollback()
+                    continue
+                _add_blob(db, stored.sha256, stored.size)
+            stored_file = StoredFile(
+                user_id=user_id,
+                category=category,
+                document_type=document_type,
+                filename=file.filename,
+                extension=extension,
+                content_type=content_type,
+                size=stored.size,
+                sha256=stored.sha256
+            )
+            db.add(stored_file)
+            db.commit()
+            break
+    except BaseException:
+        # A blob put into storage is left for the next upload of the same content:
+        # a concurrent upload may already reference it
+        db.rollback()
+        raise
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    db.refresh(stored_file)
+    return stored_file
+
+def collect_blob(db: Session, sha256: str) -> bool:
+    """Remove an unreferenced blob's content and row; False if it is referenced again or already gone.
+
+    The row is write-locked and re-checked before the content is deleted, so an
+    upload of the same content either references the blob first (and it is
+    kept) or waits, finds no row and puts its own copy afterwards.
+    """
+    try:
+        orphaned = db.query(Blob).filter(Blob.sha256 == sha256, Blob.ref_count <= 0).update(
+            {Blob.ref_count: Blob.ref_count}, synchronize_session=False
+        )
+        if orphaned:
+            storage_backend.delete(blob_key(sha256))
+            db.query(Blob).filter(Blob.sha256 == sha256).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return bool(orphaned)
+
+async def delete_file(db: Session, stored_file: StoredFile):
+    """Delete a file record, releasing its quota and the blob once nothing references it"""
+    sha256 = stored_file.sha256
+    db.query(StorageUsage).filter(StorageUsage.user_id == stored_file.user_id).update({
+        StorageUsage.bytes_used: StorageUsage.bytes_used - stored_file.size,
+        StorageUsage.file_count: StorageUsage.file_count - 1
+    }, synchronize_session=False)
+    db.delete(stored_file)
+    db.query(Blob).filter(Blob.sha256 == sha256).update(
+        {Blob.ref_count: Blob.ref_count - 1}, synchronize_session=False
+    )
+    db.commit()
+
+    try:
+        await asyncio.to_thread(collect_blob, db, sha256)
+    except Exception as e:
+        # The row stays at zero references; collect_orphaned_blobs retries it
+        logger.warning(f"Could not remove blob {sha256}: {e}")
+
+def collect_orphaned_blobs(db: Session, batch_size: int) -> int:
+    """Remove blobs whose last file was deleted but whose content removal failed; returns the number removed"""
+    removed = 0
+    last = ""
+    while True:
+        orphans = [row.sha256 for row in db.query(Blob.sha256).filter(
+            Blob.ref_count <= 0, Blob.sha256 > last
+        ).order_by(Blob.sha256).limit(batch_size)]
+        db.commit()
+        for sha256 in orphans:
+            try:
+                removed += collect_blob(db, sha256)
+            except Exception as e:
+                logger.warning(f"Could not remove blob {sha256}: {e}")
+        if len(orphans) < batch_size:
+            return removed
+        last = orphans[-1]
+
+def run_blob_collection():
+    """Periodic job: remove unreferenced blobs left behind by failed deletes"""
+    db = SessionLocal()
+    try:
+        removed = collect_orphaned_blobs(db, 500)
+    finally:
+        db.close()
+    if removed:
+        logger.info(f"Blob collection: {removed} unreferenced blobs removed")
+
+def _legacy_files(root: str) -> Iterator[Tuple[int, str, str, Optional[str], str]]:
+    """(user_id, path, category, document_type, filename) of each file in the old uploads/{user_id}/ layout"""
+    for user_dir in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if not user_dir.is_dir() or not user_dir.name.isdigit():
+            continue
+        user_id = int(user_dir.name)
+        for entry in sorted(os.scandir(user_dir.path), key=lambda entry: entry.name):
+            if entry.is_file():
+                match = LEGACY_GENERAL_NAME.match(entry.name)
+                yield user_id, entry.path, "general", None, match.group("filename") if match else entry.name
+            elif entry.name in ("resume", "documents") and entry.is_dir():
+                for child in sorted(os.scandir(entry.path), key=lambda child: child.name):
+                    if not child.is_file():
+                        continue
+                    if entry.name == "resume":
+                        yield user_id, child.path, "resume", None, child.name
+                    else:
+                        match = LEGACY_DOCUMENT_NAME.match(child.name)
+                        yield user_id, child.path, "document", match.group("document_type") if match else None, child.name
+
+def _file_digest(path: str) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+def backfill_legacy_uploads(db: Session, root: str) -> int:
+    """Move files saved under the old uploads/{user_id}/ layout into the blob store; returns the number recorded.
+
+    Each file gets its blob, files row and storage_usage charge in its own
+    transaction, and is removed from ``root`` once committed. Files already
+    recorded are skipped, so an interrupted backfill can be re-run. Existing
+    files are charged even past the plan's quota.
+    """
+    user_ids = {user_id for (user_id,) in db.query(User.id)}
+    recorded = 0
+    for user_id, path, category, document_type, filename in _legacy_files(root):
+        if user_id not in user_ids:
+            logger.warning(f"Skipping {path}: no user {user_id}")
+            continue
+        size, sha256 = _file_digest(path)
+        if db.query(StoredFile.id).filter(
+            StoredFile.user_id == user_id,
+            StoredFile.sha256 == sha256,
+            StoredFile.filename == filename
+        ).first() is None:
+            content_type = mimetypes.guess_type(filename)[0]
+            try:
+                if not _reference_blob(db, sha256):
+                    os.makedirs(TMP_DIR, exist_ok=True)
+                    tmp_path = os.path.join(TMP_DIR, uuid.uuid4().hex)
+                    try:
+                        shutil.copyfile(path, tmp_path)
+                        storage_backend.put(tmp_path, blob_key(sha256), content_type)
+                    finally:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                    _add_blob(db, sha256, size)
+                get_usage(db, user_id)
+                db.query(StorageUsage).filter(StorageUsage.user_id == user_id).update({
+                    StorageUsage.bytes_used: StorageUsage.bytes_used + size,
+                    StorageUsage.file_count: StorageUsage.file_count + 1
+                }, synchronize_session=False)
+                db.add(StoredFile(
+                    user_id=user_id,
+                    category=category,
+                    document_type=document_type,
+                    filename=filename,
+                    extension=os.path.splitext(filename)[1].lstrip(".").lower()[:10],
+                    content_type=content_type,
+                    size=size,
+                    sha256=sha256,
+                    created_at=datetime.utcfromtimestamp(os.path.getmtime(path))
+                ))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            recorded += 1
+        os.remove(path)
+    return recorded
@@ -0,0 +1,105 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+import os
+import shutil
+
+from .config import settings
+
+class StorageBackend(ABC):
+    """Where blob content lives; keys are slash-separated relative paths"""
+
+    @abstractmethod
+    def put(self, local_path: str, key: str, content_type: Optional[str] = None):
+        """Move a finished local file into storage under ``key``"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove the content stored under ``key``, if any"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path for ``key`` when the backend stores files locally"""
+        return None
+
+    def presigned_url(self, key: str, filename: str, content_type: Optional[str], expires_in: int) -> Optional[str]:
+        """Time-limited URL clients can download from directly, if the backend supports it"""
+        return None
+
+class LocalStorage(StorageBackend):
+    """Files on the API server's disk, served through the API"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, local_path: str, key: str, content_type: Optional[str] = None):
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(local_path, path)
+        except OSError:
+            # Temporary directory on another filesystem
+            shutil.move(local_path, path)
+
+    def delete(self, key: str):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+class S3Storage(StorageBackend):
+    """S3 or any S3-compatible store (MinIO, moto) selected by ``endpoint_url``"""
+
+    def __init__(self, bucket: str, region: str, endpoint_url: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 multipart_threshold: int = 8 * 1024 * 1024):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            region_name=region,
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+        # Files above the threshold are sent as parallel multipart uploads
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_threshold
+        )
+
+    def put(self, local_path: str, key: str, content_type: Optional[str] = None):
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_file(local_path, self.bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+        os.remove(local_path)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presigned_url(self, key: str, filename: str, content_type: Optional[str], expires_in: int) -> str:
+        params = {
+            "Bucket": self.bucket,
+            "Key": key,
+            "ResponseContentDisposition": f'attachment; filename="{filename}"'
+        }
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+def create_storage_backend() -> StorageBackend:
+    """Build the backend selected by STORAGE_BACKEND (local or s3)"""
+    if settings.STORAGE_BACKEND.lower() == "s3":
+        return S3Storage(
+            bucket=settings.AWS_BUCKET_NAME,
+            region=settings.AWS_REGION,
+            endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+            access_key_id=settings.AWS_ACCESS_KEY_ID,
+            secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            multipart_threshold=settings.S3_MULTIPART_THRESHOLD_MB * 1024 * 1024
+        )
+    return LocalStorage(settings.STORAGE_LOCAL_ROOT)
+
+# Global storage backend instance
+storage_backend = create_storage_backend()
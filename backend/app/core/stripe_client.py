@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+import importlib
+
+import stripe
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# stripe 7.8's module __getattr__ leaves these namespaces as None on the package,
+# which breaks converting any response; importing them binds the real modules
+for _namespace in ("apps", "billing_portal", "checkout", "climate", "financial_connections", "identity", "issuing",
+                   "radar", "reporting", "sigma", "tax", "terminal", "test_helpers", "treasury"):
+    setattr(stripe, _namespace, importlib.import_module(f"stripe.{_namespace}"))
+
+class CircuitOpenError(Exception):
+    """Stripe has been failing; calls are refused until the cool-down passes"""
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures and lets a single trial call through after ``reset_seconds``"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "open" or self._trial_running:
+                raise CircuitOpenError("Payment service temporarily unavailable")
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Stripe circuit opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+def _is_transient(error: stripe.error.StripeError) -> bool:
+    """Network failures, rate limiting and 5xx responses; anything else is Stripe answering normally"""
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    return isinstance(error, stripe.error.APIError) or (error.http_status or 0) >= 500
+
+class StripeClient:
+    """Runs blocking Stripe SDK calls on a bounded thread pool, with retries and a circuit breaker"""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(settings.STRIPE_BREAKER_FAILURES, settings.STRIPE_BREAKER_RESET_SECONDS)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if settings.STRIPE_SECRET_KEY:
+            stripe.api_key = settings.STRIPE_SECRET_KEY
+        if settings.STRIPE_API_BASE:
+            stripe.api_base = settings.STRIPE_API_BASE
+        stripe.default_http_client = stripe.http_client.RequestsClient(timeout=settings.STRIPE_TIMEOUT_SECONDS)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=settings.STRIPE_MAX_CONCURRENCY, thread_name_prefix="stripe")
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _call(self, operation: Callable[..., Any], args: tuple, idempotency_key: str, params: dict) -> Any:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = operation(*args, idempotency_key=idempotency_key, **params)
+            except stripe.error.StripeError as e:
+                if not _is_transient(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= settings.STRIPE_MAX_RETRIES:
+                    raise
+                attempt += 1
+                # The same idempotency key makes Stripe replay rather than repeat a request that did land
+                time.sleep(min(0.5 * 2 ** (attempt - 1), 4))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def call(self, operation: Callable[..., Any], *args, idempotency_key: Optional[str] = None, **params) -> Any:
+        """Run a Stripe SDK method (e.g. ``stripe.PaymentIntent.create``) off the event loop.
+
+        Every attempt sends the same idempotency key, generated if not given.
+        Raises CircuitOpenError without calling Stripe while the circuit is open.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._pool(), self._call, operation, args, idempotency_key or str(uuid.uuid4()), params
+        )
+
+# Global Stripe client instance
+stripe_client = StripeClient()
@@ -0,0 +1,263 @@
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import logging
+
+from .config import settings
+from .database import SessionLocal
+from .notifications import send_notifications
+from .plans import apply_plan, plan_registry
+from ..models.invoice import Invoice
+from ..models.payment import StripeEvent, StripeSubscription
+from ..models.user import User
+from ..schemas.notification import NotificationCreate, NotificationType
+
+logger = logging.getLogger(__name__)
+
+# How long a worker may hold a claimed event before another worker may retry it
+LEASE = timedelta(minutes=5)
+
+# Upper bound for the retry delay, however many attempts have failed
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+# Subscription states that keep the paid plan
+ACTIVE_SUBSCRIPTION_STATUSES = ("active", "trialing", "past_due")
+
+# Notifications to send once an event's changes are committed
+PendingNotifications = List[Tuple[int, NotificationCreate]]
+
+def invoice_payment_notification(invoice) -> NotificationCreate:
+    return NotificationCreate(
+        title="Payment Received",
+        message=f"Payment received for invoice {invoice.invoice_number} - ${invoice.total_amount:,.2f}",
+        type=NotificationType.PAYMENT_RECEIVED,
+        related_entity_type="invoice",
+        related_entity_id=invoice.id
+    )
+
+def record_event(db: Session, event: dict, payload: str) -> bool:
+    """Store a verified event in the inbox; returns False if it was already received"""
+    obj = event.get("data", {}).get("object") or {}
+    row = {
+        "id": event["id"],
+        "type": event["type"],
+        "object_id": obj.get("id"),
+        "stripe_created_at": datetime.utcfromtimestamp(event["created"]),
+        "payload": payload,
+        "next_attempt_at": datetime.utcnow(),
+    }
+
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name in ("postgresql", "sqlite"):
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        inserted = db.execute(dialect_insert(StripeEvent).values(row).on_conflict_do_nothing(
+            index_elements=[StripeEvent.id]
+        )).rowcount
+        db.commit()
+        return bool(inserted)
+
+    try:
+        db.add(StripeEvent(**row))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+def _metadata(obj: dict) -> dict:
+    return obj.get("metadata") or {}
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _subscription_plan(obj: dict) -> Optional[str]:
+    """Plan id from the subscription's metadata, or its first price's lookup key"""
+    plan_id = _metadata(obj).get("plan_id")
+    if plan_id is None:
+        items = (obj.get("items") or {}).get("data") or []
+        if items:
+            plan_id = (items[0].get("price") or {}).get("lookup_key")
+    return plan_id if plan_id in plan_registry else None
+
+def _subscription_user(db: Session, obj: dict) -> Optional[int]:
+    """The subscriber: from metadata, else from what an earlier event told us about the subscription or customer"""
+    user_id = _int(_metadata(obj).get("user_id"))
+    if user_id is not None:
+        return user_id
+    known = db.query(StripeSubscription.user_id).filter(or_(
+        StripeSubscription.id == obj["id"],
+        StripeSubscription.customer_id == obj.get("customer")
+    )).first()
+    return known.user_id if known else None
+
+def _sync_user_plan(db: Session, user_id: int):
+    """Put the user on the plan of their most recently updated live subscription, or free"""
+    user = db.get(User, user_id)
+    if user is None:
+        return
+    live = db.query(StripeSubscription).filter(
+        StripeSubscription.user_id == user_id,
+        StripeSubscription.status.in_(ACTIVE_SUBSCRIPTION_STATUSES),
+        StripeSubscription.plan_id.isnot(None)
+    ).order_by(StripeSubscription.event_created_at.desc()).first()
+    apply_plan(user, live.plan_id if live else plan_registry.default.id)
+
+def _handle_subscription(db: Session, event: StripeEvent, obj: dict, notifications: PendingNotifications) -> bool:
+    """customer.subscription.*: record the subscription's state and re-derive the user's plan"""
+    user_id = _subscription_user(db, obj)
+    if user_id is None:
+        return False
+
+    subscription = db.get(StripeSubscription, obj["id"])
+    # Stripe doesn't guarantee delivery order; an older snapshot must not overwrite a newer one
+    if subscription is not None and subscription.event_created_at > event.stripe_created_at:
+        return False
+    if subscription is None:
+        subscription = StripeSubscription(id=obj["id"], user_id=user_id)
+        db.add(subscription)
+
+    status = "canceled" if event.type == "customer.subscription.deleted" else obj.get("status", "active")
+    subscription.customer_id = obj.get("customer")
+    subscription.plan_id = _subscription_plan(obj)
+    subscription.status = status
+    period_end = obj.get("current_period_end")
+    subscription.current_period_end = datetime.utcfromtimestamp(period_end) if period_end else None
+    subscription.event_created_at = event.stripe_created_at
+    db.flush()
+
+    _sync_user_plan(db, subscription.user_id)
+    return True
+
+def _handle_payment(db: Session, event: StripeEvent, obj: dict, notifications: PendingNotifications) -> bool:
+    """A completed payment: settles the QuickBird invoice or plan named in its metadata"""
+    metadata = _metadata(obj)
+    if event.type == "checkout.session.completed" and obj.get("payment_status") != "paid":
+        return False
+
+    invoice_id = _int(metadata.get("invoice_id"))
+    if invoice_id is not None:
+        invoice = db.get(Invoice, invoice_id)
+        user_id = _int(metadata.get("user_id"))
+        if invoice is None or (user_id is not None and invoice.user_id != user_id):
+            return False
+        # Redelivered or already settled by hand
+        if invoice.status == "paid":
+            return False
+        invoice.status = "paid"
+        invoice.paid_date = event.stripe_created_at
+        invoice.updated_at = datetime.utcnow()
+        notifications.append((invoice.user_id, invoice_payment_notification(invoice)))
+        return True
+
+    plan_id = metadata.get("plan_id")
+    user = db.get(User, _int(metadata.get("user_id"))) if metadata.get("user_id") else None
+    if user is None or plan_id not in plan_registry:
+        return False
+    apply_plan(user, plan_id)
+    return True
+
+# Event type -> handler; handlers return False when the event changed nothing
+EVENT_HANDLERS: Dict[str, Callable[[Session, StripeEvent, dict, PendingNotifications], bool]] = {
+    "customer.subscription.created": _handle_subscription,
+    "customer.subscription.updated": _handle_subscription,
+    "customer.subscription.deleted": _handle_subscription,
+    "payment_intent.succeeded": _handle_payment,
+    "checkout.session.completed": _handle_payment,
+    "invoice.paid": _handle_payment,
+}
+
+def _claim_batch(db: Session, batch_size: int) -> List[StripeEvent]:
+    """Lease up to ``batch_size`` due events, oldest first; the conditional update keeps workers from sharing one"""
+    now = datetime.utcnow()
+    ids = [row.id for row in db.query(StripeEvent.id).filter(
+        StripeEvent.status == "pending",
+        StripeEvent.next_attempt_at <= now,
+        or_(StripeEvent.locked_until.is_(None), StripeEvent.locked_until < now)
+    ).order_by(StripeEvent.stripe_created_at, StripeEvent.received_at).limit(batch_size)]
+
+    claimed = []
+    for event_id in ids:
+        if db.query(StripeEvent).filter(
+            StripeEvent.id == event_id,
+            StripeEvent.status == "pending",
+            or_(StripeEvent.locked_until.is_(None), StripeEvent.locked_until < now)
+        ).update({StripeEvent.locked_until: now + LEASE}, synchronize_session=False):
+            claimed.append(event_id)
+    db.commit()
+
+    if not claimed:
+        return []
+    return db.query(StripeEvent).filter(StripeEvent.id.in_(claimed)).order_by(
+        StripeEvent.stripe_created_at, StripeEvent.received_at
+    ).all()
+
+def _record_failure(db: Session, event_id: str, error: Exception):
+    event = db.get(StripeEvent, event_id)
+    event.attempts += 1
+    event.last_error = str(error)[:1000]
+    event.locked_until = None
+    if event.attempts >= settings.STRIPE_EVENT_MAX_ATTEMPTS:
+        event.status = "failed"
+        logger.error(f"Giving up on Stripe event {event.id} ({event.type}): {error}")
+    else:
+        delay = timedelta(seconds=settings.STRIPE_EVENT_RETRY_BASE_SECONDS * 2 ** (event.attempts - 1))
+        event.next_attempt_at = datetime.utcnow() + min(delay, MAX_RETRY_DELAY)
+        logger.warning(f"Stripe event {event.id} attempt {event.attempts} failed, retrying: {error}")
+    db.commit()
+
+def process_event(db: Session, event: StripeEvent) -> PendingNotifications:
+    """Apply one event and mark it done in the same transaction; returns notifications to send after commit"""
+    notifications: PendingNotifications = []
+    handler = EVENT_HANDLERS.get(event.type)
+    applied = False
+    if handler is not None:
+        obj = json.loads(event.payload)["data"]["object"]
+        applied = handler(db, event, obj, notifications)
+    event.status = "processed" if applied else "ignored"
+    event.locked_until = None
+    event.last_error = None
+    event.processed_at = datetime.utcnow()
+    return notifications
+
+def process_pending(db: Session, batch_size: int) -> int:
+    """Process received events until the inbox is drained; returns the number handled"""
+    handled = 0
+    while True:
+        batch = _claim_batch(db, batch_size)
+        if not batch:
+            return handled
+        for event in batch:
+            event_id = event.id
+            try:
+                notifications = process_event(db, event)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                _record_failure(db, event_id, e)
+                continue
+            handled += 1
+            if notifications:
+                send_notifications(db, notifications)
+
+def run_stripe_events():
+    """Periodic job: process received Stripe webhook events"""
+    db = SessionLocal()
+    try:
+        handled = process_pending(db, settings.STRIPE_EVENT_BATCH_SIZE)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    if handled:
+        logger.info(f"Stripe events: {handled} processed")
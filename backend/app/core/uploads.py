@@ -0,0 +1,69 @@
+from fastapi import HTTPException, UploadFile, status
+from typing import NamedTuple
+import aiofiles
+import hashlib
+import os
+
+# Files are copied in chunks of this size, so memory use doesn't grow with file size
+CHUNK_SIZE = 1024 * 1024
+
+# Leading bytes each extension's content must start with (None: no signature to check)
+MAGIC_BYTES = {
+    "pdf": (b"%PDF-",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "docx": (b"PK\x03\x04",),
+    "doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),
+    "txt": None,
+}
+
+class StoredUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+
+def check_magic_bytes(extension: str, head: bytes):
+    """Reject content that doesn't look like the file type its extension claims"""
+    signatures = MAGIC_BYTES.get(extension)
+    if signatures is None:
+        # Plain text has no signature; binary content gives itself away with NUL bytes
+        if extension == "txt" and b"\x00" in head:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File content does not match file type txt"
+            )
+        return
+    if not head.startswith(signatures):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File content does not match file type {extension}"
+        )
+
+async def save_upload(file: UploadFile, file_path: str, extension: str, max_bytes: int) -> StoredUpload:
+    """Stream an upload to ``file_path`` chunk by chunk, hashing it and enforcing ``max_bytes``"""
+    head = await file.read(CHUNK_SIZE)
+    check_magic_bytes(extension, head)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            chunk = head
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="File exceeds the storage remaining on your plan"
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+                chunk = await file.read(CHUNK_SIZE)
+    except BaseException:
+        # Never leave a partial file behind
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+    return StoredUpload(path=file_path, size=size, sha256=digest.hexdigest())
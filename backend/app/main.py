@@ -1,37 +1,102 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
 import uvicorn
 import asyncio
-import os
 from contextlib import asynccontextmanager
 
 from .core.config import settings
-from .core.database import engine, Base
-from .core.scheduler import usage_scheduler
+from .core.database import engine, Base, read_your_writes_middleware
+from .core.scheduler import usage_scheduler, periodic_jobs
+from .core.notifications import reconcile_all_counters
+from .core.retention import run_retention
+from .core.deadlines import ensure_deadline_indexes, run_deadline_scan
+from .core.mailer import run_mail_delivery
+from .core.recurring import ensure_recurring_indexes, run_recurring_invoices
+from .core.stripe_webhooks import run_stripe_events
 from .core.rate_limiter import rate_limit_middleware
-from .api.v1 import auth, users, projects, tasks, ai, payments, clients, invoices, milestones, work_logs, notifications, recurring_invoices, admin, upload, analytics, websocket, project_templates, time_tracking, client_portal
+from .core.search import install_search_indexes
+from .core.pagination import ensure_pagination_indexes
+from .core.backplane import backplane
+from .core.responses import FastJSONResponse
+from .core.storage import run_blob_collection
+from .core.invoice_pdf import run_invoice_pdf_pruning, shutdown_render_pool
+from .core.stripe_client import stripe_client
+from .api.v1 import auth, users, projects, tasks, ai, payments, clients, invoices, milestones, work_logs, notifications, recurring_invoices, admin, upload, analytics, websocket, project_templates, time_tracking, client_portal, search, currencies
+
+# Background maintenance jobs, started in the lifespan
+periodic_jobs.register(
+    "notification_counters",
+    settings.NOTIFICATION_COUNTER_RECONCILE_MINUTES * 60,
+    reconcile_all_counters
+)
+periodic_jobs.register(
+    "notification_retention",
+    settings.NOTIFICATION_RETENTION_SWEEP_MINUTES * 60,
+    run_retention
+)
+periodic_jobs.register(
+    "deadline_scan",
+    settings.DEADLINE_SCAN_MINUTES * 60,
+    run_deadline_scan
+)
+periodic_jobs.register(
+    "recurring_invoices",
+    settings.RECURRING_INVOICE_SCAN_MINUTES * 60,
+    run_recurring_invoices
+)
+periodic_jobs.register(
+    "outbound_mail",
+    settings.MAIL_POLL_SECONDS,
+    run_mail_delivery
+)
+periodic_jobs.register(
+    "stripe_events",
+    settings.STRIPE_EVENT_POLL_SECONDS,
+    run_stripe_events
+)
+periodic_jobs.register(
+    "blob_collection",
+    settings.STORAGE_BLOB_COLLECTION_MINUTES * 60,
+    run_blob_collection
+)
+periodic_jobs.register(
+    "invoice_pdf_cache",
+    settings.INVOICE_PDF_PRUNE_MINUTES * 60,
+    run_invoice_pdf_pruning
+)
 
 # Create database tables
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     Base.metadata.create_all(bind=engine)
-    
-    # Create uploads directory if it doesn't exist
-    uploads_dir = "uploads"
-    if not os.path.exists(uploads_dir):
-        os.makedirs(uploads_dir, exist_ok=True)
+    install_search_indexes(engine)
+    ensure_deadline_indexes(engine)
+    ensure_recurring_indexes(engine)
+    ensure_pagination_indexes(engine)
     
     # Start usage reset scheduler
     if not settings.DEBUG:  # Only run in production
         asyncio.create_task(usage_scheduler.start())
     
+    # Background maintenance jobs
+    periodic_jobs.start()
+    
+    # Fan WebSocket messages out to connections on every worker
+    await backplane.start(websocket.manager.deliver_local)
+    websocket.manager.start()
+    websocket.read_receipts.start()
+    
     yield
     # Shutdown
     usage_scheduler.stop()
+    periodic_jobs.stop()
+    await websocket.read_receipts.stop()
+    await websocket.manager.stop()
+    await backplane.stop()
+    shutdown_render_pool()
+    stripe_client.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
@@ -40,15 +105,13 @@ app = FastAPI(
     description="AI-powered tools for freelancers to manage projects, generate proposals, and grow their business.",
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
 # Add middleware
 app.middleware("http")(rate_limit_middleware)
-
-# Mount static files for uploads (only if directory exists)
-if os.path.exists("uploads"):
-    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.middleware("http")(read_your_writes_middleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -56,6 +119,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Only add TrustedHostMiddleware in production
@@ -85,6 +149,8 @@ app.include_router(websocket.router, prefix="/api/v1", tags=["WebSocket"])
 app.include_router(project_templates.router, prefix="/api/v1/project-templates", tags=["Project Templates"])
 app.include_router(time_tracking.router, prefix="/api/v1/time-tracking", tags=["Time Tracking"])
 app.include_router(client_portal.router, prefix="/api/v1/client-portal", tags=["Client Portal"])
+app.include_router(search.router, prefix="/api/v1/search", tags=["Search"])
+app.include_router(currencies.router, prefix="/api/v1/currencies", tags=["Currencies"])
 
 # Health check endpoint
 @app.get("/health")
@@ -103,7 +169,7 @@ async def root():
 # Global exception handler
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail}
     )
@@ -111,11 +177,11 @@ async def http_exception_handler(request, exc):
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     if settings.DEBUG:
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={"detail": f"Internal server error: {str(exc)}"}
         )
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"}
     )
@@ -2,11 +2,18 @@ from .user import User
 from .project import Project
 from .task import Task
 from .client import Client
-from .invoice import Invoice, InvoiceItem
+from .invoice import Invoice, InvoiceItem, InvoiceSequence
 from .milestone import Milestone
+from .project_template import ProjectTemplate
 from .work_log import WorkLog
-from .notification import Notification
-from .recurring_invoice import RecurringInvoice
+from .notification import Notification, NotificationCounter, NotificationArchive
+from .recurring_invoice import RecurringInvoice, RecurringInvoiceRun
+from .scan_watermark import ScanWatermark, DeadlineNotice
+from .job_lease import JobLease
+from .file import Blob, StoredFile, StorageUsage
+from .outbound_email import OutboundEmail, OutboundEmailAttachment
+from .exchange_rate import ExchangeRate
+from .payment import StripeEvent, StripeSubscription
 
 # Import all models to ensure they are registered with SQLAlchemy
-__all__ = ["User", "Project", "Task", "Client", "Invoice", "InvoiceItem", "Milestone", "WorkLog", "Notification", "RecurringInvoice"]
+__all__ = ["User", "Project", "Task", "Client", "Invoice", "InvoiceItem", "InvoiceSequence", "Milestone", "ProjectTemplate", "WorkLog", "Notification", "NotificationCounter", "NotificationArchive", "RecurringInvoice", "RecurringInvoiceRun", "ScanWatermark", "DeadlineNotice", "JobLease", "Blob", "StoredFile", "StorageUsage", "OutboundEmail", "OutboundEmailAttachment", "ExchangeRate", "StripeEvent", "StripeSubscription"]
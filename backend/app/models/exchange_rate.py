@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Date, DateTime, Numeric
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class ExchangeRate(Base):
+    """Units of ``currency`` per one unit of the base currency (CURRENCY_RATE_BASE) on a date"""
+    __tablename__ = "exchange_rates"
+
+    # The primary key doubles as the (currency, date) index the conversion lookups seek on
+    currency = Column(String(3), primary_key=True)
+    rate_date = Column(Date, primary_key=True)
+    rate = Column(Numeric(20, 10), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
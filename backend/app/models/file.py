@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class Blob(Base):
+    """Stored content, shared by every file with the same SHA-256"""
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, default=1, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class StoredFile(Base):
+    __tablename__ = "files"
+    __table_args__ = (
+        # Serves per-user listings by category, newest first
+        Index("ix_files_user_category_created", "user_id", "category", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    category = Column(String(20), nullable=False)  # resume, document, general
+    document_type = Column(String(50), nullable=True)
+    filename = Column(String(255), nullable=False)
+    extension = Column(String(10), nullable=False)
+    content_type = Column(String(100), nullable=True)
+    size = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), ForeignKey("blobs.sha256"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    blob = relationship("Blob")
+
+class StorageUsage(Base):
+    """Running per-user totals, so quota checks never scan the files table"""
+    __tablename__ = "storage_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    bytes_used = Column(BigInteger, default=0, nullable=False)
+    file_count = Column(Integer, default=0, nullable=False)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Numeric, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Serves keyset pagination of the user's rows, newest first
+        Index("ix_invoices_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String(50), nullable=False, unique=True)
@@ -30,7 +34,7 @@ class Invoice(Base):
     
     # Status and dates
     status = Column(String(20), default="draft", nullable=False)  # draft, sent, paid, overdue, cancelled
-    due_date = Column(DateTime, nullable=True)
+    due_date = Column(DateTime, nullable=True, index=True)
     sent_date = Column(DateTime, nullable=True)
     paid_date = Column(DateTime, nullable=True)
     
@@ -44,8 +48,8 @@ class Invoice(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), index=True)
     
     # Relationships
     user = relationship("User", back_populates="invoices")
@@ -75,3 +79,11 @@ class InvoiceItem(Base):
     # Relationships
     invoice = relationship("Invoice", back_populates="items")
     task = relationship("Task")
+
+class InvoiceSequence(Base):
+    """Last invoice number issued per user and numbering period, incremented atomically"""
+    __tablename__ = "invoice_sequences"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    period = Column(String(10), primary_key=True, default="")  # "" or the year, when numbering resets yearly
+    last_value = Column(Integer, nullable=False, default=0)
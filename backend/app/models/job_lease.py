@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from ..core.database import Base
+
+class JobLease(Base):
+    """Lease on a periodic job that only one worker may run at a time"""
+    __tablename__ = "job_leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(32), nullable=True)  # Token of the worker holding the lease
+    locked_until = Column(DateTime, nullable=False)
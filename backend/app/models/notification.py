@@ -1,11 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from ..core.config import settings
 from ..core.database import Base
 from ..schemas.notification import NotificationType, NotificationPriority
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        # Serves keyset pagination of the user's rows, newest first
+        Index("ix_notifications_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -35,3 +40,36 @@ class Notification(Base):
     
     # Relationships
     user = relationship("User", back_populates="notifications")
+
+class NotificationCounter(Base):
+    """Per-user badge counts, kept in step with the notifications table"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    unread = Column(Integer, default=0, nullable=False)
+    high_priority_unread = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class NotificationArchive(Base):
+    """Archived notifications moved out of the live table by the retention sweeper"""
+    __tablename__ = "notifications_archive"
+    # On PostgreSQL the archive can be split into monthly partitions
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"} if settings.NOTIFICATION_ARCHIVE_PARTITIONED else {}
+
+    # created_at is part of the key so it can serve as the partition key
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    created_at = Column(DateTime(timezone=True), primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    title = Column(String(255), nullable=False)
+    message = Column(Text, nullable=False)
+    type = Column(Enum(NotificationType), nullable=False)
+    priority = Column(Enum(NotificationPriority), nullable=False)
+    related_entity_type = Column(String(50), nullable=True)
+    related_entity_id = Column(Integer, nullable=True)
+    is_read = Column(Boolean, nullable=False)
+    action_url = Column(String(500), nullable=True)
+    action_text = Column(String(100), nullable=True)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, LargeBinary, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class OutboundEmail(Base):
+    """A queued email, written in the same transaction as the change that triggers it"""
+    __tablename__ = "outbound_emails"
+    __table_args__ = (
+        # Serves the worker's "due for delivery" lookup
+        Index("ix_outbound_emails_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    to_address = Column(String(255), nullable=False)
+    reply_to = Column(String(255), nullable=True)
+    subject = Column(String(255), nullable=False)
+    html_body = Column(Text, nullable=True)
+    text_body = Column(Text, nullable=False)
+    related_entity_type = Column(String(50), nullable=True)  # e.g. invoice
+    related_entity_id = Column(Integer, nullable=True)
+
+    status = Column(String(20), default="pending", nullable=False)  # pending, sent, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, server_default=func.now(), nullable=False)
+    locked_until = Column(DateTime, nullable=True)  # Lease held by the worker delivering it
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    attachments = relationship("OutboundEmailAttachment", cascade="all, delete-orphan")
+
+class OutboundEmailAttachment(Base):
+    """Attachment content, snapshotted at enqueue time and dropped once the email is sent"""
+    __tablename__ = "outbound_email_attachments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    email_id = Column(Integer, ForeignKey("outbound_emails.id", ondelete="CASCADE"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    content = Column(LargeBinary, nullable=False)
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class StripeEvent(Base):
+    """A received Stripe webhook event; the event id makes redeliveries no-ops"""
+    __tablename__ = "stripe_events"
+    __table_args__ = (
+        # Serves the worker's "due for processing" lookup
+        Index("ix_stripe_events_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(String(255), primary_key=True)  # Stripe event id (evt_...)
+    type = Column(String(100), nullable=False)
+    object_id = Column(String(255), nullable=True, index=True)  # id of data.object
+    stripe_created_at = Column(DateTime, nullable=False)  # When Stripe created the event
+    payload = Column(Text, nullable=False)  # Verified raw body
+
+    status = Column(String(20), default="pending", nullable=False)  # pending, processed, ignored, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, server_default=func.now(), nullable=False)
+    locked_until = Column(DateTime, nullable=True)  # Lease held by the worker processing it
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime, nullable=True)
+
+class StripeSubscription(Base):
+    """Latest known state of a Stripe subscription, as of the newest event applied"""
+    __tablename__ = "stripe_subscriptions"
+
+    id = Column(String(255), primary_key=True)  # Stripe subscription id (sub_...)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    customer_id = Column(String(255), nullable=True, index=True)
+    plan_id = Column(String(50), nullable=True)
+    status = Column(String(30), nullable=False)  # Stripe status: active, trialing, past_due, canceled, ...
+    current_period_end = Column(DateTime, nullable=True)
+    event_created_at = Column(DateTime, nullable=False)  # Older events than this are stale
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -6,6 +6,10 @@ from ..core.database import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        # Serves keyset pagination of the user's rows, newest first
+        Index("ix_projects_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -16,7 +20,7 @@ class Project(Base):
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=True)
     budget = Column(Integer, nullable=True)  # In cents
     currency = Column(String(3), default="USD", nullable=False)
-    deadline = Column(DateTime, nullable=True)
+    deadline = Column(DateTime, nullable=True, index=True)
     start_date = Column(DateTime, nullable=True)
     end_date = Column(DateTime, nullable=True)
     hourly_rate = Column(Integer, nullable=True)  # In cents
@@ -24,7 +28,7 @@ class Project(Base):
     is_archived = Column(Boolean, default=False, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
 
     # Relationships
     user = relationship("User", back_populates="projects")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Numeric
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Numeric, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -6,6 +6,10 @@ from ..schemas.recurring_invoice import RecurringFrequency
 
 class RecurringInvoice(Base):
     __tablename__ = "recurring_invoices"
+    __table_args__ = (
+        # Serves keyset pagination of the user's rows, newest first
+        Index("ix_recurring_invoices_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -26,7 +30,7 @@ class RecurringInvoice(Base):
     interval = Column(Integer, default=1, nullable=False)  # Every X days/weeks/months
     start_date = Column(DateTime(timezone=True), nullable=False)
     end_date = Column(DateTime(timezone=True), nullable=True)
-    next_invoice_date = Column(DateTime(timezone=True), nullable=False)
+    next_invoice_date = Column(DateTime(timezone=True), nullable=False, index=True)
     
     # Status and settings
     is_active = Column(Boolean, default=True, nullable=False)
@@ -49,3 +53,19 @@ class RecurringInvoice(Base):
     user = relationship("User", back_populates="recurring_invoices")
     client = relationship("Client", back_populates="recurring_invoices")
     project = relationship("Project", back_populates="recurring_invoices")
+    runs = relationship("RecurringInvoiceRun", cascade="all, delete-orphan")
+
+class RecurringInvoiceRun(Base):
+    """One generated occurrence of a schedule; the unique key makes generation idempotent"""
+    __tablename__ = "recurring_invoice_runs"
+    __table_args__ = (
+        UniqueConstraint("recurring_invoice_id", "scheduled_for", name="uq_recurring_invoice_runs_occurrence"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recurring_invoice_id = Column(Integer, ForeignKey("recurring_invoices.id", ondelete="CASCADE"), nullable=False)
+    scheduled_for = Column(DateTime, nullable=False)
+    invoice_id = Column(Integer, ForeignKey("invoices.id", ondelete="SET NULL"), nullable=True)
+    reminder_due_at = Column(DateTime, nullable=True, index=True)
+    reminder_sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+class ScanWatermark(Base):
+    """How far a periodic scanner has processed, so each run only sees new rows"""
+    __tablename__ = "scan_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    scanned_until = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class DeadlineNotice(Base):
+    """The date a scanner last notified about for a row, so edits that keep the date don't notify again"""
+    __tablename__ = "deadline_notices"
+
+    scanner = Column(String(50), primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    notified_date = Column(DateTime, nullable=False)  # The due date or deadline the notification was about
+    notified_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Boolean
+from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -6,13 +6,17 @@ from ..core.database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Serves keyset pagination of the user's rows, newest first
+        Index("ix_tasks_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
     status = Column(String(20), default="pending", nullable=False)  # pending, in_progress, completed
     priority = Column(String(10), default="medium", nullable=False)  # low, medium, high
-    due_date = Column(DateTime, nullable=True)
+    due_date = Column(DateTime, nullable=True, index=True)
     estimated_hours = Column(Integer, nullable=True)
     actual_hours = Column(Integer, default=0, nullable=False)
     time_tracked = Column(Integer, default=0, nullable=False)  # In seconds
@@ -22,7 +26,7 @@ class Task(Base):
     milestone_id = Column(Integer, ForeignKey("milestones.id"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True)
 
     # Relationships
     user = relationship("User", back_populates="tasks")
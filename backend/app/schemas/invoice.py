@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
@@ -30,7 +30,6 @@ class InvoiceItemResponse(InvoiceItemBase):
         from_attributes = True
 
 class InvoiceBase(BaseModel):
-    invoice_number: str
     title: Optional[str] = None
     description: Optional[str] = None
     client_id: Optional[int] = None
@@ -52,8 +51,16 @@ class InvoiceBase(BaseModel):
     recurring_frequency: Optional[str] = None
 
 class InvoiceCreate(InvoiceBase):
+    # invoice_number is assigned from the user's sequence; one sent by the client is ignored
     items: List[InvoiceItemCreate] = []
 
+class InvoiceBulkCreate(BaseModel):
+    invoices: List[InvoiceCreate] = Field(..., min_length=1, max_length=500)
+
+class InvoiceBulkResponse(BaseModel):
+    ids: List[int]
+    invoice_numbers: List[str]
+
 class InvoiceUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -77,6 +84,7 @@ class InvoiceUpdate(BaseModel):
 
 class InvoiceResponse(InvoiceBase):
     id: int
+    invoice_number: str
     user_id: int
     sent_date: Optional[datetime] = None
     paid_date: Optional[datetime] = None
@@ -100,3 +108,5 @@ class InvoiceStatsResponse(BaseModel):
     pending_amount: Decimal
     overdue_amount: Decimal
     draft_amount: Decimal
+    currency: Optional[str] = None
+    missing_rates: List[str] = []  # Currencies left out of the totals for lack of an exchange rate
@@ -1,6 +1,53 @@
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import Optional, List, Dict, Any, Type, TypeVar
 from datetime import datetime
+import json
+
+TASK_PRIORITIES = ("low", "medium", "high")
+
+class TemplateTask(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    description: Optional[str] = ""
+    priority: str = "medium"
+
+    @validator('priority')
+    def validate_priority(cls, v):
+        if v not in TASK_PRIORITIES:
+            raise ValueError(f"Priority must be one of: {', '.join(TASK_PRIORITIES)}")
+        return v
+
+class TemplateMilestone(BaseModel):
+    title: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = ""
+    days_from_start: int = Field(0, ge=0)
+
+TemplateItem = TypeVar("TemplateItem", TemplateTask, TemplateMilestone)
+
+def parse_template_items(value: Any, item_type: Type[TemplateItem]) -> List[TemplateItem]:
+    """Validate a template's task or milestone list, given as JSON text or already decoded"""
+    if value is None or value == "":
+        return []
+    try:
+        items = json.loads(value) if isinstance(value, str) else value
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise ValueError("Must be a JSON array")
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append(item_type.model_validate(item))
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error["loc"])
+            raise ValueError(f"Item {index}{f' ({location})' if location else ''}: {error['msg']}")
+    return parsed
+
+def _normalized_items(value: Any, item_type: Type[TemplateItem]) -> Optional[str]:
+    """Validated items re-serialized, so stored templates always parse"""
+    if value is None:
+        return None
+    return json.dumps([item.model_dump() for item in parse_template_items(value, item_type)])
 
 class ProjectTemplateBase(BaseModel):
     name: str
@@ -10,13 +57,19 @@ class ProjectTemplateBase(BaseModel):
     default_currency: str = "USD"
     default_duration_days: Optional[int] = None
     default_hourly_rate: Optional[int] = None
-    default_tasks: Optional[str] = None  # JSON string
-    default_milestones: Optional[str] = None  # JSON string
+    default_tasks: Optional[str] = None  # JSON array of TemplateTask (a decoded array is accepted on input)
+    default_milestones: Optional[str] = None  # JSON array of TemplateMilestone (likewise)
     default_phases: Optional[str] = None  # JSON string
     is_public: bool = False
 
 class ProjectTemplateCreate(ProjectTemplateBase):
-    pass
+    @validator('default_tasks', pre=True)
+    def validate_default_tasks(cls, v):
+        return _normalized_items(v, TemplateTask)
+    
+    @validator('default_milestones', pre=True)
+    def validate_default_milestones(cls, v):
+        return _normalized_items(v, TemplateMilestone)
 
 class ProjectTemplateUpdate(BaseModel):
     name: Optional[str] = None
@@ -30,6 +83,14 @@ class ProjectTemplateUpdate(BaseModel):
     default_milestones: Optional[str] = None
     default_phases: Optional[str] = None
     is_public: Optional[bool] = None
+    
+    @validator('default_tasks', pre=True)
+    def validate_default_tasks(cls, v):
+        return _normalized_items(v, TemplateTask)
+    
+    @validator('default_milestones', pre=True)
+    def validate_default_milestones(cls, v):
+        return _normalized_items(v, TemplateMilestone)
 
 class ProjectTemplateResponse(ProjectTemplateBase):
     id: int
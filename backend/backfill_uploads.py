@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Move files uploaded before the blob store into it
+
+Files under uploads/{user_id}/ (resume/, documents/ and loose files) get a
+blob, a files row and a storage_usage charge, and are removed from uploads/
+once recorded. Safe to re-run.
+
+Usage: python backfill_uploads.py [uploads_dir]
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine, Base
+from app.core.storage import backfill_legacy_uploads
+import app.models  # noqa: F401 - registers the tables for create_all
+
+def main():
+    parser = argparse.ArgumentParser(description="Move files uploaded before the blob store into it")
+    parser.add_argument("uploads_dir", nargs="?", default="uploads", help="Old uploads directory (default: uploads)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.uploads_dir):
+        print(f"Nothing to do: {args.uploads_dir} does not exist")
+        return
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        recorded = backfill_legacy_uploads(db, args.uploads_dir)
+        print(f"Recorded {recorded} uploaded files")
+    except Exception as e:
+        print(f"Error backfilling uploads: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
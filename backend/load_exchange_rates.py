@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Load exchange rates from a CSV file
+
+The CSV needs date,currency,rate columns (an optional base column must match
+CURRENCY_RATE_BASE). Rates are units of the currency per one unit of the base
+currency; loading a date again overwrites it.
+
+Usage: python load_exchange_rates.py rates.csv
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, engine
+from app.core.currency import load_rates, parse_rates_csv
+from app.models.exchange_rate import ExchangeRate
+
+def main():
+    parser = argparse.ArgumentParser(description="Load exchange rates from a CSV file")
+    parser.add_argument("csv_file", help="CSV with date,currency,rate columns")
+    args = parser.parse_args()
+
+    try:
+        with open(args.csv_file, newline="") as f:
+            rows = parse_rates_csv(f)
+    except (OSError, ValueError) as e:
+        print(f"Error reading {args.csv_file}: {e}")
+        sys.exit(1)
+
+    ExchangeRate.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        loaded = load_rates(db, rows)
+        print(f"Loaded {loaded} exchange rates")
+    except Exception as e:
+        print(f"Error loading exchange rates: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
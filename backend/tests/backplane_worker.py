@@ -0,0 +1,30 @@
+"""One worker process on a shared Redis backplane, driven over stdin/stdout by test_backplane.py
+
+Usage: python -m tests.backplane_worker REDIS_URL CHANNEL
+Prints "ready" once subscribed and "received <user_id> <text>" per delivered
+message; reads "publish <user_id> <text>" and "quit" lines.
+"""
+import asyncio
+import sys
+
+from app.core.backplane import RedisBackplane
+
+async def main(url: str, channel: str):
+    backplane = RedisBackplane(url, channel)
+
+    async def deliver(user_id: int, message: dict):
+        print(f"received {user_id} {message['text']}", flush=True)
+
+    await backplane.start(deliver)
+    print("ready", flush=True)
+    loop = asyncio.get_running_loop()
+    while True:
+        line = (await loop.run_in_executor(None, sys.stdin.readline)).split()
+        if not line or line[0] == "quit":
+            break
+        if line[0] == "publish":
+            backplane.publish(int(line[1]), {"text": line[2]})
+    await backplane.stop()
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1], sys.argv[2]))
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import uuid
+
+# Point the app at a throwaway database and cache before it is imported
+_workdir = tempfile.mkdtemp(prefix="quickbird-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_workdir}/test.db"
+os.environ["INVOICE_PDF_CACHE_DIR"] = os.path.join(_workdir, "invoice_pdfs")
+os.environ["STORAGE_LOCAL_ROOT"] = os.path.join(_workdir, "storage")
+os.environ["STRIPE_WEBHOOK_SECRET"] = "whsec_test"
+# Tests run the webhook inbox themselves rather than racing the background job
+os.environ["STRIPE_EVENT_POLL_SECONDS"] = "3600"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core.database import SessionLocal
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def user(client):
+    """A freshly registered user: its id and auth headers"""
+    name = f"user{uuid.uuid4().hex[:12]}"
+    response = client.post("/api/v1/auth/register", json={
+        "email": f"{name}@example.com",
+        "username": name,
+        "password": "Secret123!",
+        "full_name": name
+    })
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    me = client.get("/api/v1/auth/me", headers=headers)
+    assert me.status_code == 200, me.text
+    return {"id": me.json()["id"], "headers": headers}
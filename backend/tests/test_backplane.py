@@ -0,0 +1,141 @@
+import asyncio
+import os
+import queue
+import socket
+import subprocess
+import sys
+import threading
+import types
+import uuid
+
+import pytest
+
+from app.core.backplane import PostgresBackplane
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def redis_url():
+    """TEST_REDIS_URL if set, else a fakeredis server on a local TCP port"""
+    if os.getenv("TEST_REDIS_URL"):
+        yield os.environ["TEST_REDIS_URL"]
+        return
+    fakeredis = pytest.importorskip("fakeredis")
+    if not hasattr(fakeredis, "TcpFakeServer"):
+        pytest.skip("fakeredis without TcpFakeServer")
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = fakeredis.TcpFakeServer(("127.0.0.1", port), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{port}"
+    server.shutdown()
+    server.server_close()
+
+class Worker:
+    """A backplane worker in its own process"""
+
+    def __init__(self, url: str, channel: str):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "tests.backplane_worker", url, channel],
+            cwd=BACKEND_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        self.lines: "queue.Queue[str]" = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.lines.put(line.strip())
+
+    def expect(self, expected: str, timeout: float = 15):
+        while True:
+            try:
+                line = self.lines.get(timeout=timeout)
+            except queue.Empty:
+                raise AssertionError(f"Worker never printed {expected!r}")
+            if line == expected:
+                return
+
+    def send(self, command: str):
+        self.process.stdin.write(command + "\n")
+        self.process.stdin.flush()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.send("quit")
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+def test_redis_backplane_fans_out_across_processes(redis_url):
+    pytest.importorskip("redis")
+    channel = f"test_{uuid.uuid4().hex}"
+    first, second = Worker(redis_url, channel), Worker(redis_url, channel)
+    try:
+        first.expect("ready")
+        second.expect("ready")
+
+        first.send("publish 7 hello")
+        second.expect("received 7 hello")
+        first.expect("received 7 hello")
+
+        second.send("publish 8 back")
+        first.expect("received 8 back")
+    finally:
+        first.close()
+        second.close()
+
+class _Connection:
+    """psycopg2 connection that accepts LISTEN and then drops"""
+    autocommit = False
+    notifies: list = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement):
+        pass
+
+    def fileno(self):
+        raise OSError("server closed the connection unexpectedly")
+
+    def close(self):
+        pass
+
+def test_postgres_listener_reconnects_with_backoff(monkeypatch):
+    attempts = []
+
+    def connect(dsn):
+        attempts.append(dsn)
+        if len(attempts) <= 2:
+            raise OSError("connection refused")
+        return _Connection()
+
+    monkeypatch.setitem(sys.modules, "psycopg2", types.SimpleNamespace(connect=connect))
+    monkeypatch.setattr(PostgresBackplane, "RECONNECT_DELAY", 0.05)
+    delays = []
+    backplane = PostgresBackplane("test")
+    wait = backplane._stopping.wait
+    monkeypatch.setattr(backplane._stopping, "wait", lambda delay: delays.append(delay) or wait(delay))
+
+    async def run():
+        async def deliver(user_id, message):
+            pass
+        await backplane.start(deliver)
+        await asyncio.sleep(0.5)
+        await backplane.stop()
+
+    asyncio.run(run())
+
+    # Two refused connects back off 0.05s then 0.1s; a connection that got as far as LISTEN resets the delay
+    assert len(attempts) >= 4
+    assert delays[:4] == [0.05, 0.1, 0.05, 0.05]
+    assert backplane._listener is None
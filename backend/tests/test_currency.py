@@ -0,0 +1,26 @@
+from datetime import date
+from decimal import Decimal
+
+from app.core.currency import load_rates
+from app.models.invoice import Invoice
+
+def _invoice(user_id: int, number: str, amount: str, currency: str) -> Invoice:
+    return Invoice(invoice_number=number, client_name="Acme", client_email="billing@acme.example",
+                   total_amount=Decimal(amount), currency=currency, status="paid", user_id=user_id)
+
+def test_invoices_without_a_rate_are_left_out_of_converted_totals(client, user, db):
+    load_rates(db, [{"currency": "EUR", "rate_date": date(2020, 1, 1), "rate": Decimal("0.5")}])
+    db.add_all([
+        _invoice(user["id"], f"FX-{user['id']}-1", "100.00", "USD"),
+        _invoice(user["id"], f"FX-{user['id']}-2", "40.00", "EUR"),
+        _invoice(user["id"], f"FX-{user['id']}-3", "50.00", "GBP"),
+    ])
+    db.commit()
+
+    response = client.get("/api/v1/invoices/stats/summary", params={"currency": "USD"}, headers=user["headers"])
+
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    assert Decimal(stats["total_amount"]) == Decimal("180")
+    assert Decimal(stats["paid_amount"]) == Decimal("180")
+    assert stats["missing_rates"] == ["GBP"]
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from app.core.deadlines import scan
+from app.models.notification import Notification
+from app.models.task import Task
+
+def _overdue_notices(db, task_id: int):
+    return db.query(Notification).filter(
+        Notification.related_entity_type == "task",
+        Notification.related_entity_id == task_id
+    ).all()
+
+def _read_all(db, task_id: int):
+    db.query(Notification).filter(Notification.related_entity_id == task_id).update(
+        {Notification.is_read: True}, synchronize_session=False
+    )
+    db.commit()
+
+def test_editing_an_overdue_task_notifies_only_when_its_due_date_changes(client, user, db):
+    task = Task(title="File taxes", due_date=datetime.utcnow() - timedelta(days=30), user_id=user["id"])
+    db.add(task)
+    db.commit()
+
+    # Created with a date the window has already passed
+    scan(db, "task_overdue", datetime.utcnow())
+    assert len(_overdue_notices(db, task.id)) == 1
+    # Read notifications are outside the pipeline's dedupe, so only the scanner can hold back a repeat
+    _read_all(db, task.id)
+
+    task.title = "File taxes (again)"
+    task.time_tracked = 600
+    db.commit()
+    scan(db, "task_overdue", datetime.utcnow())
+    assert len(_overdue_notices(db, task.id)) == 1
+
+    task.due_date = datetime.utcnow() - timedelta(days=20)
+    db.commit()
+    scan(db, "task_overdue", datetime.utcnow())
+    assert len(_overdue_notices(db, task.id)) == 2
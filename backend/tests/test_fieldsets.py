@@ -0,0 +1,85 @@
+from decimal import Decimal
+import time
+
+from sqlalchemy import event, insert
+
+from app.core.database import engine
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.models.invoice import Invoice, InvoiceItem
+from app.models.work_log import WorkLog
+
+def _seed(db, user_id: int, count: int):
+    invoice_ids = db.execute(insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True), [
+        {"invoice_number": f"FS-{user_id}-{i}", "client_name": "Acme", "client_email": "billing@acme.example",
+         "notes": "Payment terms apply. " * 20, "total_amount": Decimal("1234.50"), "user_id": user_id}
+        for i in range(count)
+    ]).scalars().all()
+    db.execute(insert(InvoiceItem), [
+        {"invoice_id": invoice_id, "description": f"Line {n}", "quantity": 1, "unit_price": 10, "total_price": 10}
+        for invoice_id in invoice_ids for n in range(5)
+    ])
+    db.execute(insert(WorkLog), [
+        {"title": f"Log {i}", "hours_worked": Decimal("1.50"), "ai_explanation": "Generated summary. " * 100,
+         "user_id": user_id}
+        for i in range(count)
+    ])
+    db.commit()
+
+def _get(client, headers, path, params):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        started = time.perf_counter()
+        response = client.get(path, headers=headers, params=params)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 200, response.text
+    return response, statements, elapsed
+
+def test_sparse_invoice_list_selects_and_returns_only_the_requested_columns(client, user, db):
+    _seed(db, user["id"], 3)
+    full, _, _ = _get(client, user["headers"], "/api/v1/invoices/", {})
+    sparse, statements, _ = _get(client, user["headers"], "/api/v1/invoices/",
+                                 {"fields": "invoice_number,total_amount", "cursor": "", "limit": 2})
+
+    assert [set(row) for row in sparse.json()] == [{"id", "invoice_number", "total_amount"}] * 2
+    assert NEXT_CURSOR_HEADER in sparse.headers
+    # Values serialize exactly as in the full response
+    by_id = {row["id"]: row for row in full.json()}
+    for row in sparse.json():
+        assert row["total_amount"] == by_id[row["id"]]["total_amount"]
+        assert row["invoice_number"] == by_id[row["id"]]["invoice_number"]
+
+    invoice_selects = [statement for statement in statements if "FROM invoices" in statement]
+    assert len(invoice_selects) == 1
+    assert "invoices.notes" not in invoice_selects[0]
+    assert not any("FROM invoice_items" in statement for statement in statements)
+
+def test_fields_outside_the_response_columns_are_rejected(client, user):
+    for fields in ("items", "user", "invoice_number,nope"):
+        response = client.get("/api/v1/invoices/", headers=user["headers"], params={"fields": fields})
+        assert response.status_code == 400, fields
+
+def test_sparse_work_log_list_never_reads_the_ai_explanation(client, user, db):
+    _seed(db, user["id"], 2)
+    sparse, statements, _ = _get(client, user["headers"], "/api/v1/work-logs/", {"fields": "title,hours_worked"})
+    assert [set(row) for row in sparse.json()] == [{"id", "title", "hours_worked"}] * 2
+    assert not any("ai_explanation" in statement for statement in statements if "FROM work_logs" in statement)
+
+def test_payload_and_latency_benchmark(client, user, db):
+    _seed(db, user["id"], 500)
+    lists = [
+        ("/api/v1/invoices/", "invoice_number,client_name,total_amount,status"),
+        ("/api/v1/work-logs/", "title,hours_worked,status"),
+    ]
+    for path, fields in lists:
+        full, _, full_seconds = _get(client, user["headers"], path, {"limit": 500})
+        sparse, _, sparse_seconds = _get(client, user["headers"], path, {"limit": 500, "fields": fields})
+        assert len(full.json()) == len(sparse.json()) == 500
+        assert len(sparse.content) * 4 < len(full.content)
+        print(
+            f"\n{path}: full {len(full.content) / 1024:.0f}KiB in {full_seconds * 1000:.1f}ms, "
+            f"?fields= {len(sparse.content) / 1024:.0f}KiB in {sparse_seconds * 1000:.1f}ms"
+        )
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.models.invoice import Invoice, InvoiceSequence
+
+def _create_invoice(client, headers):
+    response = client.post("/api/v1/invoices/", headers=headers, json={
+        "client_name": "Acme",
+        "client_email": "billing@acme.example",
+        "items": []
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["invoice_number"]
+
+def test_parallel_creates_get_distinct_consecutive_numbers(client, user):
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        numbers = list(executor.map(lambda _: _create_invoice(client, user["headers"]), range(40)))
+
+    expected = [f"INV-{user['id']:04d}-{seq:04d}" for seq in range(1, 41)]
+    assert sorted(numbers) == expected
+
+def test_sequence_continues_after_deleted_invoices(client, user, db):
+    # Invoices numbered before sequences existed, with one since deleted
+    db.add_all([
+        Invoice(invoice_number=f"INV-{user['id']:04d}-{seq:04d}", client_name="Acme",
+                client_email="billing@acme.example", user_id=user["id"])
+        for seq in (1, 3)
+    ])
+    db.commit()
+    assert db.query(InvoiceSequence).filter(InvoiceSequence.user_id == user["id"]).count() == 0
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        numbers = list(executor.map(lambda _: _create_invoice(client, user["headers"]), range(4)))
+
+    assert sorted(numbers) == [f"INV-{user['id']:04d}-{seq:04d}" for seq in range(4, 8)]
+
+def test_client_supplied_number_is_optional_and_ignored(client, user):
+    payload = {"client_name": "Acme", "client_email": "billing@acme.example"}
+    first = client.post("/api/v1/invoices/", headers=user["headers"], json=payload)
+    second = client.post("/api/v1/invoices/", headers=user["headers"], json={**payload, "invoice_number": "MINE-1"})
+    assert first.status_code == 200 and second.status_code == 200
+    assert [first.json()["invoice_number"], second.json()["invoice_number"]] == [
+        f"INV-{user['id']:04d}-0001", f"INV-{user['id']:04d}-0002"
+    ]
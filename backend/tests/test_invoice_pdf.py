@@ -0,0 +1,42 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.core.invoice_pdf import get_invoice_pdf, invoice_document, prune_invoice_pdf_cache, render_invoice_pdf
+
+def _invoice(invoice_id: int, total: str, notes: str = None):
+    item = SimpleNamespace(id=1, description="Design work", quantity=Decimal("1"),
+                           unit_price=Decimal(total), total_price=Decimal(total))
+    return SimpleNamespace(
+        id=invoice_id, invoice_number=f"INV-PDF-{invoice_id}", title=None, status="draft",
+        sent_date=None, created_at=datetime(2026, 1, 5), due_date=None,
+        client_name="Acme", client_email="billing@acme.example", client_address=None, project_title=None,
+        currency="EUR", items=[item], subtotal=Decimal(total), tax_rate=Decimal("0"), tax_amount=Decimal("0"),
+        total_amount=Decimal(total), notes=notes, terms=None
+    )
+
+USER = SimpleNamespace(full_name="Jo Smith", username="jo", email="jo@example.com")
+
+def test_euro_sign_is_written_in_the_fonts_encoding():
+    pdf = render_invoice_pdf(invoice_document(_invoice(1, "10.00", notes="Paid in € only"), USER))
+    assert b"Paid in \x80 only" in pdf
+
+def test_superseded_renders_outlive_the_request_that_replaced_them(client):
+    invoice_id = 900000 + os.getpid() % 1000
+    old_path, _ = asyncio.run(get_invoice_pdf(_invoice(invoice_id, "10.00"), USER))
+    new_path, _ = asyncio.run(get_invoice_pdf(_invoice(invoice_id, "12.00"), USER))
+
+    # A request that was handed the old path can still read it
+    assert old_path != new_path
+    assert os.path.exists(old_path) and os.path.exists(new_path)
+
+    # Once the grace period has passed only the newest render is kept
+    assert prune_invoice_pdf_cache(time.time() + 2 * 3600) == 1
+    assert not os.path.exists(old_path) and os.path.exists(new_path)
+
+    # And it goes too once nobody has asked for it in a long time
+    assert prune_invoice_pdf_cache(time.time() + 30 * 86400) == 1
+    assert not os.path.exists(os.path.dirname(new_path))
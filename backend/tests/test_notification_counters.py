@@ -0,0 +1,47 @@
+from app.core.notifications import RECONCILE_LEASE, reconcile_all_counters, reconcile_counters
+from app.core.scheduler import claim_job_lease, release_job_lease
+from app.models.notification import Notification, NotificationCounter
+from app.schemas.notification import NotificationPriority
+
+def _counter(db, user_id):
+    db.expire_all()
+    counter = db.get(NotificationCounter, user_id)
+    return (counter.total, counter.unread, counter.high_priority_unread)
+
+def test_reconcile_recomputes_counts_in_place(client, user, db):
+    db.add_all([
+        Notification(title="a", message="a", user_id=user["id"]),
+        Notification(title="b", message="b", user_id=user["id"], priority=NotificationPriority.URGENT),
+        Notification(title="c", message="c", user_id=user["id"], is_read=True),
+        Notification(title="d", message="d", user_id=user["id"], is_archived=True),
+    ])
+    db.commit()
+
+    reconcile_counters(db, [user["id"]])
+    assert _counter(db, user["id"]) == (3, 2, 1)
+
+    db.query(NotificationCounter).filter(NotificationCounter.user_id == user["id"]).update({"unread": 40})
+    db.commit()
+    reconcile_counters(db)
+    assert _counter(db, user["id"]) == (3, 2, 1)
+
+    db.query(Notification).filter(Notification.user_id == user["id"]).update({"is_archived": True})
+    db.commit()
+    reconcile_counters(db, [user["id"]])
+    assert _counter(db, user["id"]) == (0, 0, 0)
+
+def test_reconcile_job_skips_the_run_while_another_worker_holds_the_lease(client, user, db):
+    db.add(Notification(title="a", message="a", user_id=user["id"]))
+    db.commit()
+    reconcile_counters(db, [user["id"]])
+    db.query(NotificationCounter).filter(NotificationCounter.user_id == user["id"]).update({"total": 99})
+    db.commit()
+
+    token = claim_job_lease(db, "notification_counters", RECONCILE_LEASE)
+    assert token is not None
+    reconcile_all_counters()
+    assert _counter(db, user["id"])[0] == 99
+
+    release_job_lease(db, "notification_counters", token)
+    reconcile_all_counters()
+    assert _counter(db, user["id"]) == (1, 1, 0)
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+import time
+
+from fastapi import Response
+from sqlalchemy import event, insert, text
+
+from app.core.database import engine
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, paginate
+from app.models.client import Client
+
+TIED_AT = datetime(2026, 1, 1, 12, 0, 0)
+
+def _walk(client, headers, limit: int, between_pages=None):
+    """Follow next-cursor links from the first page; returns the ids in the order served"""
+    ids, cursor, pages = [], "", 0
+    while cursor is not None:
+        response = client.get("/api/v1/clients/", headers=headers, params={"cursor": cursor, "limit": limit})
+        assert response.status_code == 200, response.text
+        ids += [row["id"] for row in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        pages += 1
+        if between_pages:
+            between_pages(pages)
+    return ids
+
+def test_cursor_walk_over_tied_timestamps_returns_every_row_once(client, user, db):
+    # Rows sharing created_at, written both ways SQLite stores timestamps:
+    # Python-side with microseconds and server-side as "YYYY-MM-DD HH:MM:SS"
+    db.execute(insert(Client), [
+        {"name": f"Python {i}", "email": "a@example.com", "user_id": user["id"], "created_at": TIED_AT}
+        for i in range(10)
+    ])
+    for i in range(10):
+        db.execute(text(
+            "INSERT INTO clients (name, email, user_id, is_active, created_at) "
+            "VALUES (:name, 'a@example.com', :user_id, 1, :created_at)"
+        ), {"name": f"Server {i}", "user_id": user["id"], "created_at": TIED_AT.strftime("%Y-%m-%d %H:%M:%S")})
+    db.execute(insert(Client), [
+        {"name": "Older", "email": "a@example.com", "user_id": user["id"], "created_at": TIED_AT - timedelta(seconds=1)},
+        {"name": "Newer", "email": "a@example.com", "user_id": user["id"], "created_at": TIED_AT + timedelta(microseconds=5)},
+    ])
+    db.commit()
+    expected = [row.id for row in db.query(Client.id).filter(Client.user_id == user["id"]).order_by(
+        Client.created_at.desc(), Client.id.desc()
+    )]
+    assert len(expected) == 22
+
+    for limit in (1, 3, 7, 50):
+        assert _walk(client, user["headers"], limit) == expected
+
+def test_rows_inserted_mid_walk_do_not_shift_later_pages(client, user, db):
+    db.execute(insert(Client), [
+        {"name": f"Client {i}", "email": "a@example.com", "user_id": user["id"], "created_at": TIED_AT + timedelta(minutes=i)}
+        for i in range(20)
+    ])
+    db.commit()
+    expected = _walk(client, user["headers"], 5)
+
+    def insert_newer(page):
+        db.add(Client(name=f"Late {page}", email="a@example.com", user_id=user["id"]))
+        db.commit()
+
+    assert _walk(client, user["headers"], 5, between_pages=insert_newer) == expected
+
+def test_deep_page_benchmark(client, user, db):
+    rows, limit, page = 50000, 100, 500
+    start = TIED_AT - timedelta(days=1)
+    db.execute(insert(Client), [
+        {"name": f"Client {i}", "email": "a@example.com", "user_id": user["id"], "created_at": start + timedelta(seconds=i // 3)}
+        for i in range(rows)
+    ])
+    db.commit()
+    ordered = db.query(Client.id, Client.created_at).filter(Client.user_id == user["id"]).order_by(
+        Client.created_at.desc(), Client.id.desc()
+    ).all()
+    # The cursor a client would hold after reading page 499
+    before = ordered[limit * (page - 1) - 1]
+    cursor = encode_cursor(before.created_at, before.id)
+
+    def timed(**kwargs):
+        query = db.query(Client).filter(Client.user_id == user["id"]).order_by(Client.created_at.desc(), Client.id.desc())
+        started = time.perf_counter()
+        for _ in range(10):
+            page_rows = paginate(query, Client, Response(), limit=limit, **kwargs)
+        return [row.id for row in page_rows], (time.perf_counter() - started) / 10
+
+    by_cursor, cursor_seconds = timed(cursor=cursor)
+    by_offset, offset_seconds = timed(skip=limit * (page - 1))
+
+    assert by_cursor == by_offset == [row.id for row in ordered[limit * (page - 1):limit * page]]
+
+    # The cursor position must be a range seek on the index, not a filter over the user's newer rows
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        paginate(db.query(Client).filter(Client.user_id == user["id"]), Client, Response(), limit=limit, cursor=cursor)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    statement, parameters = statements[-1]
+    plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    assert any("created_at<?" in row[-1].replace(" ", "") for row in plan), plan
+    print(f"\npage {page} of {rows} rows: cursor {cursor_seconds * 1000:.2f}ms, offset {offset_seconds * 1000:.2f}ms")
@@ -0,0 +1,53 @@
+import json
+import time
+
+from sqlalchemy import event
+
+from app.core import project_templates
+from app.core.database import engine
+from app.models.project_template import ProjectTemplate
+from app.models.task import Task
+
+TASK_COUNT = 500
+
+def _create_template(client, headers) -> int:
+    response = client.post("/api/v1/project-templates/", headers=headers, json={
+        "name": "Large build",
+        "default_tasks": json.dumps([{"title": f"Task {i}", "priority": "high"} for i in range(TASK_COUNT)]),
+        "default_milestones": json.dumps([{"title": f"Milestone {i}", "days_from_start": i} for i in range(20)])
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+def _create_project(client, headers, template_id: int) -> int:
+    response = client.post(f"/api/v1/project-templates/{template_id}/create-project", headers=headers, json={
+        "template_id": template_id,
+        "project_name": "From template"
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["project_id"]
+
+def test_instantiating_a_500_task_template_is_batched_and_parsed_once(client, user, db, monkeypatch):
+    template_id = _create_template(client, user["headers"])
+
+    parses = []
+    parse = project_templates.parse_template_items
+    monkeypatch.setattr(project_templates, "parse_template_items", lambda *args: parses.append(args) or parse(*args))
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        started = time.perf_counter()
+        project_ids = [_create_project(client, user["headers"], template_id) for _ in range(3)]
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    for project_id in project_ids:
+        assert db.query(Task).filter(Task.project_id == project_id).count() == TASK_COUNT
+    # Tasks and milestones go in as one executemany each, not a statement per row
+    assert len(statements) < 30 * len(project_ids)
+    # Bumping usage_count must not change updated_at, the structure cache's version key
+    assert len(parses) == 2
+    assert db.get(ProjectTemplate, template_id).usage_count == 3
+    print(f"\n{len(project_ids)} projects of {TASK_COUNT} tasks in {elapsed:.3f}s, {len(statements)} statements")
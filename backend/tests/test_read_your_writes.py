@@ -0,0 +1,36 @@
+import itertools
+
+from sqlalchemy import create_engine, event
+
+from app.core import database
+from app.core.database import LAST_WRITE_COOKIE
+
+def test_reads_after_a_write_stay_on_the_primary_on_any_worker(client, user, monkeypatch):
+    replica = create_engine(database.database_url, connect_args={"check_same_thread": False})
+    replica_queries = []
+    event.listen(replica, "before_cursor_execute", lambda *args: replica_queries.append(args[2]))
+    monkeypatch.setattr(database, "_replica_cycle", itertools.cycle([replica]))
+
+    response = client.post("/api/v1/clients/", headers=user["headers"], json={
+        "name": "Acme", "email": "billing@acme.example"
+    })
+    assert response.status_code == 200, response.text
+    cookie = response.cookies.get(LAST_WRITE_COOKIE)
+    assert cookie
+
+    # The next request lands on a worker that didn't see the write
+    database.read_your_writes.last_write.clear()
+    client.cookies.clear()
+    client.cookies.set(LAST_WRITE_COOKIE, cookie)
+    assert client.get("/api/v1/clients/", headers=user["headers"]).status_code == 200
+    assert replica_queries == []
+
+    client.cookies.clear()
+    assert client.get("/api/v1/clients/", headers=user["headers"]).status_code == 200
+    assert replica_queries
+
+def test_forged_last_write_cookie_is_ignored():
+    cookie = database.last_write_cookie(1700000000.0)
+    assert database.parse_last_write_cookie(cookie) == 1700000000.0
+    assert database.parse_last_write_cookie(cookie[:-1] + ("0" if cookie[-1] != "0" else "1")) is None
+    assert database.parse_last_write_cookie("1700000000.000") is None
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import time
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.recurring import generate_invoices, run_recurring_invoices
+from app.models.client import Client
+from app.models.invoice import Invoice
+from app.models.project import Project
+from app.models.recurring_invoice import RecurringInvoice, RecurringInvoiceRun
+from app.schemas.recurring_invoice import RecurringFrequency
+
+NOW = datetime(2026, 6, 15, 9, 0)
+
+def _client(db, user_id: int) -> Client:
+    client = Client(name="Acme", email="billing@acme.example", user_id=user_id)
+    db.add(client)
+    db.commit()
+    return client
+
+def _schedule(db, user_id: int, client_id: int, start: datetime, **kwargs) -> RecurringInvoice:
+    schedule = RecurringInvoice(
+        title="Retainer", client_id=client_id, subtotal=Decimal("100.00"), total_amount=Decimal("100.00"),
+        frequency=RecurringFrequency.MONTHLY, start_date=start, next_invoice_date=start, user_id=user_id, **kwargs
+    )
+    db.add(schedule)
+    db.commit()
+    return schedule
+
+def _invoices(db, schedule_id: int):
+    return db.query(Invoice).join(RecurringInvoiceRun, RecurringInvoiceRun.invoice_id == Invoice.id).filter(
+        RecurringInvoiceRun.recurring_invoice_id == schedule_id
+    ).order_by(Invoice.due_date).all()
+
+def test_generated_invoices_bill_in_the_project_currency(client, user, db):
+    acme = _client(db, user["id"])
+    project = Project(title="Euro work", currency="EUR", user_id=user["id"])
+    db.add(project)
+    db.commit()
+    with_project = _schedule(db, user["id"], acme.id, NOW, project_id=project.id)
+    without_project = _schedule(db, user["id"], acme.id, NOW)
+
+    generate_invoices(db, [with_project, without_project], NOW)
+    db.commit()
+
+    assert [invoice.currency for invoice in _invoices(db, with_project.id)] == ["EUR"]
+    assert [invoice.currency for invoice in _invoices(db, without_project.id)] == [settings.DEFAULT_CURRENCY]
+
+def test_only_one_worker_claims_an_occurrence(client, user, db):
+    schedule_id = _schedule(db, user["id"], _client(db, user["id"]).id, NOW).id
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        # Both workers read the schedule before either advances it
+        first_schedule = first.get(RecurringInvoice, schedule_id)
+        second_schedule = second.get(RecurringInvoice, schedule_id)
+        second.commit()
+
+        assert len(generate_invoices(first, [first_schedule], NOW)) == 1
+        first.commit()
+        assert generate_invoices(second, [second_schedule], NOW) == []
+        second.commit()
+    finally:
+        first.close()
+        second.close()
+
+    assert len(_invoices(db, schedule_id)) == 1
+
+def test_catches_up_after_downtime_without_duplicates(client, user, db):
+    schedule = _schedule(db, user["id"], _client(db, user["id"]).id, NOW - timedelta(days=95))
+
+    run_recurring_invoices(NOW)
+    run_recurring_invoices(NOW)
+    db.expire_all()
+
+    # Missed months are billed once each, and the schedule points at the next one
+    titles = [invoice.title for invoice in _invoices(db, schedule.id)]
+    assert titles == [f"Retainer - {day}" for day in ("2026-03-12", "2026-04-12", "2026-05-12", "2026-06-12")]
+    assert db.get(RecurringInvoice, schedule.id).next_invoice_date.replace(tzinfo=None) == datetime(2026, 7, 12, 9, 0)
+
+    # Moving the schedule back does not bill an occurrence twice
+    db.get(RecurringInvoice, schedule.id).next_invoice_date = datetime(2026, 5, 12, 9, 0)
+    db.commit()
+    run_recurring_invoices(NOW)
+    db.expire_all()
+    assert len(_invoices(db, schedule.id)) == 4
+
+def test_run_key_rejects_a_second_invoice_for_an_occurrence(client, user, db):
+    schedule = _schedule(db, user["id"], _client(db, user["id"]).id, NOW)
+    db.add(RecurringInvoiceRun(recurring_invoice_id=schedule.id, scheduled_for=NOW))
+    db.commit()
+    db.add(RecurringInvoiceRun(recurring_invoice_id=schedule.id, scheduled_for=NOW))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+def test_100k_schedules_benchmark(client, user, db):
+    count = 100_000
+    client_id = _client(db, user["id"]).id
+    start = datetime(2026, 1, 1)
+    # Spread over the year, so a scan in mid-June finds a bit under half of them due
+    db.execute(insert(RecurringInvoice), [
+        {"title": f"Plan {i}", "client_id": client_id, "subtotal": Decimal("10.00"), "total_amount": Decimal("10.00"),
+         "frequency": RecurringFrequency.YEARLY, "start_date": start + timedelta(minutes=5 * i),
+         "next_invoice_date": start + timedelta(minutes=5 * i), "user_id": user["id"]}
+        for i in range(count)
+    ])
+    db.commit()
+    due = db.query(RecurringInvoice).filter(
+        RecurringInvoice.user_id == user["id"], RecurringInvoice.next_invoice_date <= NOW
+    ).count()
+
+    started = time.perf_counter()
+    run_recurring_invoices(NOW)
+    elapsed = time.perf_counter() - started
+
+    generated = db.query(Invoice).filter(Invoice.user_id == user["id"]).count()
+    assert generated == due
+    assert db.query(RecurringInvoice).filter(
+        RecurringInvoice.user_id == user["id"], RecurringInvoice.next_invoice_date <= NOW
+    ).count() == 0
+    print(f"\n{count} schedules: {generated} invoices generated in {elapsed:.2f}s ({generated / elapsed:.0f}/s)")
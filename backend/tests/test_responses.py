@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from enum import Enum
+import json
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core import responses
+from app.core.responses import FastJSONResponse
+
+class Colour(str, Enum):
+    RED = "red"
+
+class Line(BaseModel):
+    amount: Decimal
+    at: datetime
+
+PAYLOAD = {
+    "decimals": [Decimal("1.50"), Decimal("3"), Decimal("1E+2"), Decimal("-0.01")],
+    "naive": datetime(2026, 1, 2, 3, 4, 5, 678901),
+    "aware": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    "day": date(2026, 2, 28),
+    "elapsed": timedelta(hours=1, seconds=30),
+    "colour": Colour.RED,
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "model": Line(amount=Decimal("9.99"), at=datetime(2026, 1, 1)),
+    "nested": {"unicode": "Café ₨", "none": None, "float": 0.1 + 0.2, 7: "int key"},
+}
+
+def _default_response(content) -> bytes:
+    """What FastAPI sends for a handler's return value without a custom response class"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+def test_renders_like_fastapis_default_encoder(monkeypatch):
+    expected = json.loads(_default_response(PAYLOAD))
+    with_orjson = FastJSONResponse(PAYLOAD).body
+    assert json.loads(with_orjson) == expected
+
+    monkeypatch.setattr(responses, "orjson", None)
+    with_stdlib = FastJSONResponse(PAYLOAD).body
+    assert json.loads(with_stdlib) == expected
+    # Either encoder produces the same bytes, so responses don't change with the install
+    assert with_stdlib == with_orjson
+
+def _portal_project_details(tasks: int) -> dict:
+    """Shaped like the client portal's project detail response"""
+    now = datetime(2026, 3, 1, 9, 30)
+    return {
+        "project": {"id": 1, "title": "Site rebuild", "budget": Decimal("25000.00"), "created_at": now.isoformat()},
+        "statistics": {"total_tasks": tasks, "task_completion_rate": 61.29032258064516, "total_hours_worked": Decimal("812.25")},
+        "tasks": [
+            {"id": i, "title": f"Task {i}", "description": "Implement the thing. " * 5, "status": "in_progress",
+             "priority": "high", "due_date": (now + timedelta(days=i % 30)).isoformat(), "time_tracked": i * 15,
+             "created_at": now.isoformat(), "updated_at": now.isoformat()}
+            for i in range(tasks)
+        ],
+        "work_logs": [
+            {"id": i, "description": "Worked on it", "start_time": now.isoformat(), "end_time": None,
+             "hours_worked": Decimal("1.75"), "task": {"id": i, "title": f"Task {i}"}}
+            for i in range(tasks)
+        ],
+    }
+
+def _monthly_time_report(projects: int) -> dict:
+    """Shaped like the monthly time report"""
+    start = date(2026, 1, 1)
+    return {
+        "year": 2026,
+        "month": 1,
+        "total_hours": Decimal("312.50"),
+        "billable_hours": Decimal("280.00"),
+        "daily_totals": {
+            (start + timedelta(days=day)).isoformat(): {
+                "total_hours": Decimal("8.25"), "billable_hours": Decimal("7.50"), "work_logs_count": 6
+            }
+            for day in range(31)
+        },
+        "project_summary": {
+            f"Project {i}": {"total_hours": Decimal("12.50"), "billable_hours": Decimal("10.00"), "days_worked": 9}
+            for i in range(projects)
+        },
+    }
+
+def _time(render, content, rounds: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        render(content)
+    return (time.perf_counter() - started) / rounds
+
+def test_large_payload_benchmark():
+    for name, content in (("portal project details", _portal_project_details(2000)),
+                          ("monthly time report", _monthly_time_report(500))):
+        assert json.loads(FastJSONResponse(content).body) == json.loads(_default_response(content))
+        fast = _time(lambda c: FastJSONResponse(c).body, content)
+        default = _time(_default_response, content)
+        assert fast < default
+        print(f"\n{name}: FastJSONResponse {fast * 1000:.2f}ms, jsonable_encoder + JSONResponse {default * 1000:.2f}ms")
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+from app.core.retention import LEASE, run_retention
+from app.core.scheduler import claim_job_lease, release_job_lease
+from app.models.notification import Notification, NotificationArchive
+
+def test_retention_skips_the_run_while_another_worker_holds_the_lease(client, user, db):
+    old = Notification(title="Old", message="Archived long ago", is_archived=True, user_id=user["id"],
+                       created_at=datetime.utcnow() - timedelta(days=60))
+    db.add(old)
+    db.commit()
+    notification_id = old.id
+
+    token = claim_job_lease(db, "notification_retention", LEASE)
+    assert token is not None
+    run_retention()
+    db.expire_all()
+    assert db.get(Notification, notification_id) is not None
+
+    release_job_lease(db, "notification_retention", token)
+    run_retention()
+    db.expire_all()
+    assert db.get(Notification, notification_id) is None
+    assert db.query(NotificationArchive).filter(NotificationArchive.id == notification_id).count() == 1
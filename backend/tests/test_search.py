@@ -0,0 +1,37 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.core.search import ranked_search, search_filter
+from app.models.invoice import Invoice
+
+def _invoice(user_id: int, number: str) -> Invoice:
+    return Invoice(invoice_number=number, client_name="Acme", client_email="billing@acme.example", user_id=user_id)
+
+def _search(db, user_id, term):
+    return {
+        number for (number,) in db.query(Invoice.invoice_number).filter(
+            Invoice.user_id == user_id, search_filter(db, Invoice, term)
+        )
+    }
+
+def test_indexed_search_matches_token_prefixes(client, user, db):
+    db.add_all([_invoice(user["id"], f"INVOICE-{user['id']}-A"), _invoice(user["id"], f"DRAFT-{user['id']}-B")])
+    db.commit()
+
+    assert _search(db, user["id"], "invo") == {f"INVOICE-{user['id']}-A"}
+    # Prefix matching on tokens: a substring in the middle of a word no longer matches
+    assert _search(db, user["id"], "voice") == set()
+    assert len(ranked_search(db, Invoice, user["id"], "draft", 10)) == 1
+
+def test_falls_back_to_like_where_the_bound_database_has_no_index(tmp_path, client, user):
+    # A replica the full-text tables were never installed on
+    replica = create_engine(f"sqlite:///{tmp_path}/replica.db")
+    Base.metadata.create_all(bind=replica)
+    with Session(bind=replica) as db:
+        db.add(_invoice(user["id"], "INVOICE-REPLICA"))
+        db.commit()
+
+        assert _search(db, user["id"], "voice") == {"INVOICE-REPLICA"}
+        assert len(ranked_search(db, Invoice, user["id"], "invoice", 10)) == 1
+    replica.dispose()
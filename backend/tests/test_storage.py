@@ -0,0 +1,71 @@
+import os
+import uuid
+
+import pytest
+
+from app.core.storage import TMP_DIR, backfill_legacy_uploads, blob_key, collect_blob
+from app.core.storage_backends import storage_backend
+from app.models.file import Blob, StoredFile
+
+def _upload(client, headers, content: bytes) -> dict:
+    response = client.post("/api/v1/upload", headers=headers, files={"file": ("notes.txt", content, "text/plain")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def _delete(client, headers, db, sha256: str):
+    stored_file = db.query(StoredFile).filter(StoredFile.sha256 == sha256).order_by(StoredFile.id.desc()).first()
+    response = client.delete(f"/api/v1/files/{stored_file.id}", headers=headers)
+    assert response.status_code == 200, response.text
+
+def test_deleting_the_last_file_removes_its_blob(client, user, db):
+    sha256 = _upload(client, user["headers"], uuid.uuid4().bytes)["sha256"]
+    path = storage_backend.local_path(blob_key(sha256))
+    assert os.path.exists(path)
+
+    _delete(client, user["headers"], db, sha256)
+
+    assert db.get(Blob, sha256) is None
+    assert not os.path.exists(path)
+
+def test_blob_referenced_again_before_collection_is_kept(client, user, db):
+    content = uuid.uuid4().bytes
+    sha256 = _upload(client, user["headers"], content)["sha256"]
+    # The last file is gone but the blob hasn't been collected yet
+    db.query(Blob).filter(Blob.sha256 == sha256).update({Blob.ref_count: 0}, synchronize_session=False)
+    db.commit()
+
+    _upload(client, user["headers"], content)
+    assert collect_blob(db, sha256) is False
+
+    db.expire_all()
+    assert db.get(Blob, sha256).ref_count == 1
+    assert os.path.exists(storage_backend.local_path(blob_key(sha256)))
+
+def _legacy_resume(tmp_path, user_id: int, content: bytes) -> str:
+    directory = tmp_path / str(user_id) / "resume"
+    directory.mkdir(parents=True)
+    path = directory / "resume.pdf"
+    path.write_bytes(content)
+    return str(path)
+
+def test_backfill_records_legacy_uploads_and_removes_them(user, db, tmp_path):
+    path = _legacy_resume(tmp_path, user["id"], uuid.uuid4().bytes)
+
+    assert backfill_legacy_uploads(db, str(tmp_path)) == 1
+
+    stored_file = db.query(StoredFile).filter(StoredFile.user_id == user["id"], StoredFile.category == "resume").one()
+    assert os.path.exists(storage_backend.local_path(blob_key(stored_file.sha256)))
+    assert not os.path.exists(path)
+
+def test_backfill_leaves_no_temporary_copy_when_storage_fails(user, db, tmp_path, monkeypatch):
+    path = _legacy_resume(tmp_path, user["id"], uuid.uuid4().bytes)
+    leftovers = set(os.listdir(TMP_DIR)) if os.path.isdir(TMP_DIR) else set()
+
+    def fail(*args):
+        raise OSError("storage unavailable")
+    monkeypatch.setattr(storage_backend, "put", fail)
+    with pytest.raises(OSError):
+        backfill_legacy_uploads(db, str(tmp_path))
+
+    assert set(os.listdir(TMP_DIR)) == leftovers
+    assert os.path.exists(path)
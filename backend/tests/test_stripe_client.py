@@ -0,0 +1,153 @@
+"""StripeClient against a local stand-in for stripe-mock that fails on demand"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import json
+import threading
+
+import pytest
+import stripe
+
+from app.core.stripe_client import CircuitBreaker, CircuitOpenError, StripeClient
+
+class FakeClock:
+    """Stands in for the client module's ``time``: sleeps are skipped and advance the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class StripeStandIn:
+    """Answers PaymentIntent creation; the next ``fail_next`` requests get a 500"""
+
+    def __init__(self):
+        self.fail_next = 0
+        self.requests = []
+        self.intents = {}
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                key = self.headers.get("Idempotency-Key")
+                stand_in.requests.append(key)
+                if stand_in.fail_next > 0:
+                    stand_in.fail_next -= 1
+                    self._reply(500, {"error": {"type": "api_error", "message": "Unavailable"}})
+                    return
+                intent = stand_in.intents.setdefault(key, {
+                    "id": f"pi_{len(stand_in.intents) + 1}", "object": "payment_intent", "status": "requires_payment_method"
+                })
+                self._reply(200, intent)
+
+            def _reply(self, status_code, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    server = StripeStandIn()
+    monkeypatch.setattr(stripe, "api_base", server.url)
+    monkeypatch.setattr(stripe, "api_key", "sk_test_123")
+    yield server
+    server.close()
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr("app.core.stripe_client.time", fake)
+    return fake
+
+@pytest.fixture
+def stripe_client():
+    client = StripeClient()
+    yield client
+    client.shutdown()
+
+def _create_intent(client, **params):
+    return asyncio.run(client.call(stripe.PaymentIntent.create, amount=1000, currency="usd", **params))
+
+def test_retries_replay_the_same_idempotency_key(stand_in, stripe_client, clock):
+    stand_in.fail_next = 2
+    intent = _create_intent(stripe_client, idempotency_key="order-1")
+    assert intent.id == "pi_1"
+    assert stand_in.requests == ["order-1"] * 3
+    assert stripe_client.breaker.state == "closed"
+    # Backoff between the attempts
+    assert clock.now == 1000.0 + 0.5 + 1
+
+    # Without a key, one is generated and reused across the attempts
+    stand_in.fail_next = 1
+    _create_intent(stripe_client)
+    generated = stand_in.requests[3:]
+    assert len(generated) == 2 and generated[0] == generated[1] and generated[0] != "order-1"
+
+def test_gives_up_after_the_configured_retries(stand_in, stripe_client, clock, monkeypatch):
+    monkeypatch.setattr("app.core.stripe_client.settings.STRIPE_MAX_RETRIES", 1)
+    stand_in.fail_next = 5
+    with pytest.raises(stripe.error.APIError):
+        _create_intent(stripe_client, idempotency_key="order-2")
+    assert stand_in.requests == ["order-2"] * 2
+
+def test_breaker_opens_then_half_opens_then_closes(stand_in, stripe_client, clock, monkeypatch):
+    monkeypatch.setattr("app.core.stripe_client.settings.STRIPE_MAX_RETRIES", 0)
+    stripe_client.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    stand_in.fail_next = 100
+    for _ in range(2):
+        with pytest.raises(stripe.error.APIError):
+            _create_intent(stripe_client)
+    assert stripe_client.breaker.state == "open"
+
+    # Refused without reaching Stripe
+    with pytest.raises(CircuitOpenError):
+        _create_intent(stripe_client)
+    assert len(stand_in.requests) == 2
+
+    # A failed trial call opens the circuit again
+    clock.sleep(30)
+    assert stripe_client.breaker.state == "half_open"
+    with pytest.raises(stripe.error.APIError):
+        _create_intent(stripe_client)
+    assert stripe_client.breaker.state == "open"
+    assert len(stand_in.requests) == 3
+
+    # A successful trial call closes it
+    clock.sleep(30)
+    stand_in.fail_next = 0
+    assert _create_intent(stripe_client).object == "payment_intent"
+    assert stripe_client.breaker.state == "closed"
+    _create_intent(stripe_client)
+    assert len(stand_in.requests) == 5
+
+def test_breaker_lets_a_single_trial_call_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.sleep(30)
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
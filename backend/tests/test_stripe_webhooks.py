@@ -0,0 +1,95 @@
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+from app.core.stripe_webhooks import process_pending
+from app.models.payment import StripeEvent, StripeSubscription
+from app.models.user import User
+
+WEBHOOK_SECRET = "whsec_test"
+
+def _signed(payload: str, secret: str = WEBHOOK_SECRET) -> dict:
+    """Headers for a delivery signed the way Stripe signs them"""
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return {"Stripe-Signature": f"t={timestamp},v1={signature}", "Content-Type": "application/json"}
+
+def _event(event_type: str, obj: dict, created: int) -> str:
+    return json.dumps({
+        "id": f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": event_type,
+        "created": created,
+        "data": {"object": obj}
+    })
+
+def _subscription(user_id: int, subscription_id: str, plan_id: str, status: str = "active") -> dict:
+    return {
+        "id": subscription_id,
+        "object": "subscription",
+        "customer": f"cus_{user_id}",
+        "status": status,
+        "metadata": {"user_id": str(user_id), "plan_id": plan_id}
+    }
+
+def _deliver(client, payload: str) -> str:
+    response = client.post("/api/v1/payments/webhook", content=payload, headers=_signed(payload))
+    assert response.status_code == 200, response.text
+    return response.json()["status"]
+
+def test_redelivered_event_is_processed_once(client, user, db):
+    obj = {
+        "id": f"pi_{uuid.uuid4().hex}",
+        "object": "payment_intent",
+        "metadata": {"user_id": str(user["id"]), "plan_id": "pro"}
+    }
+    payload = _event("payment_intent.succeeded", obj, int(time.time()))
+
+    assert _deliver(client, payload) == "received"
+    assert _deliver(client, payload) == "duplicate"
+    process_pending(db, 100)
+    # A redelivery after processing is still recognised
+    assert _deliver(client, payload) == "duplicate"
+    process_pending(db, 100)
+
+    event_id = json.loads(payload)["id"]
+    assert db.query(StripeEvent).filter(StripeEvent.id == event_id).count() == 1
+    assert db.get(StripeEvent, event_id).status == "processed"
+    assert db.get(User, user["id"]).subscription_tier == "pro"
+
+def test_older_subscription_event_delivered_late_is_ignored(client, user, db):
+    subscription_id = f"sub_{uuid.uuid4().hex}"
+    created = int(time.time())
+    older = _event("customer.subscription.updated", _subscription(user["id"], subscription_id, "pro"), created - 60)
+    newer = _event("customer.subscription.updated", _subscription(user["id"], subscription_id, "enterprise"), created)
+
+    assert _deliver(client, newer) == "received"
+    process_pending(db, 100)
+    assert _deliver(client, older) == "received"
+    process_pending(db, 100)
+
+    assert db.get(StripeEvent, json.loads(older)["id"]).status == "ignored"
+    assert db.get(StripeSubscription, subscription_id).plan_id == "enterprise"
+    assert db.get(User, user["id"]).subscription_tier == "enterprise"
+
+def test_out_of_order_events_in_one_batch_apply_oldest_first(client, user, db):
+    subscription_id = f"sub_{uuid.uuid4().hex}"
+    created = int(time.time())
+    updated = _event("customer.subscription.updated", _subscription(user["id"], subscription_id, "pro"), created - 60)
+    deleted = _event("customer.subscription.deleted", _subscription(user["id"], subscription_id, "pro", "canceled"), created)
+
+    assert _deliver(client, deleted) == "received"
+    assert _deliver(client, updated) == "received"
+    process_pending(db, 100)
+
+    assert db.get(StripeSubscription, subscription_id).status == "canceled"
+    assert db.get(User, user["id"]).subscription_tier == "free"
+
+def test_bad_signature_is_rejected(client, user, db):
+    payload = _event("payment_intent.succeeded", {"id": "pi_forged", "metadata": {"user_id": str(user["id"]), "plan_id": "pro"}}, int(time.time()))
+    response = client.post("/api/v1/payments/webhook", content=payload, headers=_signed(payload, secret="whsec_wrong"))
+
+    assert response.status_code == 400
+    assert db.get(StripeEvent, json.loads(payload)["id"]) is None
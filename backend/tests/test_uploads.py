@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import os
+import tracemalloc
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.core.uploads import CHUNK_SIZE, save_upload
+
+MB = 1024 * 1024
+
+class GeneratedFile:
+    """A large upload produced on the fly, so the test itself holds no more than a chunk of it"""
+
+    def __init__(self, size: int, head: bytes = b"%PDF-1.7\n"):
+        self.size = size
+        self.position = 0
+        self.head = head
+        self.block = hashlib.sha256(b"block").digest() * 2048  # 64KiB
+
+    def read(self, n: int = -1) -> bytes:
+        if n < 0:
+            n = self.size - self.position
+        n = min(n, self.size - self.position)
+        chunk = bytearray()
+        while len(chunk) < n:
+            offset = (self.position + len(chunk)) % len(self.block)
+            chunk += self.block[offset:offset + n - len(chunk)]
+        if self.position == 0:
+            chunk[:len(self.head)] = self.head[:n]
+        self.position += n
+        return bytes(chunk)
+
+    def expected_sha256(self) -> str:
+        source = GeneratedFile(self.size, self.head)
+        digest = hashlib.sha256()
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+def _upload(size: int, **kwargs) -> UploadFile:
+    return UploadFile(file=GeneratedFile(size, **kwargs), filename="big.pdf")
+
+def test_ten_concurrent_50mb_uploads_stay_memory_bounded(tmp_path):
+    uploads = [_upload(50 * MB) for _ in range(10)]
+
+    async def run():
+        return await asyncio.gather(*(
+            save_upload(upload, str(tmp_path / f"{i}.pdf"), "pdf", 100 * MB) for i, upload in enumerate(uploads)
+        ))
+
+    tracemalloc.start()
+    try:
+        stored = asyncio.run(run())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    expected = uploads[0].file.expected_sha256()
+    for upload in stored:
+        assert upload.size == 50 * MB
+        assert upload.sha256 == expected
+        assert os.path.getsize(upload.path) == 50 * MB
+    # A few chunks in flight per upload (the generator's own copies included), not the 500MB uploaded
+    assert peak < 10 * 6 * CHUNK_SIZE
+    print(f"\n10 x 50MB uploads: peak traced memory {peak / MB:.1f}MB")
+
+def test_upload_over_the_cap_is_rejected_and_removed(tmp_path):
+    path = tmp_path / "big.pdf"
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(save_upload(_upload(5 * MB), str(path), "pdf", 3 * MB))
+    assert rejected.value.status_code == 413
+    assert not path.exists()
+
+def test_bad_magic_bytes_are_rejected_before_anything_is_written(tmp_path):
+    path = tmp_path / "fake.pdf"
+    upload = _upload(20 * MB, head=b"MZ\x90\x00")
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(save_upload(upload, str(path), "pdf", 100 * MB))
+    assert rejected.value.status_code == 400
+    assert not path.exists()
+    # Only the first chunk was read
+    assert upload.file.position == CHUNK_SIZE
@@ -0,0 +1,149 @@
+from contextlib import ExitStack
+import asyncio
+import json
+import time
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from app.api.v1 import websocket as websocket_api
+from app.api.v1.websocket import ConnectionManager
+from app.core.backplane import backplane
+from app.core.config import settings
+from app.core.database import engine
+
+def test_more_sockets_than_pool_slots(client, user):
+    token = user["headers"]["Authorization"].split()[1]
+    sockets = engine.pool.size() + engine.pool._max_overflow + 5
+
+    with ExitStack() as stack:
+        connections = [stack.enter_context(client.websocket_connect(f"/api/v1/ws?token={token}")) for _ in range(sockets)]
+        for websocket in connections:
+            websocket.send_json({"type": "ping"})
+            assert websocket.receive_json() == {"type": "pong"}
+
+        # Open sockets hold no connections, so requests still get one
+        assert engine.pool.checkedout() == 0
+        response = client.get("/api/v1/auth/me", headers=user["headers"])
+        assert response.status_code == 200, response.text
+
+        backplane.publish(user["id"], {"type": "notification", "data": {"title": "Hello"}})
+        for websocket in connections:
+            assert websocket.receive_json() == {"type": "notification", "data": {"title": "Hello"}}
+
+def test_socket_with_a_bad_token_is_closed(client):
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect("/api/v1/ws?token=not-a-token"):
+            pass
+    assert closed.value.code == 1008
+
+class FakeSocket:
+    """Stands in for a client socket; ``delay`` makes it a slow reader, ``broken`` a dead one"""
+
+    def __init__(self, delay: float = 0, broken: bool = False):
+        self.delay = delay
+        self.broken = broken
+        self.received = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        if self.broken:
+            raise RuntimeError("Connection reset")
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received.append(json.loads(payload))
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed_with = code
+
+async def _until(condition, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0)
+
+def test_broadcast_to_10k_sockets_benchmark(monkeypatch):
+    users, per_user = 100, 100
+    serialized = []
+    dumps = websocket_api.json.dumps
+    monkeypatch.setattr(websocket_api.json, "dumps", lambda *args, **kwargs: serialized.append(1) or dumps(*args, **kwargs))
+
+    async def run():
+        manager = ConnectionManager()
+        sockets = {user_id: [FakeSocket() for _ in range(per_user)] for user_id in range(users)}
+        # One stalled and one dead socket per user
+        for user_sockets in sockets.values():
+            user_sockets[0].delay = 3600
+            user_sockets[1].broken = True
+        for user_id, user_sockets in sockets.items():
+            for socket in user_sockets:
+                await manager.connect(socket, user_id)
+        healthy = [socket for user_sockets in sockets.values() for socket in user_sockets[2:]]
+
+        started = time.perf_counter()
+        for user_id in sockets:
+            await manager.deliver_local(user_id, {"type": "notification", "data": {"user": user_id}})
+        await _until(lambda: all(socket.received for socket in healthy))
+        elapsed = time.perf_counter() - started
+
+        assert all(socket.received == [{"type": "notification", "data": {"user": user_id}}]
+                   for user_id, user_sockets in sockets.items() for socket in user_sockets[2:])
+        # Dead sockets were dropped; stalled ones are still waiting on their own writer
+        await _until(lambda: all(len(manager.active_connections[user_id]) == per_user - 1 for user_id in sockets))
+        assert all(user_sockets[1].closed_with == 1000 for user_sockets in sockets.values())
+        assert all(user_sockets[0] in [c.websocket for c in manager.active_connections[user_id]]
+                   for user_id, user_sockets in sockets.items())
+        await manager.stop()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    # Serialized once per message, not once per socket
+    assert len(serialized) == users
+    print(f"\n{users * per_user} sockets: broadcast delivered to every healthy socket in {elapsed * 1000:.1f}ms")
+
+@pytest.mark.parametrize("policy", ["drop_oldest", "disconnect"])
+def test_slow_consumer_policies(monkeypatch, policy):
+    monkeypatch.setattr(settings, "WEBSOCKET_SEND_QUEUE_SIZE", 3)
+    monkeypatch.setattr(settings, "WEBSOCKET_SLOW_CONSUMER_POLICY", policy)
+
+    async def run():
+        manager = ConnectionManager()
+        stalled = FakeSocket(delay=3600)
+        connection = await manager.connect(stalled, 1)
+        await asyncio.sleep(0)
+        for n in range(10):
+            await manager.deliver_local(1, {"n": n})
+
+        if policy == "drop_oldest":
+            assert manager.active_connections[1] == [connection]
+            # The queue keeps the newest messages
+            assert [json.loads(connection.queue.get_nowait())["n"] for _ in range(3)] == [7, 8, 9]
+            assert connection.dropped == 7
+        else:
+            assert 1 not in manager.active_connections
+            assert stalled.closed_with == 1008
+        await manager.stop()
+
+    asyncio.run(run())
+
+def test_heartbeat_reaps_sockets_silent_for_two_intervals(monkeypatch):
+    monkeypatch.setattr(settings, "WEBSOCKET_HEARTBEAT_SECONDS", 0.05)
+
+    async def run():
+        manager = ConnectionManager()
+        live, silent = FakeSocket(), FakeSocket()
+        await manager.connect(live, 1)
+        silent_connection = await manager.connect(silent, 1)
+        silent_connection.last_seen -= 1
+        manager.start()
+        await _until(lambda: silent.closed_with is not None and live.received, timeout=5)
+
+        assert silent.closed_with == 1001
+        assert [c.websocket for c in manager.active_connections[1]] == [live]
+        assert {"type": "ping"} in live.received
+        await manager.stop()
+
+    asyncio.run(run())